@@ -0,0 +1,50 @@
+# bench/bench_auth.py
+"""
+Per-request cost of authenticating a Bearer token, with and without the
+verified-token cache in src/auth.py.
+
+    python -m bench.bench_auth [requests]
+"""
+import sys
+import time
+import timeit
+import jwt
+from flask import Flask
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src import auth
+
+ISSUER = "https://cognito-idp.bench.amazonaws.com/pool"
+
+class StaticJWKClient:
+    # Stands in for PyJWKClient with its key already fetched
+    def __init__(self, key) -> None:
+        self.key = key
+
+    def get_signing_key_from_jwt(self, token: str):
+        return self
+
+def main(n: int) -> None:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    app = Flask(__name__)
+    app.config.update(
+        COGNITO_ISSUER=ISSUER,
+        COGNITO_APP_CLIENT_ID="client",
+        _COGNITO_JWK_CLIENT=StaticJWKClient(key.public_key())
+    )
+    now = int(time.time())
+    token = jwt.encode({
+        "sub": "bench", "iss": ISSUER, "iat": now, "exp": now + 3600,
+        "token_use": "access", "client_id": "client"
+    }, key, algorithm="RS256")
+
+    uncached = timeit.timeit(lambda: auth._verify_access_token(token, app), number=n)
+    auth._verified_claims(token, app)   # warm the cache
+    cached = timeit.timeit(lambda: auth._verified_claims(token, app), number=n)
+
+    print(f"{n} requests")
+    print(f"  full verification  {uncached / n * 1e6:8.1f} us/request")
+    print(f"  cached claims      {cached / n * 1e6:8.1f} us/request")
+    print(f"  speedup            {uncached / cached:8.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
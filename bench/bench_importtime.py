@@ -0,0 +1,45 @@
+# bench/bench_importtime.py
+"""
+Import-time profile of `import src.app` (python -X importtime), for the
+default eager startup and for a lean Lambda-style startup.
+
+    python -m bench.bench_importtime [top]
+
+Lean runs with APP_STARTUP=lazy and APP_FEATURES=bibi, i.e. a function
+that serves one route group.
+"""
+import os
+import subprocess
+import sys
+
+MODES = {
+    "eager, all features": {},
+    "lazy, bibi only": {"APP_STARTUP": "lazy", "APP_FEATURES": "bibi"}
+}
+
+def profile(env: dict[str, str]) -> list[tuple[int, int, str]]:
+    '''(self us, cumulative us, module) for every imported module.'''
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.app"],
+        capture_output=True, text=True, check=True,
+        env={"CURSOR_SECRET": "bench", **os.environ, **env}
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(own), int(cumulative), module.rstrip()))
+    return rows
+
+def main(top: int) -> None:
+    for mode, env in MODES.items():
+        rows = profile(env)
+        total = next(c for _, c, m in reversed(rows) if m.strip() == "src.app")
+        print(f"{mode}: import src.app {total / 1e3:.1f} ms, {len(rows)} modules")
+        for own, cumulative, module in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+            print(f"  {cumulative / 1e3:8.1f} ms  {own / 1e3:8.1f} ms self  {module}")
+        print()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 15)
@@ -0,0 +1,35 @@
+# bench/bench_startup.py
+"""
+Cold start cost of the app: `import src.app` in a fresh interpreter (which
+also builds the module-level app) and create_app() in a warm process.
+
+    python -m bench.bench_startup [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+os.environ.setdefault("CURSOR_SECRET", "bench")   # inherited by the fresh interpreters
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import src.app; print(time.perf_counter() - t)"
+
+def time_import(runs: int) -> list[float]:
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return times
+
+def main(runs: int) -> None:
+    imports = time_import(runs)
+    from src.app import create_app
+    factory = timeit.repeat(create_app, number=1, repeat=runs)
+
+    print(f"{runs} runs (median / max)")
+    print(f"  import src.app   {statistics.median(imports) * 1e3:8.1f} / {max(imports) * 1e3:8.1f} ms")
+    print(f"  create_app()     {statistics.median(factory) * 1e3:8.1f} / {max(factory) * 1e3:8.1f} ms")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
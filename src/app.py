@@ -1,38 +1,158 @@
+import importlib
+import click
 from flask import Flask
 from flask_cors import CORS
-from .routes.forum_routes import bp as forum_bp
-from .routes.profile_routes import bp as profile_bp
-from .routes.breakroom_routes import bp as breakrooms_bp  
-from .routes.bibi_routes import bp as bibi_bp
-from .service.forum_service import ForumService
-from .service.profile_service import ProfileService
-from .auth import init_cognito
+from . import cursor, db
+from .auth import init_cognito, token_cache_stats, jwks_stats
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-def create_app():
+# Route groups create_app can serve, by blueprint module
+FEATURES = {
+    "forum": ".routes.forum_routes",
+    "profile": ".routes.profile_routes",
+    "breakrooms": ".routes.breakroom_routes",
+    "bibi": ".routes.bibi_routes"
+}
+
+# APP_FEATURES=forum,bibi serves only those routes (e.g. one Lambda function per group).
+# APP_STARTUP=lazy skips the startup checks and loads signing keys on the first request.
+APP_FEATURES = os.environ.get("APP_FEATURES", "")
+APP_STARTUP = os.environ.get("APP_STARTUP", "")     # "" (eager) | "lazy"
+# Seconds between in-process breakroom expiry sweeps, 0 leaves it to the CLI/a scheduler
+BREAKROOM_SWEEP_INTERVAL = float(os.environ.get("BREAKROOM_SWEEP_INTERVAL", "0"))
+
+def create_app(features: list[str] | None = None, lazy: bool | None = None):
+    '''
+    Build the app with the route groups in features (all of them by default).
+    Only the modules of those groups are imported, and no AWS client is
+    created before it is first used.
+    '''
+    if features is None:
+        features = [f for f in APP_FEATURES.split(",") if f] or list(FEATURES)
+    if lazy is None:
+        lazy = APP_STARTUP == "lazy"
+    unknown = set(features) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+
     app = Flask(__name__)
-    app.config["FORUM_SERVICE"] = ForumService()
-    app.config["PROFILE_SERVICE"] = ProfileService()
+    app.config["FEATURES"] = features
+    # The flask CLI (provision, migrations, `flask run`) is a single process
+    # that sets FLASK_RUN_FROM_CLI, WSGI servers importing `app` do not.
+    cursor.require_secret(allow_random=app.debug or os.environ.get("FLASK_RUN_FROM_CLI") == "true")
+    if "forum" in features:
+        from .service.forum_service import ForumService
+        app.config["FORUM_SERVICE"] = ForumService()
+    if "profile" in features:
+        from .service.profile_service import ProfileService
+        app.config["PROFILE_SERVICE"] = ProfileService()
+    if "bibi" in features:
+        from .service.bibi_service import BibiService
+        from .service.tip_service import TipService
+        app.config["BIBI_SERVICE"] = BibiService()
+        app.config["TIP_SERVICE"] = TipService()
     app.config.update(
         COGNITO_REGION="eu-north-1",
         COGNITO_USER_POOL_ID="eu-north-1_LRB1Cr2sA",
         COGNITO_APP_CLIENT_ID="c2377oft10p8nb7isiemn2hg2"
     )
-    init_cognito(app)
+    init_cognito(app, preload=not lazy)
+    if not lazy and not db.table_ready():
+        app.logger.warning("Table Pairent is missing or not active, run: flask --app src.app provision")
 
-    app.register_blueprint(forum_bp)
-    app.register_blueprint(profile_bp)
-    app.register_blueprint(breakrooms_bp)
-    app.register_blueprint(bibi_bp)
+    for feature in features:
+        app.register_blueprint(importlib.import_module(FEATURES[feature], __package__).bp)
+    if "breakrooms" in features and BREAKROOM_SWEEP_INTERVAL > 0:
+        from .service import breakroom_service
+        breakroom_service.start_sweeper(BREAKROOM_SWEEP_INTERVAL)
 
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
     @app.get("/health")
     def health(): 
         return {"ok": True}, 200
+
+    @app.get("/metrics")
+    def metrics():
+        res = {"tokens": token_cache_stats(), "jwks": jwks_stats(app)}
+        if "forum" in features:
+            from .service import name_service
+            from .service.feed_cache import feed
+            res.update(names=name_service.resolver.stats(), feed=feed.stats())
+        if "bibi" in features:
+            res["bibi"] = app.config["BIBI_SERVICE"].stats()
+        return res, 200
+
+    # flask --app src.app provision
+    @app.cli.command("provision")
+    def provision():
+        """Create the table and its indexes, or add the indexes it is missing."""
+        db.ensure_table()
+        click.echo("Table Pairent is ready")
+
+    # flask --app src.app sweep-breakrooms
+    @app.cli.command("sweep-breakrooms")
+    def sweep_breakrooms():
+        """End expired breakrooms and delete their participant rows."""
+        from .service import breakroom_service
+        res = breakroom_service.sweep_expired()
+        click.echo(f"{res['ended']} rooms ended, {res['participants']} participant rows deleted")
+
+    # flask --app src.app reconcile-replies [QID...]
+    @app.cli.command("reconcile-replies")
+    @click.argument("qids", nargs=-1)
+    def reconcile_replies(qids):
+        """Recompute the reply counters from the REPLY# items (all threads without QIDs)."""
+        from .repo import reply_repo as ReplyRepo
+        if qids:
+            fixed = sum(ReplyRepo.reconcile(qid) for qid in qids)
+            click.echo(f"{len(qids)} threads, {fixed} counters fixed")
+        else:
+            res = ReplyRepo.reconcile_all()
+            click.echo(f"{res['threads']} threads, {res['fixed']} counters fixed")
+
+    # flask --app src.app migrate-replies [--dry-run]
+    @app.cli.command("migrate-replies")
+    @click.option("--dry-run", is_flag=True, help="Only count the replies to migrate.")
+    def migrate_replies(dry_run):
+        """Index replies written before the thread index existed."""
+        from .repo import thread_repo
+        res = thread_repo.migrate_replies(dry_run=dry_run)
+        verb = "to migrate" if dry_run else "migrated"
+        click.echo(f"{res['scanned']} replies scanned, {res['migrated']} {verb}")
+
+    # flask --app src.app migrate-tag-rows [--dry-run]
+    @app.cli.command("migrate-tag-rows")
+    @click.option("--dry-run", is_flag=True, help="Only count the Tag rows to migrate.")
+    def migrate_tag_rows(dry_run):
+        """Rewrite Tag rows keyed by date alone under "<date>#<qid>" and recount their tags."""
+        from .repo import tag_repo
+        res = tag_repo.migrate_rows(dry_run=dry_run)
+        verb = "to migrate" if dry_run else "migrated"
+        click.echo(f"{res['scanned']} rows scanned, {res['migrated']} {verb}, {res['dropped']} orphaned, {res['tags']} tags")
+
+    # flask --app src.app migrate-children [--dry-run]
+    @app.cli.command("migrate-children")
+    @click.option("--dry-run", is_flag=True, help="Only count the child records to migrate.")
+    def migrate_children(dry_run):
+        """Index child records written before the children index existed."""
+        from .repo import profile_repo
+        res = profile_repo.migrate_children(dry_run=dry_run)
+        verb = "to migrate" if dry_run else "migrated"
+        click.echo(f"{res['scanned']} rows scanned, {res['migrated']} child records {verb}")
+
+    # flask --app src.app migrate-growth [--dry-run]
+    @app.cli.command("migrate-growth")
+    @click.option("--dry-run", is_flag=True, help="Only count the growth records to migrate.")
+    def migrate_growth(dry_run):
+        """Take growth records written with gsi="GROWTH" out of the "new" index."""
+        from .repo import profile_repo
+        res = profile_repo.migrate_growth(dry_run=dry_run)
+        verb = "to migrate" if dry_run else "migrated"
+        click.echo(f"{res['migrated']} growth records {verb}")
     
     return app
 
@@ -1,24 +1,44 @@
 # src/auth.py
+import hashlib
+import os
+import time
 from functools import wraps
 from flask import request, jsonify, current_app, g
 import jwt
-from jwt import PyJWKClient
+from .cache import TTLCache
+from .jwks import KeyStore, key_store
+
+# Verified claims by token digest, each kept until the token's exp.
+# Steady-state requests with a known token skip the RS256 verification.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
+MAX_TOKEN_LIFETIME = 24 * 3600  # Cognito access tokens live at most a day
+
+LEEWAY = 60    # seconds of clock skew allowed on exp
+
+_verified = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=MAX_TOKEN_LIFETIME)
+# Revocations are never evicted early: each one is kept (unbounded) until
+# every token it rejects has expired anyway.
+_revoked_tokens = TTLCache(maxsize=None, ttl=MAX_TOKEN_LIFETIME + LEEWAY)
+_revoked_users = TTLCache(maxsize=None, ttl=MAX_TOKEN_LIFETIME + LEEWAY)
 
 # Initialize once (e.g., in create_app) rather than per-request
-def init_cognito(app):
+def init_cognito(app, preload: bool = True):
     region = app.config["COGNITO_REGION"]
     pool_id = app.config["COGNITO_USER_POOL_ID"]
     issuer = f"https://cognito-idp.{region}.amazonaws.com/{pool_id}"
     jwks_url = f"{issuer}/.well-known/jwks.json"
     app.config["COGNITO_ISSUER"] = issuer
-    app.config["_COGNITO_JWK_CLIENT"] = PyJWKClient(jwks_url)
+    # Keys are loaded now and refreshed in the background, see jwks.py.
+    # COGNITO_JWKS points to a local file or another URL (e.g. offline tests).
+    source = app.config.get("COGNITO_JWKS") or os.environ.get("COGNITO_JWKS") or jwks_url
+    app.config["_COGNITO_JWK_CLIENT"] = key_store(source, preload=preload)
 
 def _verify_access_token(token: str, app):
-    jwk_client: PyJWKClient = app.config["_COGNITO_JWK_CLIENT"]
+    jwk_client: KeyStore = app.config["_COGNITO_JWK_CLIENT"]
     issuer: str = app.config["COGNITO_ISSUER"]
     app_client_id: str = app.config["COGNITO_APP_CLIENT_ID"]
 
-    # 1) Get signing key by kid (cached)
+    # 1) Get signing key by kid (preloaded)
     signing_key = jwk_client.get_signing_key_from_jwt(token).key
 
     # 2) Decode + validate standard fields
@@ -31,7 +51,7 @@ def _verify_access_token(token: str, app):
             "require": ["exp", "iat"],
             "verify_aud": False,   # access tokens usually lack "aud" in Cognito
         },
-        leeway=60,  # allow 60s clock skew
+        leeway=LEEWAY,  # allow 60s clock skew
     )
 
     # 3) Cognito-specific checks
@@ -43,6 +63,54 @@ def _verify_access_token(token: str, app):
 
     return claims
 
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _verified_claims(token: str, app) -> dict:
+    '''
+    Claims of a valid access token, from the cache when the token was
+    verified before. Revoked tokens and tokens issued to a revoked user
+    before the revocation are rejected either way.
+    '''
+    digest = _digest(token)
+    claims = _verified.get(digest)
+    if claims is None:
+        if _revoked_tokens.get(digest):
+            raise jwt.InvalidTokenError("Token revoked")
+        claims = _verify_access_token(token, app)
+        ttl = claims["exp"] - time.time()
+        if ttl > 0:
+            _verified.set(digest, claims, ttl)
+    revoked_at = _revoked_users.get(claims.get("sub"))
+    # iat has whole seconds: a token issued in the second of the revocation
+    # (e.g. the sign-in right after a global sign-out) is still accepted
+    if revoked_at is not None and claims.get("iat", 0) < revoked_at:
+        _verified.delete(digest)
+        raise jwt.InvalidTokenError("Token revoked")
+    return claims
+
+def revoke_token(token: str) -> None:
+    '''Reject this token from now on, e.g. after a sign-out.'''
+    digest = _digest(token)
+    _verified.delete(digest)
+    try:
+        # Kept until the token expires (unverified: only its exp is used)
+        exp = jwt.decode(token, options={"verify_signature": False})["exp"]
+        ttl = min(exp - time.time(), MAX_TOKEN_LIFETIME) + LEEWAY
+    except Exception:
+        ttl = None
+    _revoked_tokens.set(digest, True, ttl)
+
+def revoke_user(sub: str) -> None:
+    '''Reject every token issued to sub so far, e.g. after a global sign-out.'''
+    _revoked_users.set(sub, int(time.time()))
+
+def token_cache_stats() -> dict[str, object]:
+    return _verified.stats()
+
+def jwks_stats(app) -> dict[str, object]:
+    return app.config["_COGNITO_JWK_CLIENT"].stats()
+
 def cognito_auth_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -55,17 +123,37 @@ def cognito_auth_required(f):
         token = auth_header.split(" ", 1)[1]
 
         try:
-            claims = _verify_access_token(token, current_app)
+            claims = _verified_claims(token, current_app)
         except Exception as e:
             current_app.logger.warning(f"Cognito auth failed: {e}")
             return jsonify({"message": "Invalid or expired token"}), 401
 
-        # Stash on flask.g for downstream use
-        g.jwt = claims
-        g.user_sub = claims.get("sub")
-        g.username = claims.get("username")
-        g.groups = claims.get("cognito:groups", [])
-        g.scope = claims.get("scope", "")
+        _stash_claims(claims)
+        return f(*args, **kwargs)
+    return decorated
 
+def cognito_auth_optional(f):
+    """
+    Like cognito_auth_required, but lets anonymous requests through.
+    g.user_sub is None unless a valid Bearer token was sent.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.user_sub = None
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            token = auth_header.split(" ", 1)[1]
+            try:
+                _stash_claims(_verified_claims(token, current_app))
+            except Exception as e:
+                current_app.logger.warning(f"Cognito auth failed, continuing anonymously: {e}")
         return f(*args, **kwargs)
     return decorated
+
+def _stash_claims(claims: dict):
+    # Stash on flask.g for downstream use
+    g.jwt = claims
+    g.user_sub = claims.get("sub")
+    g.username = claims.get("username")
+    g.groups = claims.get("cognito:groups", [])
+    g.scope = claims.get("scope", "")
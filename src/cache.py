@@ -0,0 +1,160 @@
+# src/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+from .db import table
+
+"""Small caching helpers shared by the services."""
+
+_MISSING = object()
+
+class TTLCache:
+    '''
+    Thread-safe in-process cache with a per-entry time to live and an LRU
+    size bound. Counts hits and misses so callers can report them.
+    With maxsize=None nothing is evicted before it expires (e.g. deny
+    lists); expired entries are then purged whenever the map doubled.
+    '''
+    def __init__(self, maxsize: int | None = 1024, ttl: float = 300) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._purge_at = 1024
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= time.monotonic(): # type: ignore
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1] # type: ignore
+
+    def set(self, key: Any, value: Any, ttl: float | None = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            if self.maxsize is None:
+                if len(self._data) > self._purge_at:
+                    now = time.monotonic()
+                    for k in [k for k, (exp, _) in self._data.items() if exp <= now]:
+                        del self._data[k]
+                    self._purge_at = max(1024, 2 * len(self._data))
+                return
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, object]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / total if total else 0.0
+        }
+
+
+class SingleFlight:
+    '''
+    Coalesces concurrent calls for the same key: the first caller runs the
+    function, callers arriving meanwhile wait for and share its result (or
+    its exception). Nothing is kept once the call finished.
+    '''
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls: dict[Any, "_Call"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    # Lower-level steps of do(), for leaders that produce their result
+    # piece by piece (e.g. a streamed answer)
+    def join(self, key: Any) -> tuple["_Call", bool]:
+        '''Call in flight for key, and whether this caller leads it (and must finish it).'''
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                return call, True
+            self.coalesced += 1
+            return call, False
+
+    def wait(self, call: "_Call") -> Any:
+        call.done.wait()
+        if call.error:
+            raise call.error
+        return call.result
+
+    def finish(self, key: Any, call: "_Call", result: Any = None, error: Exception | None = None) -> None:
+        call.result, call.error = result, error
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Exception | None = None
+
+
+class DynamoCacheBackend:
+    '''
+    Shared cache store kept in the Pairent table so several workers see the
+    same entries. Every entry is its own partition, CACHE#<namespace>#<key>,
+    so a busy namespace does not throttle on one hot partition. Items carry
+    the table's ttl attribute; expired items are ignored until DynamoDB
+    removes them.
+    '''
+    SK = "CACHE"
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+
+    def _key(self, key: str) -> dict[str, str]:
+        return {"PK": f"CACHE#{self.namespace}#{key}", "SK": self.SK}
+
+    def get(self, key: str) -> Any:
+        item = table.get_item(Key=self._key(key)).get("Item")
+        if not item or int(item.get("ttl", 0)) <= int(time.time()):
+            return None
+        return item.get("value")
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        table.put_item(Item={
+            **self._key(key),
+            "value": value,
+            "ttl": int(time.time() + ttl)
+        })
+
+    def delete(self, key: str) -> None:
+        table.delete_item(Key=self._key(key))
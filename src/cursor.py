@@ -0,0 +1,81 @@
+# src/cursor.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from decimal import Decimal
+
+"""
+Opaque pagination cursors.
+
+A cursor is "<version>.<payload>.<signature>": the payload is compact,
+base64url encoded JSON holding the position to resume from (usually a
+DynamoDB LastEvaluatedKey), the signature is a truncated HMAC-SHA256 of
+the version, the payload and the scope of the list it belongs to. The
+scope is not stored, so tampered cursors and cursors of another list or
+user fail the signature check, as do cursors of an unknown version.
+"""
+
+VERSION = "1"
+SIGNATURE_BYTES = 16
+
+# Every worker serving the same clients must sign with the same key, so
+# CURSOR_SECRET is required; create_app refuses to start without it unless
+# the app runs in debug mode or under the flask CLI, where one process signs
+# with a random key.
+_SECRET = os.environ.get("CURSOR_SECRET", "").encode()
+
+def require_secret(allow_random: bool = False) -> None:
+    '''Check at startup that cursors can be signed (see CURSOR_SECRET above).'''
+    global _SECRET
+    if _SECRET:
+        return
+    if not allow_random:
+        raise RuntimeError(
+            "CURSOR_SECRET is not set: pagination cursors would only be valid in the "
+            "process that made them. Set it (the same value for every worker) or run with FLASK_DEBUG=1."
+        )
+    _SECRET = secrets.token_bytes(32)
+
+class InvalidCursor(ValueError):
+    pass
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _json_default(o):
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    raise TypeError(f"Cannot encode {type(o)} in a cursor")
+
+def _sign(version: str, payload: str, scope: str) -> str:
+    if not _SECRET:
+        raise RuntimeError("CURSOR_SECRET is not set")
+    mac = hmac.new(_SECRET, f"{version}.{payload}.{scope}".encode(), hashlib.sha256)
+    return _b64encode(mac.digest()[:SIGNATURE_BYTES])
+
+def encode(position: object, scope: str) -> str:
+    '''Cursor for resuming the list identified by scope at position.'''
+    raw = json.dumps(position, separators=(",", ":"), default=_json_default)
+    payload = _b64encode(raw.encode())
+    return f"{VERSION}.{payload}.{_sign(VERSION, payload, scope)}"
+
+def decode(token: str, scope: str) -> object:
+    '''Position stored in a cursor made by encode for the same scope.'''
+    try:
+        version, payload, signature = token.split(".")
+    except (AttributeError, ValueError):
+        raise InvalidCursor("malformed cursor")
+    if version != VERSION:
+        raise InvalidCursor("unsupported cursor version")
+    if not hmac.compare_digest(signature, _sign(version, payload, scope)):
+        raise InvalidCursor("bad cursor signature")
+    try:
+        return json.loads(_b64decode(payload))
+    except ValueError:
+        raise InvalidCursor("malformed cursor")
@@ -1,26 +1,235 @@
+import os
+import random
+import threading
+import time
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-# Create a DynamoDB resource object pointing to local DB
-dynamodb = boto3.resource(
-    'dynamodb',
-    region_name='eu-north-1',
-    aws_access_key_id='fake',
-    aws_secret_access_key='fake',
-    endpoint_url='http://127.0.0.1:8000'
-)
-
-# Also create a low-level client for table existence checks
-dynamodb_client = boto3.client(
+# ---- Client factory ----
+# Every AWS client of the app comes from here: one shared session, one
+# client per service/region/endpoint (botocore clients are thread-safe),
+# and a pool sized for threaded workers instead of the default 10.
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_RETRY_MODE = os.environ.get("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "2"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "10"))
+
+_session: boto3.session.Session | None = None
+_clients: dict[tuple, object] = {}
+_lock = threading.RLock()   # creating clients on one session is not thread-safe
+
+def _get_session() -> boto3.session.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session()
+        return _session
+
+def client_config(**overrides) -> Config:
+    """Tuned botocore Config; keyword arguments override single settings."""
+    settings = {
+        "max_pool_connections": AWS_MAX_POOL_CONNECTIONS,
+        "retries": {"mode": AWS_RETRY_MODE, "total_max_attempts": AWS_MAX_ATTEMPTS},
+        "connect_timeout": AWS_CONNECT_TIMEOUT,
+        "read_timeout": AWS_READ_TIMEOUT,
+        "tcp_keepalive": True
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+def client(service: str, region_name: str | None = None, endpoint_url: str | None = None, **config):
+    """Shared client for service, created on first use."""
+    key = (service, region_name, endpoint_url, tuple(sorted(config.items())))
+    with _lock:
+        if key not in _clients:
+            _clients[key] = _get_session().client(
+                service,
+                region_name=region_name,
+                endpoint_url=endpoint_url,
+                config=client_config(**config),
+                **(_DYNAMODB_CREDENTIALS if service == "dynamodb" else {})
+            )
+        return _clients[key]
+
+# Local DynamoDB
+DYNAMODB_REGION = "eu-north-1"
+DYNAMODB_ENDPOINT = "http://127.0.0.1:8000"
+_DYNAMODB_CREDENTIALS = {
+    "aws_access_key_id": "fake",
+    "aws_secret_access_key": "fake"
+}
+
+class _Lazy:
+    """
+    Stands in for an object that is built on first attribute access, so
+    importing this module (and every repo) creates no AWS client.
+    """
+    def __init__(self, factory) -> None:
+        self._factory = factory
+        self._obj = None
+
+    def _resolve(self):
+        if self._obj is None:
+            with _lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+# DynamoDB resource object pointing to local DB
+dynamodb = _Lazy(lambda: _get_session().resource(
     'dynamodb',
-    region_name='eu-north-1',
-    aws_access_key_id='fake',
-    aws_secret_access_key='fake',
-    endpoint_url='http://127.0.0.1:8000'
-)
+    region_name=DYNAMODB_REGION,
+    endpoint_url=DYNAMODB_ENDPOINT,
+    config=client_config(),
+    **_DYNAMODB_CREDENTIALS
+))
+
+# Also a low-level client for table existence checks
+dynamodb_client = _Lazy(lambda: client('dynamodb', region_name=DYNAMODB_REGION, endpoint_url=DYNAMODB_ENDPOINT))
+
+table = _Lazy(lambda: dynamodb.Table("Pairent"))
+
+# Concurrent transactions on the same item (e.g. likes on a popular
+# question) cancel each other with TransactionConflict; those are retried.
+TRANSACTION_ATTEMPTS = int(os.environ.get("TRANSACTION_ATTEMPTS", "4"))
+TRANSACTION_BACKOFF = 0.02  # seconds, doubled per attempt, full jitter
+
+def transact_items(items: list[dict[str, object]], attempts: int = TRANSACTION_ATTEMPTS) -> None:
+    """
+    One TransactWriteItems request, retried with jittered backoff while it
+    is cancelled only by conflicts with other transactions. Any other
+    cancellation (e.g. ConditionalCheckFailed) is raised at once.
+    """
+    for attempt in range(attempts):
+        try:
+            table.meta.client.transact_write_items(TransactItems=items)
+            return
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException" or attempt == attempts - 1:
+                raise
+            codes = set(cancellation_codes(e)) - {"None"}
+            if codes != {"TransactionConflict"}:
+                raise
+        time.sleep(random.uniform(0, TRANSACTION_BACKOFF * 2 ** attempt))
+
+def transact_write(ops: list[dict[str, object]]) -> None:
+    """
+    TransactWriteItems over the table, at most 100 operations per request.
+    Longer lists are split and are then not atomic as a whole; tag writes
+    stay below the limit because questions carry at most MAX_TAGS tags.
+    """
+    for i in range(0, len(ops), 100):
+        transact_items(ops[i:i + 100])
 
-table = dynamodb.Table("Pairent")
+def cancellation_codes(e) -> list[str]:
+    """Per-operation codes of a TransactionCanceledException, "None" for operations that passed."""
+    reasons = e.response.get("CancellationReasons", [])
+    return [r.get("Code", "None") for r in reasons]
+
+# 5. Questions under a tag by likes (tag rows only)
+TAG_POPULAR_INDEX = {
+    "IndexName": "tag_popular",
+    "KeySchema": [
+        {"AttributeName": "tag_gsi", "KeyType": "HASH"},
+        {"AttributeName": "likes", "KeyType": "RANGE"}
+    ],
+    "Projection": {
+        "ProjectionType": "ALL"
+    },
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": 5,
+        "WriteCapacityUnits": 5
+    }
+}
+
+# 6./7. Breakrooms by status (soonest to expire first) and by owner (newest first).
+# Only breakroom META items carry brk_status/brk_owner, so both are sparse.
+BREAKROOMS_ACTIVE_INDEX = {
+    "IndexName": "breakrooms_active",
+    "KeySchema": [
+        {"AttributeName": "brk_status", "KeyType": "HASH"},
+        {"AttributeName": "exp", "KeyType": "RANGE"}
+    ],
+    "Projection": {
+        "ProjectionType": "ALL"
+    },
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": 5,
+        "WriteCapacityUnits": 5
+    }
+}
+
+BREAKROOMS_OWNER_INDEX = {
+    "IndexName": "breakrooms_owner",
+    "KeySchema": [
+        {"AttributeName": "brk_owner", "KeyType": "HASH"},
+        {"AttributeName": "created_at", "KeyType": "RANGE"}
+    ],
+    "Projection": {
+        "ProjectionType": "ALL"
+    },
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": 5,
+        "WriteCapacityUnits": 5
+    }
+}
+
+# 8. Children of a user. Only child records carry child_owner, so their
+# growth and vaccine rows stay out of the index.
+CHILDREN_INDEX = {
+    "IndexName": "children",
+    "KeySchema": [
+        {"AttributeName": "child_owner", "KeyType": "HASH"},
+        {"AttributeName": "SK", "KeyType": "RANGE"}
+    ],
+    "Projection": {
+        "ProjectionType": "ALL"
+    },
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": 5,
+        "WriteCapacityUnits": 5
+    }
+}
+
+# 9. Replies by parent, oldest first (see thread_repo)
+THREAD_INDEX = {
+    "IndexName": "thread",
+    "KeySchema": [
+        {"AttributeName": "thread_parent", "KeyType": "HASH"},
+        {"AttributeName": "thread_pos", "KeyType": "RANGE"}
+    ],
+    "Projection": {
+        "ProjectionType": "ALL"
+    },
+    "ProvisionedThroughput": {
+        "ReadCapacityUnits": 5,
+        "WriteCapacityUnits": 5
+    }
+}
+
+# ---- Provisioning ----
+# Schema changes are run by `flask --app src.app provision`, never while
+# serving; the app only calls table_ready().
+_ready: bool | None = None
+
+def table_ready(refresh: bool = False) -> bool:
+    """Whether the table exists and is ACTIVE. One DescribeTable per process."""
+    global _ready
+    if _ready is None or refresh:
+        try:
+            status = dynamodb_client.describe_table(TableName="Pairent")["Table"]["TableStatus"]
+            _ready = status == "ACTIVE"
+        except Exception:
+            _ready = False
+    return _ready
 
 def ensure_table():
+    """Create the table and any missing indexes, then wait until they exist."""
     existing_tables = dynamodb_client.list_tables()['TableNames']
     if "Pairent" not in existing_tables:
         dynamodb.create_table(
@@ -37,7 +246,14 @@ def ensure_table():
                 {"AttributeName": "date", "AttributeType": "S"},
                 {"AttributeName": "author", "AttributeType": "S"},
                 {"AttributeName": "sender_id", "AttributeType": "S"},   # for friend requests
-
+                {"AttributeName": "tag_gsi", "AttributeType": "S"},     # for tag rows
+                {"AttributeName": "brk_status", "AttributeType": "S"},  # for breakrooms
+                {"AttributeName": "brk_owner", "AttributeType": "S"},
+                {"AttributeName": "exp", "AttributeType": "N"},
+                {"AttributeName": "created_at", "AttributeType": "N"},
+                {"AttributeName": "child_owner", "AttributeType": "S"}, # for child records
+                {"AttributeName": "thread_parent", "AttributeType": "S"},   # for replies
+                {"AttributeName": "thread_pos", "AttributeType": "S"},
             ],
             ProvisionedThroughput={
                 'ReadCapacityUnits': 5,
@@ -109,9 +325,45 @@ def ensure_table():
                     "ReadCapacityUnits": 5,
                     "WriteCapacityUnits": 5
     }
-                }
+                },
+
+                TAG_POPULAR_INDEX,
+                BREAKROOMS_ACTIVE_INDEX,
+                BREAKROOMS_OWNER_INDEX,
+                CHILDREN_INDEX,
+                THREAD_INDEX
             ]
         )
 
     # Wait until tables are created
-    dynamodb_client.get_waiter('table_exists').wait(TableName="Pairent")
\ No newline at end of file
+    dynamodb_client.get_waiter('table_exists').wait(TableName="Pairent")
+    _ensure_index(TAG_POPULAR_INDEX, [{"AttributeName": "tag_gsi", "AttributeType": "S"},
+                                      {"AttributeName": "likes", "AttributeType": "N"}])
+    _ensure_index(BREAKROOMS_ACTIVE_INDEX, [{"AttributeName": "brk_status", "AttributeType": "S"},
+                                            {"AttributeName": "exp", "AttributeType": "N"}])
+    _ensure_index(BREAKROOMS_OWNER_INDEX, [{"AttributeName": "brk_owner", "AttributeType": "S"},
+                                           {"AttributeName": "created_at", "AttributeType": "N"}])
+    _ensure_index(CHILDREN_INDEX, [{"AttributeName": "child_owner", "AttributeType": "S"},
+                                   {"AttributeName": "SK", "AttributeType": "S"}])
+    _ensure_index(THREAD_INDEX, [{"AttributeName": "thread_parent", "AttributeType": "S"},
+                                 {"AttributeName": "thread_pos", "AttributeType": "S"}])
+    table_ready(refresh=True)
+
+def _ensure_index(index: dict, attribute_definitions: list[dict]) -> None:
+    """Add a global secondary index that tables created before it are missing."""
+    desc = dynamodb_client.describe_table(TableName="Pairent")["Table"]
+    existing = [i["IndexName"] for i in desc.get("GlobalSecondaryIndexes", [])]
+    if index["IndexName"] in existing:
+        return
+    dynamodb_client.update_table(
+        TableName="Pairent",
+        AttributeDefinitions=attribute_definitions,
+        GlobalSecondaryIndexUpdates=[{"Create": index}]
+    )
+    # DynamoDB builds one index at a time, wait before the next update
+    while True:
+        desc = dynamodb_client.describe_table(TableName="Pairent")["Table"]
+        statuses = [i.get("IndexStatus", "ACTIVE") for i in desc.get("GlobalSecondaryIndexes", [])]
+        if all(status == "ACTIVE" for status in statuses):
+            return
+        time.sleep(5)
\ No newline at end of file
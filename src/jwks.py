@@ -0,0 +1,119 @@
+# src/jwks.py
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+import jwt
+from jwt import PyJWK, PyJWKSet
+
+"""
+Signing keys for access tokens, loaded ahead of the requests that need them.
+
+A KeyStore reads a JWKS document from a file or a URL when it is created
+and re-reads it from a background thread every refresh_interval seconds.
+Lookups never fetch: a token with an unknown kid is rejected and wakes the
+refresher, which fetches at most once every min_refetch seconds however many
+unknown kids arrive. With a local file (COGNITO_JWKS=/path/jwks.json) no
+network access is needed at all.
+"""
+
+JWKS_REFRESH_INTERVAL = float(os.environ.get("JWKS_REFRESH_INTERVAL", "3600"))
+JWKS_MIN_REFETCH = float(os.environ.get("JWKS_MIN_REFETCH", "60"))
+JWKS_FETCH_TIMEOUT = float(os.environ.get("JWKS_FETCH_TIMEOUT", "5"))
+
+log = logging.getLogger(__name__)
+
+class KeyStore:
+    '''
+    Drop-in for PyJWKClient.get_signing_key_from_jwt backed by a preloaded
+    key set.
+    '''
+    def __init__(self, source: str, refresh_interval: float = JWKS_REFRESH_INTERVAL, min_refetch: float = JWKS_MIN_REFETCH, preload: bool = True) -> None:
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.min_refetch = min_refetch
+        self.fetches = 0
+        self.failures = 0
+        self.unknown_kids = 0
+        self._keys: dict[str, PyJWK] = {}
+        self._last_fetch = float("-inf")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        if preload:
+            self.refresh()
+
+    # ---- Loading ----
+    def _read(self) -> dict:
+        if self.source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(self.source, timeout=JWKS_FETCH_TIMEOUT) as res:
+                return json.load(res)
+        with open(self.source) as f:
+            return json.load(f)
+
+    def refresh(self) -> bool:
+        '''Re-read the key set unless the last fetch was under min_refetch ago.'''
+        with self._lock:
+            if time.monotonic() - self._last_fetch < self.min_refetch:
+                return False
+            self._last_fetch = time.monotonic()
+        try:
+            jwks = PyJWKSet.from_dict(self._read())
+        except Exception as e:
+            # Keep serving the keys we have
+            self.failures += 1
+            log.warning(f"Loading JWKS from {self.source} failed: {e}")
+            return False
+        self._keys = {k.key_id: k for k in jwks.keys if k.key_id}
+        self.fetches += 1
+        return True
+
+    def start(self) -> None:
+        '''Start the background refresher (once).'''
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            # Woken early by unknown kids, otherwise refresh on schedule
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            self.refresh()
+
+    # ---- Lookups ----
+    def get_signing_key_from_jwt(self, token: str) -> PyJWK:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if not self.fetches:
+            # Not preloaded (lazy startup), load on first use
+            self.refresh()
+        key = self._keys.get(kid) # type: ignore
+        if key is None:
+            self.unknown_kids += 1
+            self._wake.set()
+            raise jwt.InvalidTokenError(f"Unknown signing key {kid}")
+        return key
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "keys": len(self._keys),
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "unknownKids": self.unknown_kids
+        }
+
+
+# One store per source, shared by every app created in the process
+_stores: dict[str, KeyStore] = {}
+_stores_lock = threading.Lock()
+
+def key_store(source: str, preload: bool = True) -> KeyStore:
+    with _stores_lock:
+        if source not in _stores:
+            _stores[source] = KeyStore(source, preload=preload)
+            _stores[source].start()
+        return _stores[source]
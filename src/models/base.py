@@ -0,0 +1,9 @@
+# src/models/base.py
+from pydantic import BaseModel as _PydanticModel, ConfigDict
+
+class BaseModel(_PydanticModel):
+    '''
+    Base of the app's models. Validators are built on first use instead of
+    at import time, which keeps them off the cold start path.
+    '''
+    model_config = ConfigDict(defer_build=True)
@@ -1,43 +1,59 @@
-# src/routes/breakrooms.py
-from flask import Blueprint, jsonify, request
-import requests
-import os
-
-bp = Blueprint("breakrooms", __name__)
-DAILY_API_KEY = os.getenv("DAILY_API_KEY")
-DAILY_API_URL = "https://api.daily.co/v1"
-
-# --- Create a new Daily room ---
-@bp.route("/breakrooms", methods=["POST"])
-def create_breakroom():
-    try:
-        payload = {
-            "name": request.json.get("name"),
-            "privacy": "private",       # or "public"
-            "properties": {
-                "enable_chat": True,
-                "start_audio_off": False,
-                "start_video_off": True,
-                "exp": int((__import__('time').time()) + 3600)  # expires in 1h
-            }
+# src/models/breakrooms.py
+from .base import BaseModel
+
+# A breakroom's META item. brk_status and brk_owner only exist on these
+# items, so the breakrooms_active and breakrooms_owner indexes are sparse
+# and list breakrooms without reading anything else in the table.
+class Breakroom(BaseModel):
+    room_id: str
+    status: str             # "active" | "ended"
+    daily_room_name: str
+    created_at: int         # epoch seconds
+    expires_at: int         # epoch seconds
+    url: str
+    ttl: int
+    owner_sub: str = ""
+    owner_name: str = ""
+    name: str = ""
+    description: str = ""
+
+    def to_item(self) -> dict[str, object]:
+        return {
+            **Breakroom.key(self.room_id),
+            "type": "BREAKROOM",
+            "status": self.status,
+            "brk_status": self.status,
+            "brk_owner": self.owner_sub,
+            "daily_room_name": self.daily_room_name,
+            "owner_sub": self.owner_sub,
+            "owner_name": self.owner_name,
+            "name": self.name,
+            "description": self.description,
+            "created_at": self.created_at,
+            "exp": self.expires_at,
+            "url": self.url,
+            "ttl": self.ttl
+        }
+    @staticmethod
+    def key(room_id: str) -> dict[str, str]:
+        return {
+            "PK": f"BRK#{room_id}",
+            "SK": "META"
         }
 
-        headers = {"Authorization": f"Bearer {DAILY_API_KEY}"}
-        resp = requests.post(f"{DAILY_API_URL}/rooms", json=payload, headers=headers)
-        data = resp.json()
-
-        if resp.status_code != 200:
-            return jsonify({"error": data}), resp.status_code
-
-        return jsonify({"url": data["url"], "name": data["name"]})
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-
-# --- List existing rooms ---
-@bp.route("/breakrooms", methods=["GET"])
-def list_breakrooms():
-    headers = {"Authorization": f"Bearer {DAILY_API_KEY}"}
-    resp = requests.get(f"{DAILY_API_URL}/rooms", headers=headers)
-    return jsonify(resp.json())
+def to_breakroom(item: dict | None) -> Breakroom | None:
+    if not item:
+        return None
+    return Breakroom(
+        room_id=item["PK"].split("#", 1)[1],
+        status=item.get("status", ""),
+        daily_room_name=item.get("daily_room_name", ""),
+        created_at=int(item.get("created_at", 0)),
+        expires_at=int(item.get("exp", 0)),
+        url=item.get("url", ""),
+        ttl=int(item.get("ttl", 0)),
+        owner_sub=item.get("owner_sub", ""),
+        owner_name=item.get("owner_name", ""),
+        name=item.get("name", ""),
+        description=item.get("description", "")
+    )
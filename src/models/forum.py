@@ -1,5 +1,6 @@
 # src/models/forum.py
-from pydantic import BaseModel
+from typing import ClassVar
+from .base import BaseModel
 
 class Like(BaseModel):
     qid: str
@@ -48,27 +49,88 @@ def to_save(item: dict[str, str]) -> Save:
         qid=item["SK"].split("#")[1]
     )
 
+# A question as listed under one of its tags. The row copies the fields the
+# popular/new indexes project, so a tag page is a single query.
+# The partition is ordered by date in the table and by likes in the
+# tag_popular index. The author is stored as "author_id" and there is no
+# "gsi" attribute so tag rows stay out of the question indexes.
 class Tag(BaseModel):
     tag: str
     qid: str
     created_at: str
+    title: str = ""
+    author_id: str = ""
+    tags: list[str] = []
+    likes: int = 0
+    reply_count: int = 0
 
     def to_item(self) -> dict[str, object]:
         return {
-            "PK": f"TAG#{self.tag}",
-            "SK": self.created_at,
-            "qid": self.qid
+            **self.key(),
+            "tag_gsi": f"TAG#{self.tag}",
+            "qid": self.qid,
+            "title": self.title,
+            "author_id": self.author_id,
+            "tags": self.tags,
+            "date": self.created_at,
+            "likes": self.likes,
+            "answers": self.reply_count
         }
     def key(self) -> dict[str, object]:
         return {
             "PK": f"TAG#{self.tag}",
-            "SK": self.created_at
+            "SK": f"{self.created_at}#{self.qid}"
         }
+
+    @staticmethod
+    def from_question(q, tag: str) -> "Tag":
+        return Tag(
+            tag=tag,
+            qid=q.qid,
+            created_at=q.created_at,
+            title=q.title,
+            author_id=q.author_id,
+            tags=q.tags,
+            likes=q.likes,
+            reply_count=q.reply_count
+        )
 def to_tag(item: dict) -> Tag | None:
     if not item:
         return None
     return Tag(
-        tag=item["PK"].split("#")[1],
-        created_at=item["SK"],
-        qid=item["qid"]
-    )
\ No newline at end of file
+        tag=item["PK"].split("#", 1)[1],
+        created_at=item.get("date", item["SK"].split("#")[0]),
+        qid=item.get("qid") or item["SK"].split("#")[-1],
+        title=item.get("title", ""),
+        author_id=item.get("author_id", ""),
+        tags=item.get("tags", []),
+        likes=int(item.get("likes", 0)),
+        reply_count=int(item.get("answers", 0))
+    )
+
+# Number of questions using a tag. The counters share the "popular" index
+# with questions: gsi is "TAG" and the count is stored in "likes", so the
+# most used tags come back from a single query.
+class TagCount(BaseModel):
+    tag: str
+    count: int
+
+    GSI: ClassVar[str] = "TAG"
+
+    def to_item(self) -> dict[str, object]:
+        return {
+            **TagCount.key(self.tag),
+            "gsi": TagCount.GSI,
+            "likes": self.count
+        }
+    @staticmethod
+    def key(tag: str) -> dict[str, str]:
+        return {
+            "PK": "TAGS",
+            "SK": tag
+        }
+def to_tag_count(item: dict) -> TagCount:
+    return TagCount(
+        tag=item["SK"],
+        count=int(item.get("likes", 0))
+    )
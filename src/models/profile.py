@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import Field
+from .base import BaseModel
 from typing import Literal
 from decimal import Decimal
-from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
 PrivacyLevel = Literal["public", "friends", "private"]
@@ -103,6 +103,7 @@ class Child(BaseModel):
         return {
             "PK": f"USER#{self.user_id}",
             "SK": f"CHILD#{self.child_id}",
+            "child_owner": self.user_id,    # children index, child records only
             "child_id": self.child_id,
             "name": self.name,
             "dob": self.dob,
@@ -131,8 +132,7 @@ class Growth(BaseModel):
             "child_id": self.child_id,
             "date": self.date,
             "height": Decimal(str(self.height)),
-            "weight": Decimal(str(self.weight)), 
-            "gsi": "GROWTH",
+            "weight": Decimal(str(self.weight)),
         }
 
     @staticmethod
@@ -180,7 +180,7 @@ class FriendRequest(BaseModel):
     def key(to_id: str, from_id: str) -> dict[str, str]:
         return {"PK": f"USER#{to_id}", "SK": f"FRIEND_REQUEST#{from_id}"}
 
-from pydantic import BaseModel
+from .base import BaseModel
 from typing import Optional
 
 class ChildUpdate(BaseModel):
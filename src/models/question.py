@@ -1,11 +1,17 @@
 # src/models/question.py
-from pydantic import BaseModel, Field
+from pydantic import Field
+from .base import BaseModel
+
+# A question's tag rows and counters change in one transaction (two
+# operations per tag), which keeps within the 100 operations of a single
+# TransactWriteItems request.
+MAX_TAGS = 10
 
 # Incoming payload
 class QuestionCreate(BaseModel):
     title: str = Field(min_length=3, max_length=200)
     body: str
-    tags: list[str]
+    tags: list[str] = Field(max_length=MAX_TAGS)
     age: int
 
 # Primary model
@@ -36,7 +42,8 @@ class Question(BaseModel):
             "age": self.age,
             "date": self.created_at,
             "likes": self.likes,
-            "replies": self.reply_count
+            "replies": self.reply_count,
+            "answers": self.reply_count     # copy projected into the list indexes
         }
 
     @staticmethod
@@ -1,5 +1,5 @@
 # src/models/answer.py
-from pydantic import BaseModel
+from .base import BaseModel
 
 class ReplyCreate(BaseModel):
     body: str
@@ -29,7 +29,9 @@ class Reply(BaseModel):
             "body": self.body,
             "date": self.created_at,
             "likes": self.likes,
-            "replies": self.reply_count
+            "replies": self.reply_count,
+            "thread_parent": f"{self.qid}#{self.parent_id}",     # thread index
+            "thread_pos": f"{self.created_at}#{self.rid}"
         }
     @staticmethod
     def key(qid: str, rid: str) -> dict[str, str]:
@@ -0,0 +1,74 @@
+# src/models/search.py
+from .base import BaseModel
+
+# Postings of the full-text index over question titles and bodies.
+# Each term gets its own partition so a query only reads the postings
+# of the terms it contains.
+class Posting(BaseModel):
+    term: str
+    qid: str
+    tf: int     # weighted term frequency in the question
+    dl: int     # weighted length of the question in tokens
+
+    def to_item(self) -> dict[str, object]:
+        return {
+            "PK": f"TERM#{self.term}",
+            "SK": self.qid,
+            "tf": self.tf,
+            "dl": self.dl
+        }
+
+    def key(self) -> dict[str, object]:
+        return {
+            "PK": f"TERM#{self.term}",
+            "SK": self.qid
+        }
+
+def to_posting(item: dict) -> Posting | None:
+    if not item:
+        return None
+    return Posting(
+        term=item["PK"].split("#", 1)[1],
+        qid=item["SK"],
+        tf=int(item.get("tf", 0)),
+        dl=int(item.get("dl", 0))
+    )
+
+
+# Dictionary of indexed terms, bucketed by their first two characters
+# so that a prefix can be expanded with a single begins_with query.
+# df is the number of questions containing the term; an entry is removed
+# once its posting list is empty.
+class TermEntry(BaseModel):
+    term: str
+    df: int = 0
+
+    def to_item(self) -> dict[str, object]:
+        return {**self.key(), "df": self.df}
+
+    def key(self) -> dict[str, object]:
+        return {
+            "PK": f"TERMS#{self.term[:2]}",
+            "SK": self.term
+        }
+
+
+# Corpus statistics needed by BM25 (document count and total length)
+class SearchStats(BaseModel):
+    docs: int
+    tokens: int
+
+    @staticmethod
+    def key() -> dict[str, str]:
+        return {
+            "PK": "SEARCH",
+            "SK": "STATS"
+        }
+
+def to_search_stats(item: dict | None) -> SearchStats:
+    if not item:
+        return SearchStats(docs=0, tokens=0)
+    return SearchStats(
+        docs=int(item.get("docs", 0)),
+        tokens=int(item.get("tokens", 0))
+    )
@@ -1,6 +1,8 @@
+import time
 from ..models.breakrooms import Breakroom
-from ..db import table
-from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from ..db import table, transact_items, cancellation_codes
+from boto3.dynamodb.conditions import Key
 
 def put_breakroom(breakroom: Breakroom):
     table.put_item(Item=breakroom.to_item())
@@ -19,20 +21,105 @@ def get_breakroom_meta(room_id: str) -> dict | None:
     return res.get("Item")
 
 def update_breakroom_status(room_id: str, status: str):
+    # brk_status moves the room between partitions of breakrooms_active
     table.update_item(
         Key={"PK": f"BRK#{room_id}", "SK": "META"},
-        UpdateExpression="SET #s = :s",
+        UpdateExpression="SET #s = :s, brk_status = :s",
         ExpressionAttributeNames={"#s": "status"},
         ExpressionAttributeValues={":s": status}
     )
 
-def list_breakrooms(owner_sub: str | None = None) -> list[dict]:
-    if owner_sub:
-        res = table.scan(
-            FilterExpression=Attr("owner_sub").eq(owner_sub) & Attr("SK").eq("META")
-        )
-    else:
-        res = table.scan(
-            FilterExpression=Attr("SK").eq("META") & Attr("status").eq("active")
-        )
-    return res.get("Items", [])
+def list_active_breakrooms(limit: int, last_key: dict | None) -> dict[str, object]:
+    '''
+    Active rooms that have not expired yet, soonest to expire first.
+    Reads only breakroom items through the sparse breakrooms_active index.
+    '''
+    kwargs = {
+        "IndexName": "breakrooms_active",
+        "KeyConditionExpression": Key("brk_status").eq("active") & Key("exp").gt(int(time.time())),
+        "ScanIndexForward": True,
+        "Limit": limit
+    }
+    if last_key:
+        kwargs["ExclusiveStartKey"] = last_key
+    return table.query(**kwargs)
+
+def list_breakrooms_by_owner(owner_sub: str, limit: int, last_key: dict | None) -> dict[str, object]:
+    '''Rooms of owner_sub, newest first, through the sparse breakrooms_owner index.'''
+    kwargs = {
+        "IndexName": "breakrooms_owner",
+        "KeyConditionExpression": Key("brk_owner").eq(owner_sub),
+        "ScanIndexForward": False,
+        "Limit": limit
+    }
+    if last_key:
+        kwargs["ExclusiveStartKey"] = last_key
+    return table.query(**kwargs)
+
+# ---- Expiry ----
+def list_expired_breakrooms(now: int, limit: int, last_key: dict | None = None) -> dict[str, object]:
+    '''Rooms still marked active whose exp has passed, oldest first.'''
+    kwargs = {
+        "IndexName": "breakrooms_active",
+        "KeyConditionExpression": Key("brk_status").eq("active") & Key("exp").lte(now),
+        "ScanIndexForward": True,
+        "Limit": limit
+    }
+    if last_key:
+        kwargs["ExclusiveStartKey"] = last_key
+    return table.query(**kwargs)
+
+def end_breakrooms(room_ids: list[str]) -> list[str]:
+    '''
+    Mark rooms ended, up to 100 per TransactWriteItems request. Only rooms
+    whose META item still exists and is active are updated, so rooms that
+    TTL already deleted are not recreated. Returns the ids actually ended.
+    '''
+    ended = []
+    for i in range(0, len(room_ids), 100):
+        batch = room_ids[i:i + 100]
+        while batch:
+            try:
+                transact_items([_end_op(room_id) for room_id in batch])
+                ended += batch
+                break
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "TransactionCanceledException":
+                    raise
+                codes = cancellation_codes(e)
+                if "ConditionalCheckFailed" not in codes:
+                    raise
+                # Gone or no longer active: retry the others without them
+                batch = [rid for rid, code in zip(batch, codes) if code != "ConditionalCheckFailed"]
+    return ended
+
+def _end_op(room_id: str) -> dict:
+    return {
+        "Update": {
+            "TableName": table.name,
+            "Key": Breakroom.key(room_id),
+            "UpdateExpression": "SET #s = :s, brk_status = :s",
+            "ConditionExpression": "attribute_exists(PK) AND brk_status = :a",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {":s": "ended", ":a": "active"}
+        }
+    }
+
+def delete_participants(room_ids: list[str]) -> int:
+    '''Delete the USER# rows of the rooms. Returns the number deleted.'''
+    deleted = 0
+    with table.batch_writer() as batch:
+        for room_id in room_ids:
+            kwargs = {
+                "KeyConditionExpression": Key("PK").eq(f"BRK#{room_id}") & Key("SK").begins_with("USER#"),
+                "ProjectionExpression": "PK, SK"
+            }
+            while True:
+                res = table.query(**kwargs)
+                for item in res.get("Items", []):
+                    batch.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
+                    deleted += 1
+                if "LastEvaluatedKey" not in res:
+                    break
+                kwargs["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    return deleted
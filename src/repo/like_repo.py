@@ -0,0 +1,103 @@
+# src/repo/like_repo.py
+from botocore.exceptions import ClientError
+from ..db import table, transact_items, cancellation_codes
+from ..models.forum import Like
+
+"""
+Transactional like engine shared by questions and replies.
+The Like row and the counter on the liked item change in one
+TransactWriteItems request, so concurrent taps can not double count;
+transactions cancelled by concurrent taps on the same item are retried.
+"""
+
+def like(target_key: dict[str, str], like: Like, copies: list[dict] = []) -> bool | None:
+    '''
+    Like the item at target_key. Returns True if the like was added,
+    None if it already existed and False if the target does not exist.
+    copies are the keys of denormalized copies of the target whose likes
+    count moves with it; copies that are gone are skipped.
+    '''
+    ops: list[dict] = [
+        {
+            "Put": {
+                "TableName": table.name,
+                "Item": like.to_item(),
+                "ConditionExpression": "attribute_not_exists(PK)"
+            }
+        },
+        _count_op(target_key, 1)
+    ] + [_count_op(key, 1) for key in copies]
+    try:
+        _transact(ops)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        codes = cancellation_codes(e)
+        if codes[1:2] == ["ConditionalCheckFailed"]:
+            return False    # target does not exist
+        if codes[:1] == ["ConditionalCheckFailed"]:
+            return None     # already liked
+        raise
+
+def unlike(target_key: dict[str, str], like: Like, copies: list[dict] = []) -> bool | None:
+    '''
+    Remove a like from the item at target_key. Returns True if the like was
+    removed, None if there was none and False if the target does not exist.
+    '''
+    ops: list[dict] = [
+        {
+            "Delete": {
+                "TableName": table.name,
+                "Key": like.key(),
+                "ConditionExpression": "attribute_exists(PK)"
+            }
+        },
+        _count_op(target_key, -1)
+    ] + [_count_op(key, -1) for key in copies]
+    try:
+        _transact(ops)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        codes = cancellation_codes(e)
+        if codes[:1] == ["ConditionalCheckFailed"]:
+            return None     # was not liked
+        if codes[1:2] == ["ConditionalCheckFailed"]:
+            # The target is gone, drop the orphaned like row on its own
+            table.delete_item(Key=like.key())
+            return False
+        raise
+
+def _count_op(key: dict, delta: int) -> dict[str, object]:
+    return {
+        "Update": {
+            "TableName": table.name,
+            "Key": key,
+            "UpdateExpression": "ADD likes :d",
+            "ConditionExpression": "attribute_exists(PK)",
+            "ExpressionAttributeValues": {":d": delta}
+        }
+    }
+
+def _transact(ops: list[dict]) -> None:
+    '''
+    Run the like transaction; when only copies (ops[2:]) failed their
+    condition, run it again without them.
+    '''
+    try:
+        transact_items(ops)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        codes = cancellation_codes(e)
+        if "ConditionalCheckFailed" in codes[:2] or "ConditionalCheckFailed" not in codes[2:]:
+            raise
+        transact_items(ops[:2] + [op for op, code in zip(ops[2:], codes[2:]) if code != "ConditionalCheckFailed"])
+
+def get_like(like: Like) -> bool:
+    res = table.get_item(
+        Key=like.key()
+    )
+    return "Item" in res
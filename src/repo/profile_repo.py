@@ -1,6 +1,8 @@
 # src/repo/profile_repo.py
+from concurrent.futures import ThreadPoolExecutor
 from ..db import table
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
 from ..models.profile import Profile, Child, Growth, Vaccine, FriendRequest
 
 # ---- Profile ----
@@ -92,21 +94,158 @@ def update_child(user_id: str, child_id: str, updates: dict[str, object]) -> dic
     return res.get("Attributes", {})
 
 def get_children(user_id: str) -> list[dict[str, object]]:
-    """Return all child records for a given user."""
-    res = table.query(
-        KeyConditionExpression=Key("PK").eq(f"USER#{user_id}") & Key("SK").begins_with("CHILD#")
-    )
-    items = res.get("Items", [])
-    return [i for i in items if i["SK"].count("#") == 1]
+    """
+    Return all child records for a given user, from the sparse children
+    index (growth and vaccine rows are not in it).
+    """
+    params: dict = {
+        "IndexName": "children",
+        "KeyConditionExpression": Key("child_owner").eq(user_id)
+    }
+    items: list[dict] = []
+    while True:
+        res = table.query(**params)
+        items.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            return items
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def migrate_children(dry_run: bool = False) -> dict[str, int]:
+    """
+    Add child_owner to child records written before the children index.
+    The table is scanned for CHILD# rows still missing it; each one is
+    updated in place, so concurrent edits to a child are not overwritten.
+    """
+    params: dict = {
+        "FilterExpression": Attr("SK").begins_with("CHILD#") & Attr("child_owner").not_exists(),
+        "ProjectionExpression": "PK, SK"
+    }
+    scanned = migrated = 0
+    while True:
+        res = table.scan(**params)
+        for item in res.get("Items", []):
+            scanned += 1
+            if item["SK"].count("#") != 1:
+                continue    # growth/vaccine row
+            migrated += 1
+            if dry_run:
+                continue
+            try:
+                table.update_item(
+                    Key={"PK": item["PK"], "SK": item["SK"]},
+                    UpdateExpression="SET child_owner = :owner",
+                    ConditionExpression="attribute_exists(PK)",  # deleted meanwhile
+                    ExpressionAttributeValues={":owner": item["PK"].split("#", 1)[1]}
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                migrated -= 1
+        if "LastEvaluatedKey" not in res:
+            return {"scanned": scanned, "migrated": migrated}
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def migrate_growth(dry_run: bool = False) -> dict[str, int]:
+    """
+    Remove gsi="GROWTH" from growth records written before it was dropped;
+    it put every growth record under one key of the "new" index.
+    """
+    params: dict = {
+        "IndexName": "new",
+        "KeyConditionExpression": Key("gsi").eq("GROWTH"),
+        "ProjectionExpression": "PK, SK"
+    }
+    migrated = 0
+    while True:
+        res = table.query(**params)
+        for item in res.get("Items", []):
+            migrated += 1
+            if dry_run:
+                continue
+            try:
+                table.update_item(
+                    Key={"PK": item["PK"], "SK": item["SK"]},
+                    UpdateExpression="REMOVE gsi",
+                    ConditionExpression="gsi = :g",    # deleted or changed meanwhile
+                    ExpressionAttributeValues={":g": "GROWTH"}
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                migrated -= 1
+        if "LastEvaluatedKey" not in res:
+            return {"migrated": migrated}
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
 
 def delete_child(user_id: str, child_id: str) -> None:
+    '''Delete the child and its growth and vaccine records.'''
     table.delete_item(Key=Child.key(user_id, child_id))
+    params: dict = {
+        "KeyConditionExpression": Key("PK").eq(f"USER#{user_id}") & Key("SK").begins_with(f"CHILD#{child_id}#"),
+        "ProjectionExpression": "PK, SK"
+    }
+    with table.batch_writer() as batch:
+        while True:
+            res = table.query(**params)
+            for item in res.get("Items", []):
+                batch.delete_item(Key={"PK": item["PK"], "SK": item["SK"]})
+            if "LastEvaluatedKey" not in res:
+                break
+            params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
 
 def add_growth(growth: Growth) -> dict[str, object]:
     item = growth.to_item()
     table.put_item(Item=item)
     return item
 
+# ---- Growth ----
+def _growth_range(user_id: str, child_id: str, date_from: str | None, date_to: str | None):
+    # Dates are ISO strings, so the sort key orders records by date.
+    # "~" sorts after any date or time suffix, which keeps date_to inclusive.
+    prefix = f"CHILD#{child_id}#GROWTH#"
+    return Key("PK").eq(f"USER#{user_id}") & Key("SK").between(prefix + (date_from or ""), prefix + (date_to or "") + "~")
+
+def query_growth(user_id: str, child_id: str, date_from: str | None = None, date_to: str | None = None,
+                 limit: int = 100, last_key: dict | None = None) -> dict[str, object]:
+    '''One page of a child's growth records between two dates, oldest first.'''
+    params: dict = {
+        "KeyConditionExpression": _growth_range(user_id, child_id, date_from, date_to),
+        "Limit": limit
+    }
+    if last_key:
+        params["ExclusiveStartKey"] = last_key
+    res = table.query(**params)
+    return {
+        "Items": res.get("Items", []),
+        "LastEvaluatedKey": res.get("LastEvaluatedKey")
+    }
+
+def list_growth(user_id: str, child_id: str, date_from: str | None = None, date_to: str | None = None) -> list[dict]:
+    '''Every growth record in the range, whole items, following pages.'''
+    params: dict = {"KeyConditionExpression": _growth_range(user_id, child_id, date_from, date_to)}
+    items: list[dict] = []
+    while True:
+        res = table.query(**params)
+        items.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            return items
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def read_growth(user_id: str, child_id: str, date_from: str | None = None, date_to: str | None = None) -> list[dict]:
+    '''Date and measurements of every growth record in the range, following pages.'''
+    params: dict = {
+        "KeyConditionExpression": _growth_range(user_id, child_id, date_from, date_to),
+        "ProjectionExpression": "#d, height, weight",
+        "ExpressionAttributeNames": {"#d": "date"}
+    }
+    items: list[dict] = []
+    while True:
+        res = table.query(**params)
+        items.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            return items
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
 def add_vaccine(vaccine: Vaccine) -> dict[str, object]:
     item = vaccine.to_item()
     table.put_item(Item=item)
@@ -150,3 +289,122 @@ def get_friend_requests(user_id: str) -> list[dict[str, object]]:
         KeyConditionExpression=Key("PK").eq(f"USER#{user_id}") & Key("SK").begins_with("FRIEND_REQUEST#")
     )
     return res.get("Items", [])
+
+# ---- Aggregate ----
+# The USER#<sub> partition, in sort key order:
+#   CHILD#<cid>                 children
+#   CHILD#<cid>#GROWTH#<date>   growth
+#   CHILD#<cid>#VACCINE#<name>  vaccines
+#   FRIEND_REQUEST#<from>       friendRequests
+#   LIKE#<id>                   likes
+#   PROFILE                     profile
+#   SAVE#<qid>                  saves
+SECTIONS = ("profile", "children", "growth", "vaccines", "friendRequests", "likes", "saves")
+_PREFIXES = ["CHILD#", "FRIEND_REQUEST#", "LIKE#", "PROFILE", "SAVE#"]
+
+def section_of(sk: str) -> str | None:
+    if sk == "PROFILE":
+        return "profile"
+    if sk.startswith("CHILD#"):
+        if "#GROWTH#" in sk:
+            return "growth"
+        if "#VACCINE#" in sk:
+            return "vaccines"
+        return "children" if sk.count("#") == 1 else None
+    for prefix, section in (("FRIEND_REQUEST#", "friendRequests"), ("LIKE#", "likes"), ("SAVE#", "saves")):
+        if sk.startswith(prefix):
+            return section
+    return None
+
+def _prefix_of(section: str) -> str:
+    if section in ("children", "growth", "vaccines"):
+        return "CHILD#"
+    return {"profile": "PROFILE", "friendRequests": "FRIEND_REQUEST#", "likes": "LIKE#", "saves": "SAVE#"}[section]
+
+def _section_filter(section: str):
+    if section == "profile":
+        return Attr("SK").eq("PROFILE")
+    if section == "children":
+        return Attr("SK").begins_with("CHILD#") & Attr("dob").exists()
+    if section == "growth":
+        return Attr("SK").contains("#GROWTH#")
+    if section == "vaccines":
+        return Attr("SK").contains("#VACCINE#")
+    return Attr("SK").begins_with(_prefix_of(section))
+
+# Key ranges of one profile read are queried in parallel, through the
+# table's client (botocore clients are thread-safe, boto3 resources are not)
+PROFILE_READ_WORKERS = 8
+_read_pool = ThreadPoolExecutor(max_workers=PROFILE_READ_WORKERS, thread_name_prefix="profile-read")
+
+def _upper(prefix: str) -> str:
+    # Successor of a prefix ("CHILD$" for "CHILD#"), no row has that key
+    return prefix if prefix == "PROFILE" else prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def _profile_queries(user_id: str, sections: set[str]) -> list[dict]:
+    '''
+    Query parameters reading the requested sections: one key range per run
+    of adjacent requested prefixes, so rows of sections in between (e.g.
+    LIKE# between FRIEND_REQUEST# and PROFILE) are never read. Children
+    alone come from the children index, without their growth and vaccine
+    rows.
+    '''
+    pk = Key("PK").eq(f"USER#{user_id}")
+    queries: list[dict] = []
+    prefixes = {_prefix_of(s) for s in sections}
+    if "CHILD#" in prefixes and not sections & {"growth", "vaccines"}:
+        queries.append({"IndexName": "children", "KeyConditionExpression": Key("child_owner").eq(user_id)})
+        prefixes.discard("CHILD#")
+
+    runs: list[list[str]] = []
+    for i, prefix in enumerate(_PREFIXES):
+        if prefix not in prefixes:
+            continue
+        if runs and _PREFIXES.index(runs[-1][-1]) == i - 1:
+            runs[-1].append(prefix)
+        else:
+            runs.append([prefix])
+    for run in runs:
+        params: dict = {"KeyConditionExpression": pk & Key("SK").between(run[0], _upper(run[-1]))}
+        wanted = {s for s in sections if _prefix_of(s) in run}
+        if wanted != {s for s in SECTIONS if _prefix_of(s) in run}:
+            condition = None
+            for s in wanted:
+                condition = _section_filter(s) if condition is None else condition | _section_filter(s)
+            params["FilterExpression"] = condition
+        queries.append(params)
+    return queries
+
+def _query_all(params: dict) -> list[dict]:
+    client = table.meta.client
+    params = {"TableName": table.name, **params}
+    items: list[dict] = []
+    while True:
+        res = client.query(**params)
+        items.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            return items
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def _query_concurrently(queries: list[dict]) -> list[dict]:
+    return [item for items in _read_pool.map(_query_all, queries) for item in items]
+
+def get_profile_items(user_id: str, sections: set[str]) -> list[dict]:
+    '''
+    Rows of the requested sections of a user's partition. Each key range
+    (see _profile_queries) is one query followed page by page, and the
+    ranges are queried concurrently.
+    '''
+    return _query_concurrently(_profile_queries(user_id, set(sections)))
+
+def get_child_records(user_id: str, wanted: dict[str, set[str]]) -> list[dict]:
+    '''
+    Growth and vaccine rows of some children of a user: wanted maps a
+    child_id to the sections ("growth", "vaccines") to read for it. One
+    begins_with query per child and section, queried concurrently.
+    '''
+    infix = {"growth": "GROWTH", "vaccines": "VACCINE"}
+    queries = [{
+        "KeyConditionExpression": Key("PK").eq(f"USER#{user_id}") & Key("SK").begins_with(f"CHILD#{child_id}#{infix[s]}#")
+    } for child_id, sections in wanted.items() for s in sorted(sections)]
+    return _query_concurrently(queries)
@@ -1,34 +1,40 @@
 # src/repos/question_repo.py
 from flask import g
-from ..db import table
-from ..models.question import Question, to_question
-from ..models.forum import Like, Save, Tag, to_tag
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Key, Attr
-from ..db import table
+from ..db import table, transact_write, cancellation_codes
+from ..models.question import Question, to_question
+from ..models.forum import Like, Save
+from . import search_repo, like_repo, tag_repo, thread_repo
+from boto3.dynamodb.conditions import Key
 
 """All Question persistence (DynamoDB)."""
 
 # ---- Basic Question functionality
 def create(q: Question) -> None:
-    table.put_item(Item=q.to_item())
-    for tag in q.tags:
-        t = Tag(tag=tag, qid=q.qid, created_at=q.created_at)
-        table.put_item(t.to_item())
+    '''
+    Write the question, its Tag rows and the tag counters in one transaction.
+    '''
+    ops: list[dict[str, object]] = [{"Put": {"TableName": table.name, "Item": q.to_item()}}]
+    ops += tag_repo.row_ops(q, q.tags, 1)
+    transact_write(ops)
+    search_repo.index_question(q.qid, q.title, q.body)
 
-def get_question(qid: str) -> Question | None:
+def get_question(qid: str, consistent: bool = False) -> Question | None:
     res = table.get_item(
-        Key=Question.key(qid)
+        Key=Question.key(qid),
+        ConsistentRead=consistent
     )
     return to_question(res.get("Item"))
 
+def get_question_item(qid: str) -> dict | None:
+    return table.get_item(Key=Question.key(qid)).get("Item")
+
 def get_forum(qid: str, all: bool) -> dict:
-    res = table.query(
-        KeyConditionExpression=Key("PK").eq(f"QUESTION#{qid}")
-    )
     if all:
-        return res
-    items = res.get("Items")
+        return table.query(
+            KeyConditionExpression=Key("PK").eq(f"QUESTION#{qid}")
+        )
+    items = thread_repo.read_items(qid)
     ret = {}
     if not items:
         return ret
@@ -41,7 +47,14 @@ def get_forum(qid: str, all: bool) -> dict:
             ret["Replies"].append(item)
     return ret
 
-def edit(qid: str, title: str = "", body: str = "", tags: list[str] = []) -> None:
+def get_thread_window(qid: str, parent: str, after: dict | None, limit: int, children: int) -> dict[str, object]:
+    return thread_repo.window(qid, parent, after, limit, children)
+
+def edit(qid: str, title: str = "", body: str = "", tags: list[str] = []) -> Question | None:
+    old = get_question(qid)
+    if old is None:
+        return None
+
     # Build UpdateExpression and values
     updateExpression = ""
     expr_attr_values = {}
@@ -62,26 +75,40 @@ def edit(qid: str, title: str = "", body: str = "", tags: list[str] = []) -> Non
             updateExpression += ", #g = :newTags"
         else:
             updateExpression += "SET #g = :newTags"
-        updateExpression = "SET #g = :newTags"
         expr_attr_values[":newTags"] = tags
         expr_attr_names["#g"] = "tags"
 
     try:
-        # res = 
-        table.update_item(
-            Key={
-                "PK": "QUESTION",
-                "SK": qid
-            },
+        res = table.update_item(
+            Key=Question.key(qid),
             UpdateExpression=updateExpression,
             ExpressionAttributeNames=expr_attr_names,
             ExpressionAttributeValues=expr_attr_values,
-            # ReturnValues="ALL_NEW"
+            ReturnValues="ALL_NEW"
         )
-        # return to_question(res.get("Attributes"))
     except Exception as e:
         print(f"Failed to update question {qid}: {e}")
-        # return None
+        return None
+
+    q = to_question(res.get("Attributes"))
+    if q:
+        search_repo.reindex_question(qid, old.title, old.body, q.title, q.body)
+        if q.title != old.title or q.tags != old.tags:
+            removed = [t for t in old.tags if t not in q.tags]
+            added = [t for t in q.tags if t not in old.tags]
+            kept = [t for t in q.tags if t in old.tags] if q.title != old.title else []
+            _write_tag_ops(tag_repo.row_ops(old, removed, -1) + tag_repo.row_ops(q, added, 1), tag_repo.refresh_ops(q, kept))
+    return q
+
+def _write_tag_ops(ops: list[dict[str, object]], refresh: list[dict[str, object]]) -> None:
+    # Refreshing a Tag row that is gone (not migrated yet) is skipped
+    try:
+        transact_write(ops + refresh)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        codes = cancellation_codes(e)[len(ops):]
+        transact_write(ops + [op for op, code in zip(refresh, codes) if code != "ConditionalCheckFailed"])
 
 def delete(qid: str) -> bool:
     '''
@@ -92,14 +119,14 @@ def delete(qid: str) -> bool:
     # Get all items associated with the question
     res = get_forum(qid, all=True)
     items = res.get("Items", [])
-    
-    # Add tag objects to the list of items to delete
-    # This is required because tags do not share the same PK as other items
-    q = get_question(qid)
+
+    # Tag rows do not share the PK of the other items, so they are removed
+    # together with their counters in one transaction.
+    # The question item sorts first ("!"), so it is on the first page.
+    q = to_question(next((i for i in items if i["SK"] == "!"), None))
     if q:
-        for tag in q.tags:
-            t = Tag(tag=tag, qid=q.qid, created_at=q.created_at)
-            items.append(t.to_item())
+        transact_write(tag_repo.row_ops(q, q.tags, -1))
+        search_repo.unindex_question(q.qid, q.title, q.body)
     if not items:
         return True
     
@@ -118,61 +145,19 @@ def delete(qid: str) -> bool:
 
     return True
 
-
 # ---- Like ----
-def like(qid: str) -> bool:
+# The like counters on the question's Tag rows move in the same transaction
+def like(qid: str) -> bool | None:
     like = Like(qid=qid, user_id=g.user_sub, liked_id=qid)
-    like_item = table.get_item(
-        Key=like.key()
-    ).get("Item")
-    if like_item:
-        return True
-    
-    try:
-        table.update_item(
-            Key=Question.key(qid),
-            UpdateExpression="ADD likes :inc",
-            ExpressionAttributeValues={":inc": 1}
-        )
-        table.put_item(
-            Item=like.to_item()
-        )
-        return True
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            return False
-        raise
-
-def unlike(qid: str) -> bool:
-    like_key = Like(qid=qid, user_id=g.user_sub, liked_id=qid).key()
-    like_item = table.get_item(
-        Key=like_key
-    ).get("Item")
-    if not like_item:
-        return True
-    
-    try:
-        table.update_item(
-            Key=Question.key(qid),
-            UpdateExpression="ADD likes :dec",
-            ExpressionAttributeValues={":dec": -1},
-            ReturnValues="UPDATED_NEW"
-        )
-        table.delete_item(
-            Key=like_key
-        )
-        return True
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            return False
-        raise
+    return like_repo.like(Question.key(qid), like, tag_repo.copy_keys(qid))
+
+def unlike(qid: str) -> bool | None:
+    like = Like(qid=qid, user_id=g.user_sub, liked_id=qid)
+    return like_repo.unlike(Question.key(qid), like, tag_repo.copy_keys(qid))
 
 def get_like(qid: str) -> bool:
     like = Like(qid=qid, user_id=g.user_sub, liked_id=qid)
-    res = table.get_item(
-        Key=like.key()
-    )
-    return "Item" in res
+    return like_repo.get_like(like)
 
 
 # ---- Save ----
@@ -217,6 +202,27 @@ def get_saves(limit: int, last_key: dict[str, str] | None) -> dict:
     return res
 
 
+# ---- Viewer flags ----
+def get_viewer_flags(liked_ids: list[str], saved_qids: list[str]) -> tuple[set[str], set[str]]:
+    '''
+    Resolve which of the given questions/replies the current user liked and
+    which questions they saved, with batch_get_item over the USER#<sub>
+    partition instead of one get_item per item on screen.
+    '''
+    keys = [Like(qid="", user_id=g.user_sub, liked_id=i).key() for i in dict.fromkeys(liked_ids)]
+    keys += [Save(qid=qid, user_id=g.user_sub).key() for qid in dict.fromkeys(saved_qids)]
+
+    liked: set[str] = set()
+    saved: set[str] = set()
+    for item in _batch_get(keys, projection="SK"):
+        kind, id = item["SK"].split("#", 1) # type: ignore
+        if kind == "LIKE":
+            liked.add(id)
+        elif kind == "SAVE":
+            saved.add(id)
+    return liked, saved
+
+
 # ---- List ----
 def list_questions(limit: int, sort: str, direction: bool, last_key: dict[str, str] | None) -> dict[str, object]:
     kwargs = {
@@ -245,78 +251,51 @@ def list_questions_by_user(direction: bool, limit: int, last_key: dict[str, str]
 
     return table.query(**kwargs)
 
-def list_questions_with_tag(tag: str, direction: bool, limit: int, last_key: dict[str, str] | None) -> dict[str, object]:
-    params = {
-        "KeyConditionExpression": Key("PK").eq(f"TAG#{tag}"),
-        "Limit": limit,
-        "ScanIndexForward": direction,
-    }
-
-    if last_key:
-        params["ExclusiveStartKey"] = last_key
-
-    res = table.query(**params)
-    qids = []
-    for tag_item in res.get("Items", []):
-        tag_obj = to_tag(tag_item)
-        qids.append(tag_obj.qid) # type: ignore
-
-    ret: dict[str, object] = {
-        "Items": get_questions_by_qids(qids),
-    }
-    ret["LastEvaluatedKey"] = res.get("LastEvaluatedKey")
-
-    return ret
+def list_questions_with_tag(tags: list[str], match: str, sort: str, direction: bool, limit: int, last_key: dict | None) -> dict[str, object]:
+    return tag_repo.query(tags=tags, match=match, sort=sort, direction=direction, limit=limit, last_key=last_key)
 
 
-def search_questions(query: str, direction: bool, limit: int, last_key: dict[str, str] | None) -> dict[str, object]:
-    filter_expression = Attr("title").contains(query)
+def search_questions(query: str, direction: bool, limit: int, last_key: dict | None) -> dict[str, object]:
+    '''
+    Ranked full-text search through the inverted index in search_repo.
+    Only the postings of the query terms are read, then one batch get
+    fetches the questions on the requested page.
+    '''
+    res = search_repo.search(query=query, direction=direction, limit=limit, last_key=last_key)
+    hits: list[dict] = res["Items"] # type: ignore
+    questions = {q["qid"]: q for q in get_questions_by_qids([h["qid"] for h in hits])}
 
     items = []
-    params = {
-        "FilterExpression": filter_expression,
-        "Limit": 10,  # read more items per page so we reach QUESTION# partitions faster
-    }
-
-    if last_key:
-        params["ExclusiveStartKey"] = last_key
-
-    while True:
-        res = table.scan(**params)
-        batch = res.get("Items", [])
-        # collect only question-type items (just to be safe)
-        for it in batch:
-            if it.get("PK", "").startswith("QUESTION#"):
-                items.append(it)
-
-        # stop if we found enough or reached table end
-        if len(items) >= limit or "LastEvaluatedKey" not in res:
-            break
-
-        # continue from where we left off
-        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    for hit in hits:
+        q = questions.get(hit["qid"])
+        if q:
+            items.append(q)
 
     return {
-        "Items": items[:limit],
-        "LastEvaluatedKey": res.get("LastEvaluatedKey")
+        "Items": items,
+        "LastEvaluatedKey": res["LastEvaluatedKey"]
     }
 
 def get_questions_by_qids(qids: list[str]) -> list[dict[str, object]]:
     if not qids:
         return []
-    
-    keys = [Question.key(qid=qid) for qid in qids]
+    return _batch_get([Question.key(qid=qid) for qid in qids])
 
-    request = {table.name: {"Keys": keys}}
+def _batch_get(keys: list[dict[str, object]], projection: str | None = None) -> list[dict[str, object]]:
+    '''batch_get_item over any number of keys, 100 per request, retrying unprocessed keys.'''
     all_items: list[dict[str, object]] = []
+    for i in range(0, len(keys), 100):
+        request: dict = {table.name: {"Keys": keys[i:i + 100]}}
+        if projection:
+            request[table.name]["ProjectionExpression"] = projection
 
-    while request:
-        res = table.meta.client.batch_get_item(RequestItems=request)
+        while request:
+            res = table.meta.client.batch_get_item(RequestItems=request)
 
-        # Add retrieved items
-        all_items.extend(res["Responses"].get(table.name, []))
+            # Add retrieved items
+            all_items.extend(res["Responses"].get(table.name, []))
 
-        # Prepare next retry if any unprocessed keys
-        request = res.get("UnprocessedKeys", {})
+            # Prepare next retry if any unprocessed keys
+            request = res.get("UnprocessedKeys", {})
 
-    return all_items
\ No newline at end of file
+    return all_items
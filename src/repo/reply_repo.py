@@ -1,12 +1,40 @@
 # src/repos/reply_repo.py
 from flask import g
-from ..db import table
+from botocore.exceptions import ClientError
+from ..db import table, transact_items, cancellation_codes
+from ..models.question import Question
 from ..models.reply import Reply, to_reply
 from ..models.forum import Like
-from botocore.exceptions import ClientError
+from . import like_repo, tag_repo, thread_repo
 
-def create(reply: Reply) -> None:
-    table.put_item(Item=reply.to_item())
+def create(reply: Reply) -> bool:
+    '''
+    Write the reply and count it on the question and on the parent reply
+    in one transaction. Returns False if the question or the parent is gone.
+    '''
+    ops = [{
+        "Put": {
+            "TableName": table.name,
+            "Item": reply.to_item(),
+            "ConditionExpression": "attribute_not_exists(PK)"
+        }
+    }]
+    counts = _count_ops(reply, 1)
+    copies = tag_repo.copy_count_ops(tag_repo.copy_keys(reply.qid), "answers", 1)
+    try:
+        transact_items(ops + counts + copies)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        codes = cancellation_codes(e)
+        if "ConditionalCheckFailed" in codes[1:1 + len(counts)]:
+            return False
+        if "ConditionalCheckFailed" not in codes[1 + len(counts):]:
+            raise
+        # Tag rows gone since they were read (tags edited), count without them
+        live = [op for op, code in zip(copies, codes[1 + len(counts):]) if code != "ConditionalCheckFailed"]
+        transact_items(ops + counts + live)
+    return True
 
 def get_reply(qid: str, rid: str) -> Reply | None:
     res = table.get_item(
@@ -27,67 +55,130 @@ def edit(qid: str, rid: str, body: str = "") -> None:
     except Exception as e:
         print(f"Failed to update reply {rid}: {e}")
 
-def delete(qid: str, rid: str) -> bool:
-    try:
-        table.delete_item(
-            Key={"PK": f"QUESTION#{qid}", "SK": f"REPLY#{rid}"}
-        )
-        return True
-    except Exception as e:
-        print(f"Failed to delete reply {rid}: {e}")
-        return False
-
-# ---- Like ----
-def like(qid: str, rid: str) -> bool:
-    like = Like(qid=qid, user_id=g.user_sub, liked_id=rid)
-    like_item = table.get_item(
-        Key=like.key()
-    ).get("Item")
-    if like_item:
-        return True
-    
+def delete(reply: Reply) -> bool:
+    '''
+    Delete the reply and uncount it on the question and on the parent reply
+    (if the parent still exists) in one transaction.
+    '''
+    delete_op = {
+        "Delete": {
+            "TableName": table.name,
+            "Key": Reply.key(reply.qid, reply.rid),
+            "ConditionExpression": "attribute_exists(PK)"
+        }
+    }
+    ops = [delete_op] + _count_ops(reply, -1) + tag_repo.copy_count_ops(tag_repo.copy_keys(reply.qid), "answers", -1)
     try:
-        table.update_item(
-            Key=Reply.key(qid, rid),
-            UpdateExpression="ADD likes :inc",
-            ExpressionAttributeValues={":inc": 1}
-        )
-        table.put_item(
-            Item=like.to_item()
-        )
-        return True
+        transact_items(ops)
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            print(f"Failed to delete reply {reply.rid}: {e}")
             return False
-        raise
+        codes = cancellation_codes(e)
+        if codes[:1] == ["ConditionalCheckFailed"]:
+            return True     # already deleted
+        # The question, the parent reply or a Tag row is gone, only count where it still exists
+        ops = [delete_op] + [op for op, code in zip(ops[1:], codes[1:]) if code != "ConditionalCheckFailed"]
+        try:
+            transact_items(ops)
+        except ClientError as e:
+            print(f"Failed to delete reply {reply.rid}: {e}")
+            return False
+    thread_repo.reparent(reply.qid, reply.rid)
+    return True
+
+# ---- Reply counters ----
+# The question counts every reply in its thread ("replies", with the copy
+# "answers" that the list indexes project), a reply counts its direct replies.
+def _count_ops(reply: Reply, delta: int) -> list[dict[str, object]]:
+    ops = [{
+        "Update": {
+            "TableName": table.name,
+            "Key": Question.key(reply.qid),
+            "UpdateExpression": "ADD replies :d, answers :d",
+            "ConditionExpression": "attribute_exists(PK)",
+            "ExpressionAttributeValues": {":d": delta}
+        }
+    }]
+    if reply.parent_id and reply.parent_id != reply.qid:
+        ops.append({
+            "Update": {
+                "TableName": table.name,
+                "Key": Reply.key(reply.qid, reply.parent_id),
+                "UpdateExpression": "ADD replies :d",
+                "ConditionExpression": "attribute_exists(PK)",
+                "ExpressionAttributeValues": {":d": delta}
+            }
+        })
+    return ops
+
+def reconcile(qid: str) -> int:
+    '''
+    Recompute the reply counters of a thread from its REPLY# items and fix
+    the ones that drifted, then the counters copied on the question's Tag
+    rows. A counter that changes while the thread is read is left alone.
+    Returns the number of items fixed.
+    '''
+    items = thread_repo.read_items(qid, consistent=True)
+    question = next((i for i in items if i["SK"] == "!"), None)
+    if question is None:
+        return 0
+    replies = [i for i in items if i["SK"].startswith("REPLY#")]
+    direct: dict[str, int] = {}
+    for r in replies:
+        direct[r.get("parent", qid)] = direct.get(r.get("parent", qid), 0) + 1
+
+    fixed = 0
+    if question.get("replies", 0) != len(replies) or question.get("answers", 0) != len(replies):
+        fixed += _set_count(question, len(replies), "SET replies = :n, answers = :n")
+    for r in replies:
+        n = direct.get(thread_repo.rid_of(r), 0)
+        if r.get("replies", 0) != n:
+            fixed += _set_count(r, n, "SET replies = :n")
+    if fixed:
+        question = {**question, "replies": len(replies)}
+    return fixed + tag_repo.reconcile_copies(question)
 
-def unlike(qid: str, rid: str) -> bool:
-    like_key = Like(qid=qid, user_id=g.user_sub, liked_id=rid).key()
-    like_item = table.get_item(
-        Key=like_key
-    ).get("Item")
-    if not like_item:
-        return True
-    
+def _set_count(item: dict, n: int, expression: str) -> int:
     try:
         table.update_item(
-            Key=Reply.key(qid, rid),
-            UpdateExpression="ADD likes :dec",
-            ExpressionAttributeValues={":dec": -1},
-            ReturnValues="UPDATED_NEW"
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression=expression,
+            ConditionExpression="attribute_not_exists(replies) OR replies = :old",
+            ExpressionAttributeValues={":n": n, ":old": item.get("replies", 0)}
         )
-        table.delete_item(
-            Key=like_key
-        )
-        return True
+        return 1
     except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            return False
-        raise
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return 0
+
+def reconcile_all() -> dict[str, int]:
+    '''Reconcile every thread, walking the questions through the "new" index.'''
+    params: dict = {
+        "IndexName": "new",
+        "KeyConditionExpression": "gsi = :q",
+        "ExpressionAttributeValues": {":q": "Y"}
+    }
+    threads = fixed = 0
+    while True:
+        res = table.query(**params)
+        for item in res.get("Items", []):
+            fixed += reconcile(item["PK"].split("#", 1)[1])
+            threads += 1
+        if "LastEvaluatedKey" not in res:
+            return {"threads": threads, "fixed": fixed}
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+# ---- Like ----
+def like(qid: str, rid: str) -> bool | None:
+    like = Like(qid=qid, user_id=g.user_sub, liked_id=rid)
+    return like_repo.like(Reply.key(qid, rid), like)
+
+def unlike(qid: str, rid: str) -> bool | None:
+    like = Like(qid=qid, user_id=g.user_sub, liked_id=rid)
+    return like_repo.unlike(Reply.key(qid, rid), like)
 
 def get_like(qid: str, rid: str) -> bool:
     like = Like(qid=qid, user_id=g.user_sub, liked_id=rid)
-    res = table.get_item(
-        Key=like.key()
-    )
-    return "Item" in res
\ No newline at end of file
+    return like_repo.get_like(like)
\ No newline at end of file
@@ -0,0 +1,235 @@
+# src/repo/search_repo.py
+import math
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from ..db import table
+from ..models.search import Posting, TermEntry, SearchStats, to_posting, to_search_stats
+
+"""Inverted index over question titles and bodies (DynamoDB)."""
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2        # a title token counts as this many body tokens
+PREFIX_WEIGHT = 0.8     # terms reached through prefix expansion score a bit lower
+MAX_PREFIX_TERMS = 20   # upper bound on the terms a prefix may expand to
+MAX_PREFIX_SCAN = 1000  # dictionary entries read to pick the most frequent of them
+MAX_TERM_LENGTH = 40
+DF_WORKERS = 8          # parallel document frequency updates per write
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i",
+    "in", "is", "it", "my", "of", "on", "or", "that", "the", "to", "was", "what",
+    "when", "with"
+}
+
+# ---- Tokenizing ----
+def tokenize(text: str) -> list[str]:
+    return [
+        tok for tok in _TOKEN_RE.findall(text.lower())
+        if tok not in _STOPWORDS and len(tok) <= MAX_TERM_LENGTH
+    ]
+
+def term_frequencies(title: str, body: str) -> tuple[dict[str, int], int]:
+    '''
+    Weighted term frequencies of a question and its weighted length.
+    Title tokens are boosted by counting them TITLE_WEIGHT times.
+    '''
+    counts: Counter[str] = Counter()
+    for tok in tokenize(title):
+        counts[tok] += TITLE_WEIGHT
+    for tok in tokenize(body):
+        counts[tok] += 1
+    return dict(counts), sum(counts.values())
+
+
+# ---- Index maintenance ----
+def index_question(qid: str, title: str, body: str) -> None:
+    tfs, dl = term_frequencies(title, body)
+    _put_postings(qid, tfs, dl)
+    _count_terms(tfs, 1)
+    _update_stats(docs=1, tokens=dl)
+
+def unindex_question(qid: str, title: str, body: str) -> None:
+    tfs, dl = term_frequencies(title, body)
+    with table.batch_writer() as batch:
+        for term in tfs:
+            batch.delete_item(Key=Posting(term=term, qid=qid, tf=0, dl=0).key())
+    _count_terms(tfs, -1)
+    _update_stats(docs=-1, tokens=-dl)
+
+def reindex_question(qid: str, old_title: str, old_body: str, title: str, body: str) -> None:
+    old_tfs, old_dl = term_frequencies(old_title, old_body)
+    tfs, dl = term_frequencies(title, body)
+    if old_tfs == tfs:
+        return
+    removed = old_tfs.keys() - tfs.keys()
+    with table.batch_writer() as batch:
+        for term in removed:
+            batch.delete_item(Key=Posting(term=term, qid=qid, tf=0, dl=0).key())
+    # Every remaining posting carries the document length, so rewrite them all
+    _put_postings(qid, tfs, dl)
+    _count_terms(tfs.keys() - old_tfs.keys(), 1)
+    _count_terms(removed, -1)
+    _update_stats(docs=0, tokens=dl - old_dl)
+
+def _put_postings(qid: str, tfs: dict[str, int], dl: int) -> None:
+    with table.batch_writer() as batch:
+        for term, tf in tfs.items():
+            batch.put_item(Item=Posting(term=term, qid=qid, tf=tf, dl=dl).to_item())
+
+# botocore clients are thread-safe, boto3 resources are not: the workers
+# go through the table's client.
+_df_pool = ThreadPoolExecutor(max_workers=DF_WORKERS, thread_name_prefix="search-df")
+
+def _count_terms(terms, delta: int) -> None:
+    '''Adjust the document frequency of every term, DF_WORKERS requests at a time.'''
+    # list() waits for all of them and raises the first error
+    list(_df_pool.map(lambda term: _count_term(term, delta), terms))
+
+def _count_term(term: str, delta: int) -> None:
+    '''
+    Adjust the document frequency of a dictionary entry. An entry that
+    drops to zero is deleted once its posting list is really empty;
+    otherwise (entries written before df was kept) df is recounted.
+    '''
+    key = TermEntry(term=term).key()
+    client = table.meta.client
+    res = client.update_item(
+        TableName=table.name,
+        Key=key,
+        UpdateExpression="ADD df :d",
+        ExpressionAttributeValues={":d": delta},
+        ReturnValues="UPDATED_NEW"
+    )
+    if delta > 0 or res["Attributes"]["df"] > 0:
+        return
+    postings = client.query(TableName=table.name, KeyConditionExpression=Key("PK").eq(f"TERM#{term}"), Select="COUNT")["Count"]
+    if postings == 0:
+        try:
+            # Unless the term was indexed again meanwhile
+            client.delete_item(TableName=table.name, Key=key, ConditionExpression="df <= :z", ExpressionAttributeValues={":z": 0})
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    else:
+        client.update_item(TableName=table.name, Key=key, UpdateExpression="SET df = :d", ExpressionAttributeValues={":d": postings})
+
+def _update_stats(docs: int, tokens: int) -> None:
+    table.update_item(
+        Key=SearchStats.key(),
+        UpdateExpression="ADD docs :d, tokens :t",
+        ExpressionAttributeValues={":d": docs, ":t": tokens}
+    )
+
+def get_stats() -> SearchStats:
+    res = table.get_item(Key=SearchStats.key())
+    return to_search_stats(res.get("Item"))
+
+
+# ---- Query ----
+def expand_prefix(prefix: str) -> list[str]:
+    '''
+    Return the MAX_PREFIX_TERMS indexed terms starting with prefix that occur
+    in the most questions (among the first MAX_PREFIX_SCAN entries).
+    '''
+    if len(prefix) < 2:
+        return [prefix]
+    params: dict = {
+        "KeyConditionExpression": Key("PK").eq(f"TERMS#{prefix[:2]}") & Key("SK").begins_with(prefix),
+        "ProjectionExpression": "SK, df"
+    }
+    entries: list[dict] = []
+    while len(entries) < MAX_PREFIX_SCAN:
+        res = table.query(**params)
+        entries.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            break
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    live = [e for e in entries if e.get("df", 1) > 0]
+    live.sort(key=lambda e: (-e.get("df", 1), e["SK"]))
+    return [e["SK"] for e in live[:MAX_PREFIX_TERMS]]
+
+def get_postings(term: str) -> list[Posting]:
+    params = {
+        "KeyConditionExpression": Key("PK").eq(f"TERM#{term}"),
+        "ProjectionExpression": "PK, SK, tf, dl",
+    }
+    postings: list[Posting] = []
+    while True:
+        res = table.query(**params)
+        for item in res.get("Items", []):
+            postings.append(to_posting(item)) # type: ignore
+        if "LastEvaluatedKey" not in res:
+            return postings
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def query_terms(query: str, prefix: bool = True) -> list[dict[str, float]]:
+    '''
+    Resolve a user query into groups of weighted index terms, one group per
+    query token. The last token is treated as a prefix so results show up
+    while typing; its expansions join its group with a lower weight.
+    '''
+    tokens = list(dict.fromkeys(tokenize(query)))
+    groups: list[dict[str, float]] = [{tok: 1.0} for tok in tokens]
+    if prefix and tokens:
+        last = groups[-1]
+        for term in expand_prefix(tokens[-1]):
+            last.setdefault(term, PREFIX_WEIGHT)
+    return groups
+
+def bm25(tf: int, dl: int, df: int, docs: int, avgdl: float) -> float:
+    idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+    norm = K1 * (1 - B + B * dl / avgdl) if avgdl else K1
+    return idf * tf * (K1 + 1) / (tf + norm)
+
+def rank(groups: list[dict[str, float]], postings: dict[str, list[Posting]], stats: SearchStats) -> dict[str, float]:
+    '''
+    BM25 score per question. Each group counts as a single query term: its
+    document frequency covers every question matching any of its terms and
+    a question scores with its best term in the group.
+    '''
+    docs = max(stats.docs, 1)
+    avgdl = stats.tokens / docs
+    scores: dict[str, float] = {}
+    for group in groups:
+        matches = [(p, weight) for term, weight in group.items() for p in postings.get(term, [])]
+        df = len({p.qid for p, _ in matches})
+        best: dict[str, float] = {}
+        for p, weight in matches:
+            best[p.qid] = max(best.get(p.qid, 0.0), weight * bm25(p.tf, p.dl, df, docs, avgdl))
+        for qid, score in best.items():
+            scores[qid] = scores.get(qid, 0.0) + score
+    return {qid: round(score, 6) for qid, score in scores.items()}
+
+def search(query: str, direction: bool, limit: int, last_key: dict | None) -> dict[str, object]:
+    '''
+    Ranked search over the index. Returns the matching qids of one page in
+    rank order together with the (score, qid) of the last hit to resume
+    from (None at the end). direction=False returns the best matches first.
+    '''
+    groups = query_terms(query)
+    postings = {term: get_postings(term) for group in groups for term in group}
+    if not any(postings.values()):
+        return {"Items": [], "LastEvaluatedKey": None}
+
+    scores = rank(groups, postings, get_stats())
+    sign = 1 if direction else -1
+    ordered = sorted(scores.items(), key=lambda kv: (sign * kv[1], kv[0]))
+
+    if last_key:
+        start = (sign * float(last_key["score"]), str(last_key["qid"]))
+        ordered = [kv for kv in ordered if (sign * kv[1], kv[0]) > start]
+
+    page = ordered[:limit]
+    cursor = None
+    if len(ordered) > limit and page:
+        cursor = {"score": page[-1][1], "qid": page[-1][0]}
+    return {
+        "Items": [{"qid": qid, "score": score} for qid, score in page],
+        "LastEvaluatedKey": cursor
+    }
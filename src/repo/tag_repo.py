@@ -0,0 +1,354 @@
+# src/repo/tag_repo.py
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from ..db import table, transact_items
+from ..models.question import Question, to_question
+from ..models.forum import Tag, TagCount, to_tag, to_tag_count
+
+"""Tag rows, tag counters and the tag query engine (DynamoDB)."""
+
+# match=all filters the rows of one tag partition, so a sparse intersection
+# reads the partition in pages of max(limit * INTERSECTION_FANOUT,
+# INTERSECTION_MIN_PAGE) rows and stops after INTERSECTION_MAX_PAGES of them,
+# returning a shorter page and a cursor to go on from.
+INTERSECTION_FANOUT = 10
+INTERSECTION_MIN_PAGE = 100
+INTERSECTION_MAX_PAGES = 5
+
+# ---- Tag rows ----
+def row_ops(q: Question, tags: list[str], delta: int) -> list[dict[str, object]]:
+    '''
+    Transaction operations that add (delta=1) or remove (delta=-1) the Tag
+    rows of q for the given tags and adjust their counters.
+    '''
+    ops: list[dict[str, object]] = []
+    for tag in dict.fromkeys(tags):
+        t = Tag.from_question(q, tag)
+        if delta > 0:
+            ops.append({"Put": {"TableName": table.name, "Item": t.to_item()}})
+        else:
+            ops.append({"Delete": {"TableName": table.name, "Key": t.key()}})
+        ops.append(count_update(tag, delta))
+    return ops
+
+def refresh_ops(q: Question, tags: list[str]) -> list[dict[str, object]]:
+    '''
+    Transaction operations copying the title and tag list of q onto its
+    existing Tag rows for the given tags. Counters are left alone.
+    '''
+    return [{
+        "Update": {
+            "TableName": table.name,
+            "Key": Tag.from_question(q, tag).key(),
+            "UpdateExpression": "SET title = :t, tags = :g",
+            "ConditionExpression": "attribute_exists(PK)",
+            "ExpressionAttributeValues": {":t": q.title, ":g": q.tags}
+        }
+    } for tag in dict.fromkeys(tags)]
+
+# Tag rows copy the like and reply counts of their question so tag pages
+# can show and order by them. The copies move in the same transaction as
+# the question's counters; a copy that is gone (the tags were edited
+# meanwhile) fails its condition and the caller retries without it.
+def copy_keys(qid: str) -> list[dict[str, object]]:
+    '''Keys of the Tag rows of a question, from one projected read.'''
+    res = table.get_item(
+        Key=Question.key(qid),
+        ProjectionExpression="tags, #d",
+        ExpressionAttributeNames={"#d": "date"}
+    )
+    item = res.get("Item")
+    if not item:
+        return []
+    return [Tag(tag=tag, qid=qid, created_at=item["date"]).key() for tag in dict.fromkeys(item.get("tags", []))]
+
+def copy_count_ops(keys: list[dict[str, object]], attribute: str, delta: int) -> list[dict[str, object]]:
+    return [{
+        "Update": {
+            "TableName": table.name,
+            "Key": key,
+            "UpdateExpression": f"ADD {attribute} :d",
+            "ConditionExpression": "attribute_exists(PK)",
+            "ExpressionAttributeValues": {":d": delta}
+        }
+    } for key in keys]
+
+def reconcile_copies(question: dict) -> int:
+    '''
+    Set the counters on the Tag rows of a question item to its own. A copy
+    that changes meanwhile is left alone. Returns the number of rows fixed.
+    '''
+    q = to_question(question)
+    if q is None or not q.tags:
+        return 0
+    keys = [Tag.from_question(q, tag).key() for tag in dict.fromkeys(q.tags)]
+    fixed = 0
+    for item in _get_items(keys):
+        likes, answers = int(item.get("likes", 0)), int(item.get("answers", 0))
+        if (likes, answers) == (q.likes, q.reply_count):
+            continue
+        try:
+            table.update_item(
+                Key={"PK": item["PK"], "SK": item["SK"]},
+                UpdateExpression="SET likes = :l, answers = :a",
+                ConditionExpression="likes = :ol AND answers = :oa",
+                ExpressionAttributeValues={":l": q.likes, ":a": q.reply_count, ":ol": likes, ":oa": answers}
+            )
+            fixed += 1
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+    return fixed
+
+def _get_items(keys: list[dict[str, object]]) -> list[dict]:
+    request: dict = {table.name: {"Keys": keys, "ConsistentRead": True}}
+    items: list[dict] = []
+    while request:
+        res = table.meta.client.batch_get_item(RequestItems=request)
+        items.extend(res["Responses"].get(table.name, []))
+        request = res.get("UnprocessedKeys", {})
+    return items
+
+def migrate_rows(dry_run: bool = False) -> dict[str, int]:
+    '''
+    Rewrite Tag rows keyed by date alone (written before "<date>#<qid>" sort
+    keys) as full copies of their question, then recount the tags touched.
+    Rows of deleted questions are dropped. Meant to run while the forum is
+    quiet: the recount overwrites counters changed during the run.
+    '''
+    params: dict = {
+        "FilterExpression": Attr("PK").begins_with("TAG#") & Attr("tag_gsi").not_exists()
+    }
+    scanned = migrated = dropped = 0
+    touched: set[str] = set()
+    while True:
+        res = table.scan(**params)
+        for item in res.get("Items", []):
+            scanned += 1
+            tag = item["PK"].split("#", 1)[1]
+            res_q = table.get_item(Key=Question.key(item.get("qid", "")), ConsistentRead=True) if item.get("qid") else {}
+            q = to_question(res_q.get("Item"))
+            if q is not None and tag in q.tags:
+                migrated += 1
+            else:
+                dropped += 1
+            touched.add(tag)
+            if dry_run:
+                continue
+            ops: list[dict[str, object]] = [{"Delete": {"TableName": table.name, "Key": {"PK": item["PK"], "SK": item["SK"]}}}]
+            if q is not None and tag in q.tags:
+                ops.append({"Put": {"TableName": table.name, "Item": Tag.from_question(q, tag).to_item()}})
+            transact_items(ops)
+        if "LastEvaluatedKey" not in res:
+            break
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+    if not dry_run:
+        for tag in touched:
+            _recount(tag)
+    return {"scanned": scanned, "migrated": migrated, "dropped": dropped, "tags": len(touched)}
+
+def _recount(tag: str) -> None:
+    params: dict = {"KeyConditionExpression": Key("PK").eq(f"TAG#{tag}"), "Select": "COUNT"}
+    count = 0
+    while True:
+        res = table.query(**params)
+        count += res["Count"]
+        if "LastEvaluatedKey" not in res:
+            break
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    table.update_item(
+        Key=TagCount.key(tag),
+        UpdateExpression="SET gsi = :g, likes = :n",
+        ExpressionAttributeValues={":g": TagCount.GSI, ":n": count}
+    )
+
+
+# ---- Tag counters ----
+def count_update(tag: str, delta: int) -> dict[str, object]:
+    return {
+        "Update": {
+            "TableName": table.name,
+            "Key": TagCount.key(tag),
+            "UpdateExpression": "SET gsi = :g ADD likes :d",
+            "ExpressionAttributeValues": {":g": TagCount.GSI, ":d": delta}
+        }
+    }
+
+def list_popular_tags(limit: int) -> list[TagCount]:
+    '''
+    Most used tags, read from the tag counters through the popular index.
+    '''
+    res = table.query(
+        IndexName="popular",
+        KeyConditionExpression=Key("gsi").eq(TagCount.GSI) & Key("likes").gt(0),
+        ScanIndexForward=False,
+        Limit=limit
+    )
+    return [to_tag_count(item) for item in res.get("Items", [])]
+
+def get_counts(tags: list[str]) -> dict[str, int]:
+    keys = [TagCount.key(tag) for tag in dict.fromkeys(tags)]
+    request: dict = {table.name: {"Keys": keys}}
+    counts = {tag: 0 for tag in tags}
+    while request:
+        res = table.meta.client.batch_get_item(RequestItems=request)
+        for item in res["Responses"].get(table.name, []):
+            counts[item["SK"]] = int(item.get("likes", 0))
+        request = res.get("UnprocessedKeys", {})
+    return counts
+
+
+# ---- Query engine ----
+def query(tags: list[str], match: str, sort: str, direction: bool, limit: int, last_key: dict | None) -> dict[str, object]:
+    '''
+    Questions carrying all (match="all") or any (match="any") of the tags,
+    ordered by recency (sort="new") or likes (sort="popular").
+    LastEvaluatedKey holds the position to resume every tag partition read
+    from (see _intersection and _union).
+    '''
+    cursor = last_key or {}
+    if match == "any" and len(tags) > 1:
+        items, cursor = _union(tags, sort, direction, limit, cursor)
+    else:
+        items, cursor = _intersection(tags, sort, direction, limit, cursor)
+    return {
+        "Items": [_list_item(i) for i in items],
+        "LastEvaluatedKey": cursor or None
+    }
+
+def _query_params(tag: str, sort: str, direction: bool, limit: int) -> dict[str, object]:
+    if sort == "popular":
+        return {
+            "IndexName": "tag_popular",
+            "KeyConditionExpression": Key("tag_gsi").eq(f"TAG#{tag}"),
+            "ScanIndexForward": direction,
+            "Limit": limit
+        }
+    # The base table sorts a tag partition by "<date>#<qid>"
+    return {
+        "KeyConditionExpression": Key("PK").eq(f"TAG#{tag}"),
+        "ScanIndexForward": direction,
+        "Limit": limit
+    }
+
+def _key_of(item: dict, sort: str) -> dict[str, object]:
+    key = {"PK": item["PK"], "SK": item["SK"]}
+    if sort == "popular":
+        key.update(tag_gsi=item["tag_gsi"], likes=item["likes"])
+    return key
+
+def _sort_key(item: dict, sort: str) -> tuple:
+    if sort == "popular":
+        return (item.get("likes", 0), item["SK"])
+    return (item["SK"],)
+
+def _intersection(tags: list[str], sort: str, direction: bool, limit: int, cursor: dict) -> tuple[list[dict], dict]:
+    '''
+    Walk the partition of the least used tag and keep the rows whose
+    denormalized tag list contains the other tags.
+    '''
+    tags = list(dict.fromkeys(tags))
+    if cursor:
+        # Keep walking the partition chosen for the first page
+        driver = next(iter(cursor))
+    elif len(tags) > 1:
+        counts = get_counts(tags)
+        driver = min(tags, key=lambda t: counts[t])
+    else:
+        driver = tags[0]
+    others = [t for t in tags if t != driver]
+
+    page_size = max(limit * INTERSECTION_FANOUT, INTERSECTION_MIN_PAGE) if others else limit
+    params = _query_params(driver, sort, direction, page_size)
+    if others:
+        cond = Attr("tags").contains(others[0])
+        for tag in others[1:]:
+            cond = cond & Attr("tags").contains(tag)
+        params["FilterExpression"] = cond
+    if cursor.get(driver):
+        params["ExclusiveStartKey"] = cursor[driver]
+
+    items: list[dict] = []
+    for _ in range(INTERSECTION_MAX_PAGES):
+        res = table.query(**params)
+        for item in res.get("Items", []):
+            items.append(item)
+            if len(items) == limit:
+                return items, {driver: _key_of(item, sort)}
+        if "LastEvaluatedKey" not in res:
+            return items, {}
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    # Read budget spent, the rest of the partition is left to the next page
+    return items, {driver: params["ExclusiveStartKey"]}
+
+def _union(tags: list[str], sort: str, direction: bool, limit: int, cursor: dict) -> tuple[list[dict], dict]:
+    '''
+    k-way merge of the tag partitions. Every partition contributes at most
+    `limit` rows, which is enough to decide the first `limit` of the merge.
+    The cursor holds the position of every partition still to read and
+    the sort key ((likes,) "<date>#<qid>") of the last row returned; rows
+    at or before it are skipped, so a question under several of the tags
+    is returned once, on whichever page reaches its first row.
+    '''
+    tags = list(dict.fromkeys(tags))
+    positions_in: dict = cursor.get("tags", {})
+    boundary = tuple(cursor["after"]) if cursor.get("after") else None
+    # A tag missing from a non-empty cursor was exhausted on an earlier page
+    live = [t for t in tags if not cursor or t in positions_in]
+
+    streams: dict[str, list[dict]] = {}
+    more: dict[str, bool] = {}
+    for tag in live:
+        params = _query_params(tag, sort, direction, limit)
+        if positions_in.get(tag):
+            params["ExclusiveStartKey"] = positions_in[tag]
+        res = table.query(**params)
+        streams[tag] = res.get("Items", [])
+        more[tag] = "LastEvaluatedKey" in res
+
+    merged = [(item, tag) for tag in live for item in streams[tag]]
+    merged.sort(key=lambda it: _sort_key(it[0], sort), reverse=not direction)
+
+    def returned_before(item: dict) -> bool:
+        if boundary is None:
+            return False
+        key = _sort_key(item, sort)
+        return key <= boundary if direction else key >= boundary
+
+    items: list[dict] = []
+    seen: set[str] = set()
+    consumed: dict[str, int] = {tag: 0 for tag in live}
+    positions: dict[str, dict | None] = {tag: positions_in.get(tag) for tag in live}
+    for item, tag in merged:
+        qid = to_tag(item).qid # type: ignore
+        if qid not in seen and not returned_before(item):
+            if len(items) == limit:
+                break
+            items.append(item)
+            seen.add(qid)
+        consumed[tag] += 1
+        positions[tag] = _key_of(item, sort)
+
+    next_positions: dict = {}
+    for tag in live:
+        if consumed[tag] < len(streams[tag]) or more[tag]:
+            next_positions[tag] = positions[tag]
+    if not next_positions:
+        return items, {}
+    last = list(_sort_key(items[-1], sort)) if items else cursor.get("after")
+    return items, {"tags": next_positions, "after": last}
+
+def _list_item(item: dict) -> dict[str, object]:
+    # Same shape as the items of the other question lists
+    t = to_tag(item)
+    return {
+        **Question.key(t.qid), # type: ignore
+        "qid": t.qid, # type: ignore
+        "title": t.title, # type: ignore
+        "author": t.author_id, # type: ignore
+        "tags": t.tags, # type: ignore
+        "date": t.created_at, # type: ignore
+        "likes": t.likes, # type: ignore
+        "answers": t.reply_count # type: ignore
+    }
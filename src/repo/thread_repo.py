@@ -0,0 +1,150 @@
+# src/repo/thread_repo.py
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from ..db import table
+from ..models.reply import Reply
+
+"""
+Question threads (DynamoDB).
+A thread is the question item ("!") and its replies ("REPLY#<rid>") in the
+QUESTION#<qid> partition. Jobs that need the whole thread read the
+partition page by page; clients page through the reply tree by windows.
+"""
+
+def read_items(qid: str, consistent: bool = False) -> list[dict]:
+    '''All items of the thread partition, following LastEvaluatedKey.'''
+    params: dict = {
+        "KeyConditionExpression": Key("PK").eq(f"QUESTION#{qid}"),
+        "ConsistentRead": consistent
+    }
+    items: list[dict] = []
+    while True:
+        res = table.query(**params)
+        items.extend(res.get("Items", []))
+        if "LastEvaluatedKey" not in res:
+            return items
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def rid_of(item: dict) -> str:
+    return item["SK"].split("#", 1)[1]
+
+def qid_of(item: dict) -> str:
+    return item["PK"].split("#", 1)[1]
+
+# ---- Windows ----
+# Replies are read through the sparse "thread" index: thread_parent is
+# "<qid>#<parent id>" and thread_pos "<date>#<rid>", so the replies to one
+# parent come oldest first and a window is one query with a Limit, however
+# large the thread. Replies whose parent was deleted are moved to the top
+# level (reparent).
+
+# The children of the replies in a window are queried in parallel, at
+# most THREAD_CHILD_WORKERS at a time, through the table's client
+# (botocore clients are thread-safe, boto3 resources are not).
+THREAD_CHILD_WORKERS = 8
+_child_pool = ThreadPoolExecutor(max_workers=THREAD_CHILD_WORKERS, thread_name_prefix="thread-children")
+
+def replies_to(qid: str, parent: str, after: dict | None, limit: int) -> tuple[list[dict], bool]:
+    '''
+    Up to limit replies to parent following the position after
+    ({"date", "rid"}), and whether more follow.
+    '''
+    params: dict = {
+        "TableName": table.name,
+        "IndexName": "thread",
+        "KeyConditionExpression": Key("thread_parent").eq(f"{qid}#{parent}"),
+        "Limit": limit + 1
+    }
+    if after:
+        rid = after.get("rid", "")
+        params["ExclusiveStartKey"] = {
+            **Reply.key(qid, rid),
+            "thread_parent": f"{qid}#{parent}",
+            "thread_pos": f"{after.get('date', '')}#{rid}"
+        }
+    items: list[dict] = []
+    while True:
+        res = table.meta.client.query(**params)
+        items.extend(res.get("Items", []))
+        if len(items) > limit or "LastEvaluatedKey" not in res:
+            return items[:limit], len(items) > limit
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+def window(qid: str, parent: str, after: dict | None, limit: int, k: int) -> dict[str, object]:
+    '''
+    Up to `limit` replies to `parent` following the position `after`,
+    each with its first k replies nested under "children". Every node
+    carries "childCount" so clients can page deeper with window().
+    LastEvaluatedKey is the position of the last reply returned.
+    '''
+    page, more = replies_to(qid, parent, after, limit)
+    nodes = [_node(r) for r in page]
+    # Leaves need no query for their children
+    branches = [n for n in nodes if k and n["childCount"]]
+    children = _child_pool.map(lambda n: replies_to(qid, rid_of(n), None, k)[0], branches)
+    for node in nodes:
+        node["children"] = []
+    for node, replies in zip(branches, children):
+        node["children"] = [_node(c) for c in replies]
+
+    last = None
+    if more and page:
+        last = {"date": page[-1].get("date", ""), "rid": rid_of(page[-1])}
+    return {"Items": nodes, "LastEvaluatedKey": last}
+
+def _node(item: dict) -> dict:
+    return {**item, "childCount": int(item.get("replies", 0))}
+
+def reparent(qid: str, rid: str) -> int:
+    '''Move the replies to a deleted reply to the top level of the thread.'''
+    moved = 0
+    while True:
+        children, more = replies_to(qid, rid, None, 100)
+        for c in children:
+            _set_thread_parent(c, qid)
+            moved += 1
+        if not more:
+            return moved
+
+def _set_thread_parent(item: dict, parent: str, pos: str | None = None) -> bool:
+    values: dict[str, str] = {":p": f"{qid_of(item)}#{parent}"}
+    expression = "SET thread_parent = :p"
+    if pos is not None:
+        values[":o"] = pos
+        expression += ", thread_pos = :o"
+    try:
+        table.update_item(
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression=expression,
+            ConditionExpression="attribute_exists(PK)",     # deleted meanwhile
+            ExpressionAttributeValues=values
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+
+def migrate_replies(dry_run: bool = False) -> dict[str, int]:
+    '''
+    Add thread_parent/thread_pos to replies written before the thread index.
+    Replies whose parent reply is gone go to the top level.
+    '''
+    params: dict = {
+        "FilterExpression": Attr("SK").begins_with("REPLY#") & Attr("thread_parent").not_exists()
+    }
+    scanned = migrated = 0
+    while True:
+        res = table.scan(**params)
+        for item in res.get("Items", []):
+            scanned += 1
+            qid = qid_of(item)
+            parent = item.get("parent", qid)
+            if parent != qid and "Item" not in table.get_item(Key=Reply.key(qid, parent), ProjectionExpression="PK"):
+                parent = qid
+            if dry_run or _set_thread_parent(item, parent, f"{item.get('date', '')}#{rid_of(item)}"):
+                migrated += 1
+        if "LastEvaluatedKey" not in res:
+            return {"scanned": scanned, "migrated": migrated}
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
@@ -1,52 +1,91 @@
 # src/routes/bibi_route.py
-from random import random
-from flask import Blueprint, request, jsonify
-import boto3
+import hashlib
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
+import json
 import os
+from ..auth import cognito_auth_optional
+from ..service.bibi_service import session_id
+from ..service.tip_service import seconds_until_tomorrow
 
 bp = Blueprint("bibi", __name__)
 
-# Initialize Bedrock client
-client = boto3.client("bedrock-agent-runtime", region_name="us-east-1")
-
-# Your existing agent info
-AGENT_ID = "MDX1YASPJE"
-AGENT_ALIAS_ID = "GEYSFL3PRM"
-
 @bp.route("/bibi", methods=["POST"])
+@cognito_auth_optional
 def ask_bibi():
+    '''
+    Expected body:
+        {
+            message: String,
+            sessionId: String,  // optional, conversation to continue (default: the caller's own)
+            stateless: Boolean, // optional, answer without conversation context (shared cache)
+            stream: Boolean     // optional, same as sending "Accept: text/event-stream"
+        }
+    Streaming responses are server-sent events, one per agent chunk:
+        data: {"text": String}
+    followed by "event: done" (or "event: error" with {"error": String}).
+    '''
     try:
         data = request.get_json()
         message = data.get("message", "")
-        session_id = data.get("sessionId", "session-001")
-
-        response = client.invoke_agent(
-            agentId=AGENT_ID,
-            agentAliasId=AGENT_ALIAS_ID,
-            sessionId=session_id,
-            inputText=message,
-        )
+        requested = data.get("sessionId")
+        stateless = bool(data.get("stateless", False))
+        session = None if stateless else session_id(g.user_sub, requested)
 
-        full_response = ""
-        for event in response["completion"]:
-            if "chunk" in event:
-                text_piece = event["chunk"]["bytes"].decode("utf-8")
-                full_response += text_piece
+        svc = current_app.config["BIBI_SERVICE"]
+        if data.get("stream") or "text/event-stream" in request.headers.get("Accept", ""):
+            return Response(
+                stream_with_context(_sse(svc.stream(message, session, stateless))),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
 
-        return jsonify({"reply": full_response.strip()})
+        return jsonify({"reply": svc.ask(message, session, stateless)})
 
     except Exception as e:
         print("Error invoking Bibi:", e)
         return jsonify({"error": str(e)}), 500
 
+def _sse(pieces):
+    '''
+    Forward answer pieces as server-sent events.
+    The generator is pulled by the server one event at a time, so the next
+    chunk is only read from Bedrock once the previous one was written to the
+    client (no unbounded buffering). When the client goes away the server
+    closes the generator, which closes the agent stream.
+    '''
+    try:
+        for piece in pieces:
+            yield f"data: {json.dumps({'text': piece})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except GeneratorExit:
+        raise   # client disconnected
+    except Exception as e:
+        print("Error streaming Bibi:", e)
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    finally:
+        pieces.close()
+
 @bp.route("/bibi/daily-tip", methods=["GET"])
+@cognito_auth_optional
 def get_daily_tip():
-    tips = [
-        "Take a few minutes today just for yourself — a calm parent helps a calm child.",
-        "Children learn more from what you do than what you say.",
-        "Consistency helps kids feel safe — keep routines steady where possible.",
-        "Praise effort, not just results — it builds resilience.",
-        "Don’t forget: no parent is perfect, but every day is a chance to connect.",
-    ]
-    return jsonify({"text": random.choice(tips)})
+    '''
+    Expected query parameters (optional):
+        age: Int    // child age in years, picks a tip for that age
+    The tip changes at midnight UTC. Signed-in users get their own tip of
+    the day, so their responses are private; anonymous ones are cacheable
+    by CDNs. Send If-None-Match with the ETag to get 304 Not Modified.
+    '''
+    age = request.args.get("age", type=int)
+    svc = current_app.config["TIP_SERVICE"]
+    tip = svc.tip_of_the_day(age=age, user_sub=g.user_sub)
 
+    etag = hashlib.sha256(f"{tip['id']}:{tip['date']}:{tip['bucket']}".encode()).hexdigest()[:16]
+    scope = "private" if g.user_sub else "public"
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"{scope}, max-age={seconds_until_tomorrow()}",
+        "Vary": "Authorization"
+    }
+    if request.if_none_match.contains(etag):
+        return "", 304, headers
+    return jsonify({"text": tip["text"], "id": tip["id"], "date": tip["date"]}), 200, headers
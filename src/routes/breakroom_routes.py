@@ -1,74 +1,103 @@
-from flask import Blueprint, jsonify, request
-import os, requests, time
+# src/routes/breakroom_routes.py
+import re
+import time
+from flask import Blueprint, g, request, jsonify
+from ..auth import cognito_auth_required, cognito_auth_optional
+from ..service import breakroom_service as svc
+from ..service import name_service
 
 bp = Blueprint("breakrooms", __name__)
-DAILY_API_KEY = os.getenv("DAILY_API_KEY")
-DAILY_API_URL = "https://api.daily.co/v1/rooms"
 
-def _headers():
-    return {"Authorization": f"Bearer {DAILY_API_KEY}"}
+# Rooms live in our table; Daily is only called to create and end a room
+# and to issue meeting tokens.
+_ERRORS = {
+    "room_not_found": 404,
+    "room_not_active": 409,
+    "forbidden": 403,
+    "invalid_cursor": 400
+}
 
 # ---------- List Breakrooms ----------
 @bp.route("/breakrooms", methods=["GET"])
+@cognito_auth_optional
 def list_breakrooms():
+    '''
+    Expected query parameters (optional):
+        mine: "true" | "false"  // the signed-in user's rooms (newest first) instead of
+                                // the active rooms (soonest to expire first)
+        limit: Number           // 1-50, default 20
+        after: String           // endCursor of the previous page
+    '''
+    mine = request.args.get("mine", "false").lower() == "true"
+    if mine and not g.user_sub:
+        return jsonify({"message": "Missing Bearer token"}), 401
     try:
-        resp = requests.get(DAILY_API_URL, headers=_headers())
-        return jsonify(resp.json())
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return {"error": "validation"}, 400
+    if not 0 < limit <= svc.MAX_LIST_LIMIT:
+        return {"error": "validation"}, 400
+    res = svc.list_breakrooms(owner_sub=g.user_sub if mine else None, limit=limit, last_key=request.args.get("after"))
+    if "error" in res:
+        return res, _ERRORS[res["error"]] # type: ignore
+    return res, 200
 
 # ---------- Create Breakroom ----------
 @bp.route("/breakrooms", methods=["POST"])
+@cognito_auth_required
 def create_breakroom():
-    import os, re, time, requests
-    from flask import request, jsonify
-
-    try:
-        data = request.get_json() or {}
-        print("Received data:", data)
-
-        DAILY_API_KEY = os.getenv("DAILY_API_KEY")
-        if not DAILY_API_KEY:
-            print("DAILY_API_KEY missing or not loaded")
-            return jsonify({"error": "Missing API key"}), 500
-
-        raw_name = data.get("name", f"room_{int(time.time())}")
-        name = re.sub(r"[^A-Za-z0-9_-]", "-", raw_name)
-        description = data.get("description", "")
-
-        payload = {
-            "name": name,
-            "privacy": "public",
-            "properties": {
-                "enable_chat": True,
-                "start_audio_off": False,
-                "start_video_off": True,
-                "exp": int(time.time()) + 3600,
-            },
-        }
-
-        headers = {
-            "Authorization": f"Bearer {DAILY_API_KEY}",
-            "Content-Type": "application/json",
+    '''
+    Expected body (each attribute optional):
+        {
+            name: String,
+            description: String
         }
+    '''
+    data = request.get_json(silent=True) or {}
+    raw_name = data.get("name", f"room_{int(time.time())}")
+    name = re.sub(r"[^A-Za-z0-9_-]", "-", raw_name)
+    try:
+        room = svc.create_breakroom(
+            g.user_sub,
+            owner_name=name_service.resolver.resolve(g.user_sub),
+            name=name,
+            description=data.get("description", "")
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 502
+    return room, 201
 
-        print("Payload sent to Daily:", payload)
-        resp = requests.post("https://api.daily.co/v1/rooms", json=payload, headers=headers)
-        print("Daily response:", resp.status_code, resp.text)
-
-        # Handle Daily errors cleanly
-        if resp.status_code != 200:
-            return jsonify({"error": resp.json()}), resp.status_code
+# ---------- Get Breakroom ----------
+@bp.route("/breakrooms/<room_id>", methods=["GET"])
+def get_breakroom(room_id):
+    room = svc.get_breakroom(room_id)
+    if not room:
+        return {"error": "room_not_found"}, 404
+    return room, 200
 
-        room = resp.json()
-        return jsonify({
-            "id": room["name"],
-            "name": room["name"],
-            "url": room["url"],
-            "description": description,
-        })
+# ---------- Join Breakroom ----------
+@bp.route("/breakrooms/<room_id>/token", methods=["POST"])
+@cognito_auth_required
+def issue_token(room_id):
+    '''
+    Meeting token for the signed-in user, needed to join the (private) room.
+    '''
+    try:
+        token, err = svc.issue_token(room_id, g.user_sub, name_service.resolver.resolve(g.user_sub))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 502
+    if err:
+        return {"error": err}, _ERRORS[err]
+    return token, 200 # type: ignore
 
+# ---------- End Breakroom ----------
+@bp.route("/breakrooms/<room_id>", methods=["DELETE"])
+@cognito_auth_required
+def end_breakroom(room_id):
+    try:
+        err = svc.end_breakroom(room_id, g.user_sub, g.groups)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e)}), 502
+    if err:
+        return {"error": err}, _ERRORS[err]
+    return "", 204
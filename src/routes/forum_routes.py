@@ -2,7 +2,7 @@
 from flask import Blueprint, request, jsonify, current_app
 from pydantic import ValidationError
 from ..models.question import QuestionCreate
-from ..auth import cognito_auth_required # Import the decorator
+from ..auth import cognito_auth_required, cognito_auth_optional # Import the decorators
 
 bp = Blueprint("forum", __name__)
 
@@ -37,23 +37,26 @@ def post_question():
 # -- Listing questions --
 # List questions with optional query parameters
 @bp.get("/questions")
+@cognito_auth_optional
 def list_questions():
     '''
     Expected query parameters (optional):
         sort: "new" | "popular"                 // default "new"
         direction: "ascending" | "descending"   // default "descending"
         limit: Number                           // number of questions requested with default 10
-        after: json                             // provided by backend at last query as ExclusiveStartKey
+        after: String                           // endCursor of the previous page
+        flags: "true" | "false"                 // embed liked/saved for the signed-in user, default "false"
     '''
     # Get search parameters with default values
     sort = request.args.get("sort", "new")
     dir = request.args.get("direction", "descending")
     last_key = request.args.get("after")
     limit = int(request.args.get("limit", 10))
+    flags = _flags_requested()
 
     # Hand over to service
     svc = current_app.config["FORUM_SERVICE"]
-    res = svc.list_questions(direction = dir, limit=limit, sort=sort, last_key=last_key)
+    res = svc.list_questions(direction = dir, limit=limit, sort=sort, last_key=last_key, flags=flags)
 
     if "error" in res:
         return res, 400
@@ -67,16 +70,18 @@ def get_own_questions():
     Expected query parameters (optional):
         limit: Number
         direction: "ascending" | "descending"   // default "descending"
-        after: json // Provided by backend at last query as ExclusiveStartKey
+        after: String // endCursor of the previous page
+        flags: "true" | "false" // embed liked/saved, default "false"
     '''
     # Get search parameters with default values
     last_key = request.args.get("after")
     limit = int(request.args.get("limit", 10))
     dir = request.args.get("direction", "descending")
+    flags = _flags_requested()
 
     # Hand over to service
     svc = current_app.config["FORUM_SERVICE"]
-    res = svc.list_questions_by_user(direction=dir, limit=limit, last_key=last_key)
+    res = svc.list_questions_by_user(direction=dir, limit=limit, last_key=last_key, flags=flags)
 
     if "error" in res:
         return res, 400
@@ -89,65 +94,93 @@ def get_saved_questions():
     '''
     Expected query parameters (optional):
         limit: Number
-        after: json // Provided by backend at last query as ExclusiveStartKey
+        after: String // endCursor of the previous page
+        flags: "true" | "false" // embed liked/saved, default "false"
     '''
     # Get search parameters with default values
     last_key = request.args.get("after")
     limit = int(request.args.get("limit", 10))
+    flags = _flags_requested()
 
     # Hand over to service
     svc = current_app.config["FORUM_SERVICE"]
-    res = svc.list_saved_questions(limit=limit, last_key=last_key)
+    res = svc.list_saved_questions(limit=limit, last_key=last_key, flags=flags)
 
     if "error" in res:
         return res, 400
     return res, 200
 
-# List questions with specific tag
+# List questions with specific tags
 @bp.get("/questions/tag/<tag>")
+@cognito_auth_optional
 def get_questions_with_tag(tag):
     '''
+    <tag> may be a comma separated list of tags, e.g. /questions/tag/sleep,newborn
     Expected query parameters (optional):
+        match: "all" | "any"                    // questions with all / any of the tags, default "all"
+        sort: "new" | "popular"                 // default "new"
         limit: Number                           // number of questions requested with default 10
         direction: "ascending" | "descending"   // default "descending"
-        after: json                             // provided by backend at last query as ExclusiveStartKey
+        after: String                           // endCursor of the previous page
+        flags: "true" | "false"                 // embed liked/saved for the signed-in user, default "false"
     '''
     # Get search parameters with default values
+    tags = [t.strip() for t in tag.split(",") if t.strip()]
+    match = request.args.get("match", "all")
+    sort = request.args.get("sort", "new")
     last_key = request.args.get("after")
     limit = int(request.args.get("limit", 10))
     dir = request.args.get("direction", "descending")
+    flags = _flags_requested()
 
     # Hand over to service
     svc = current_app.config["FORUM_SERVICE"]
-    res = svc.list_questions_with_tag(tag=tag, direction=dir, limit=limit, last_key=last_key)
+    res = svc.list_questions_with_tag(tags=tags, match=match, sort=sort, direction=dir, limit=limit, last_key=last_key, flags=flags)
 
     if "error" in res:
         return res, 400
     return res, 200
 
+# List the most used tags
+@bp.get("/tags/popular")
+def get_popular_tags():
+    '''
+    Expected query parameters (optional):
+        limit: Number                           // number of tags requested with default 10
+    '''
+    limit = int(request.args.get("limit", 10))
+
+    # Hand over to service
+    svc = current_app.config["FORUM_SERVICE"]
+    return svc.list_popular_tags(limit=limit), 200
+
 # Search questions by text
 @bp.get("/questions/search")
+@cognito_auth_optional
 def search_questions():
     '''
     Expected query parameters:
         q: String                               // search query
     Optional query parameters:
         limit: Number                           // number of questions requested with default 10
-        direction: "ascending" | "descending"   // default "descending"
-        after: json                             // provided by backend at last query as ExclusiveStartKey
+        direction: "ascending" | "descending"   // default "descending" (best matches first)
+        after: String                           // endCursor of the previous page
+        flags: "true" | "false"                 // embed liked/saved for the signed-in user, default "false"
+    Results are ranked by relevance (BM25); the last word also matches as a prefix.
     '''
     # Get search parameters with default values
     query = request.args.get("q", "")
     if not query:
         return {"error": "missing_query_parameter"}, 400
 
-    last_key = request.args.get("after", {})
+    last_key = request.args.get("after")
     limit = int(request.args.get("limit", 10))
     dir = request.args.get("direction", "descending")
+    flags = _flags_requested()
 
     # Hand over to service
     svc = current_app.config["FORUM_SERVICE"]
-    res = svc.search_questions(query=query, direction=dir, limit=limit, last_key=last_key)
+    res = svc.search_questions(query=query, direction=dir, limit=limit, last_key=last_key, flags=flags)
 
     if "error" in res:
         return res, 400
@@ -155,14 +188,19 @@ def search_questions():
 
 # Get a specific question and related answers etc.
 @bp.get("/questions/<qid>")
+@cognito_auth_optional
 def get_question(qid):
     '''
     Expected query parameters (optional):
-        content: "all" | "question"
+        content: "all" | "question" | "thread"
+        flags: "true" | "false"     // embed liked/saved (replies: liked) for the signed-in user
+    With content=thread the replies come as a tree, see get_replies.
     '''
     cont: str = request.args.get("content", "all")
     svc = current_app.config["FORUM_SERVICE"]
-    doc = svc.get_question(qid, cont)
+    if cont == "thread":
+        return _thread_page(svc, qid, None)
+    doc = svc.get_question(qid, cont, flags=_flags_requested())
     if not doc:
         return {"error": "not_found"}, 404
     return doc, 200
@@ -304,6 +342,21 @@ def get_reply(qid, rid):
         return {"error": "not_found"}, 404
     return reply, 200
 
+# Page through the replies to a reply
+@bp.get("/questions/<qid>/reply/<rid>/replies")
+@cognito_auth_optional
+def get_replies(qid, rid):
+    '''
+    Expected query parameters (optional):
+        limit: Int          // replies per page, default 20
+        children: Int       // nested replies per reply, default 3
+        after: String       // endCursor of the previous page
+        flags: "true" | "false"
+    Every reply carries "children" (its first replies) and "childCount".
+    '''
+    svc = current_app.config["FORUM_SERVICE"]
+    return _thread_page(svc, qid, rid)
+
 # Edit a reply
 @bp.put("/questions/<qid>/reply/<rid>")
 @cognito_auth_required
@@ -386,3 +439,16 @@ def get_like_reply(qid, rid):
     svc = current_app.config["FORUM_SERVICE"]
     liked = svc.get_like_reply(qid, rid)
     return {"liked": liked}, 200
+
+def _thread_page(svc, qid: str, parent: str | None):
+    limit = int(request.args.get("limit", 20))
+    children = int(request.args.get("children", 3))
+    doc = svc.get_thread(qid, parent, limit, children, request.args.get("after"), flags=_flags_requested())
+    if doc is None:
+        return {"error": "not_found"}, 404
+    if "error" in doc:
+        return doc, 400
+    return doc, 200
+
+def _flags_requested() -> bool:
+    return request.args.get("flags", "false").lower() == "true"
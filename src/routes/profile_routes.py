@@ -42,9 +42,17 @@ def get_my_profile():
         {
             "Authorization": "Bearer {accessToken}"
         }
+    Expected query parameters (optional):
+        sections: String    // comma separated, any of profile, children, growth,
+                            // vaccines, friendRequests, likes, saves
+                            // default: all but likes and saves
     '''
     svc = current_app.config["PROFILE_SERVICE"]
-    return svc.get_my_profile(), 200
+    raw = request.args.get("sections", "")
+    out = svc.get_my_profile([s.strip() for s in raw.split(",") if s.strip()] or None)
+    if "error" in out:
+        return out, 400
+    return out, 200
 
 
 # Update own profile (children, privacy, etc.)
@@ -67,7 +75,10 @@ def get_user_profile(user_id):
         }
     '''
     svc = current_app.config["PROFILE_SERVICE"]
-    return svc.get_user_profile(g.user_sub, user_id), 200
+    out = svc.get_user_profile(g.user_sub, user_id)
+    if "error" in out:
+        return out, 404
+    return out, 200
 
 # ---- Children ----
 
@@ -161,9 +172,59 @@ def add_vaccine(child_id):
 def list_growth(child_id):
     """
     List all growth records for the given child.
+    Expected query parameters (optional):
+        from: String    // first date, e.g. "2024-01-01"
+        to: String      // last date (inclusive)
     """
     svc = current_app.config["PROFILE_SERVICE"]
-    return jsonify(svc.list_growth(child_id)), 200
+    dates = _date_range()
+    if dates is None:
+        return {"error": "validation"}, 400
+    return jsonify(svc.list_growth(child_id, *dates)), 200
+
+def _date_range() -> tuple[str | None, str | None] | None:
+    '''from/to query parameters, None if from is after to.'''
+    date_from, date_to = request.args.get("from"), request.args.get("to")
+    if date_from and date_to and date_from > date_to:
+        return None
+    return date_from, date_to
+
+# ---- Growth chart ----
+@bp.get("/profile/me/children/<child_id>/growth/series")
+@cognito_auth_required
+def growth_series(child_id):
+    """
+    Growth chart points for the given child, oldest first.
+    Expected query parameters (optional):
+        from: String            // first date, e.g. "2024-01-01"
+        to: String              // last date (inclusive)
+        interval: String        // "raw" (default, paginated) | "week" | "month"
+        percentiles: String     // comma separated, e.g. "25,50,75" (week/month only): percentiles
+                                // of the child's own readings in each period, not reference curves
+        limit: Number           // raw only, default 100
+        after: String           // raw only, endCursor of the previous page
+    """
+    svc = current_app.config["PROFILE_SERVICE"]
+    try:
+        percentiles = tuple(float(p) for p in request.args.get("percentiles", "").split(",") if p.strip())
+        limit = int(request.args.get("limit", 100))
+    except ValueError:
+        return {"error": "validation"}, 400
+    dates = _date_range()
+    if any(not 0 <= p <= 100 for p in percentiles) or not 0 < limit <= 1000 or dates is None:
+        return {"error": "validation"}, 400
+    out = svc.growth_series(
+        child_id,
+        date_from=dates[0],
+        date_to=dates[1],
+        interval=request.args.get("interval", "raw"),
+        percentiles=percentiles,
+        limit=limit,
+        last_key=request.args.get("after")
+    )
+    if "error" in out:
+        return out, 400
+    return jsonify(out), 200
 
 # ---- List vaccine records ----
 @bp.get("/profile/me/children/<child_id>/vaccine")
@@ -0,0 +1,165 @@
+# src/service/bibi_service.py
+import hashlib
+import hmac
+import os
+import secrets
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from typing import Iterator
+from .. import db
+from ..cache import TTLCache, SingleFlight
+
+"""
+Questions to the Bibi agent (Amazon Bedrock).
+
+Conversations run in a session of their own per user. Questions explicitly
+marked stateless are answered from a cache keyed by the normalized prompt,
+and identical stateless questions in flight at the same time (streamed or
+not) share one invoke_agent call.
+"""
+
+AGENT_ID = "MDX1YASPJE"
+AGENT_ALIAS_ID = "GEYSFL3PRM"
+BIBI_CACHE_TTL = float(os.environ.get("BIBI_CACHE_TTL", "3600"))
+BIBI_CACHE_SIZE = int(os.environ.get("BIBI_CACHE_SIZE", "1024"))
+# Key for agent session ids. User subs are public, so session ids must not be
+# computable from them. Without BIBI_SESSION_SECRET every process uses a key
+# of its own and conversations only continue within that process.
+_SESSION_KEY = os.environ.get("BIBI_SESSION_SECRET", "").encode() or secrets.token_bytes(32)
+
+def normalize(message: str) -> str:
+    '''Prompt form used as cache key: case, spacing and final punctuation do not matter.'''
+    text = unicodedata.normalize("NFKC", message).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" ?!.")
+
+def session_id(user_sub: str | None, requested: str | None) -> str:
+    '''
+    Agent session for a conversation, keyed with BIBI_SESSION_SECRET.
+    Signed-in users get sessions derived from their sub, so two users never
+    share one (without a requested id they continue their default session).
+    Anonymous callers' ids live in a namespace of their own, so no id a
+    client sends can reach a signed-in user's session; without one they get
+    a fresh session.
+    '''
+    if user_sub:
+        return _session_digest(f"user:{user_sub}:{requested or ''}")
+    return "anon-" + _session_digest(f"anon:{requested or uuid.uuid4().hex}")
+
+def _session_digest(name: str) -> str:
+    return hmac.new(_SESSION_KEY, name.encode(), hashlib.sha256).hexdigest()[:32]
+
+class BibiService:
+    def __init__(self, cache: TTLCache | None = None) -> None:
+        self.cache = cache or TTLCache(maxsize=BIBI_CACHE_SIZE, ttl=BIBI_CACHE_TTL)
+        self.flight = SingleFlight()
+        self.agent_calls = 0
+        self.agent_seconds = 0.0
+        self.served = 0
+        self.served_seconds = 0.0
+        self._agent = None
+        self._lock = threading.Lock()
+
+    def agent(self):
+        # Created on the first question (shared pool, agent answers can take a while)
+        return self._agent or db.client("bedrock-agent-runtime", region_name="us-east-1", read_timeout=60)
+
+    # ---- Questions ----
+    def ask(self, message: str, session: str | None, stateless: bool) -> str:
+        '''Full answer to message.'''
+        start = time.perf_counter()
+        if stateless:
+            key = normalize(message)
+            reply = self.cache.get(key)
+            if reply is None:
+                reply = self.flight.do(key, lambda: self._ask_and_cache(key, message))
+        else:
+            reply = "".join(self._invoke(message, session)) # type: ignore
+        self._served(start)
+        return reply.strip()
+
+    def stream(self, message: str, session: str | None, stateless: bool) -> Iterator[str]:
+        '''
+        Answer to message piece by piece. Cached answers come as one piece;
+        a stateless answer is cached once it was streamed completely, and
+        callers asking the same meanwhile get it as one piece as well.
+        '''
+        start = time.perf_counter()
+        if not stateless:
+            yield from self._invoke(message, session)
+            self._served(start)
+            return
+
+        key = normalize(message)
+        reply = self.cache.get(key)
+        if reply is None:
+            call, leader = self.flight.join(key)
+            if leader:
+                yield from self._stream_and_cache(key, message, call)
+                self._served(start)
+                return
+            try:
+                reply = self.flight.wait(call)
+            except Exception:
+                # The leading stream failed or its client left: ask on our own
+                reply = self._ask_and_cache(key, message)
+        self._served(start)
+        yield reply
+
+    def _stream_and_cache(self, key: str, message: str, call) -> Iterator[str]:
+        pieces = []
+        try:
+            for piece in self._invoke(message, None):
+                pieces.append(piece)
+                yield piece
+        except BaseException as e:
+            self.flight.finish(key, call, error=RuntimeError(f"stream interrupted: {e!r}"))
+            raise
+        reply = "".join(pieces).strip()
+        self.cache.set(key, reply)
+        self.flight.finish(key, call, reply)
+
+    def _ask_and_cache(self, key: str, message: str) -> str:
+        reply = "".join(self._invoke(message, None)).strip()
+        self.cache.set(key, reply)
+        return reply
+
+    def _invoke(self, message: str, session: str | None) -> Iterator[str]:
+        start = time.perf_counter()
+        response = self.agent().invoke_agent(
+            agentId=AGENT_ID,
+            agentAliasId=AGENT_ALIAS_ID,
+            sessionId=session or uuid.uuid4().hex,    # stateless: throwaway session
+            inputText=message,
+        )
+        completion = response["completion"]
+        try:
+            for event in completion:
+                if "chunk" in event:
+                    yield event["chunk"]["bytes"].decode("utf-8")
+        finally:
+            # Also reached when a streaming client goes away
+            close = getattr(completion, "close", None)
+            if close:
+                close()
+            with self._lock:
+                self.agent_calls += 1
+                self.agent_seconds += time.perf_counter() - start
+
+    def _served(self, start: float) -> None:
+        with self._lock:
+            self.served += 1
+            self.served_seconds += time.perf_counter() - start
+
+    def stats(self) -> dict[str, object]:
+        return {
+            **self.cache.stats(),
+            "coalesced": self.flight.coalesced,
+            "served": self.served,
+            "agentCalls": self.agent_calls,
+            "avgServedMs": self.served_seconds / self.served * 1e3 if self.served else 0.0,
+            "avgAgentMs": self.agent_seconds / self.agent_calls * 1e3 if self.agent_calls else 0.0
+        }
@@ -1,25 +1,59 @@
-import os, time, uuid, requests
+import os, time, uuid, threading, requests
 from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .. import cursor
+from ..cache import TTLCache, SingleFlight
+from ..cursor import InvalidCursor
 from ..models.breakrooms import Breakroom
 from ..repo import breakrooms_repo as repo
 
 DAILY_API_KEY = os.environ.get("DAILY_API_KEY", "")
 DAILY_SUBDOMAIN = os.environ.get("DAILY_SUBDOMAIN", "")
 ROOM_TTL_SECONDS = int(os.environ.get("ROOM_TTL_SECONDS", "7200"))
+SWEEP_BATCH_SIZE = int(os.environ.get("BREAKROOM_SWEEP_BATCH", "100"))
+MAX_LIST_LIMIT = 50     # rooms per page of list_breakrooms, validated by the route
+
+# Daily API: one pooled session with timeouts and retries. Connection errors
+# are retried for every method, 429/5xx only for GET and DELETE, since
+# repeating a POST /rooms that went through fails on the taken name.
+DAILY_API_URL = os.environ.get("DAILY_API_URL", "https://api.daily.co/v1")
+DAILY_POOL_SIZE = int(os.environ.get("DAILY_POOL_SIZE", "20"))
+DAILY_TIMEOUT = (float(os.environ.get("DAILY_CONNECT_TIMEOUT", "3")), float(os.environ.get("DAILY_READ_TIMEOUT", "10")))
+DAILY_RETRIES = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET", "DELETE"])
+
+# Room meta is read on every join, keep it for a few seconds
+BREAKROOM_META_TTL = float(os.environ.get("BREAKROOM_META_TTL", "5"))
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_meta_cache = TTLCache(maxsize=1024, ttl=BREAKROOM_META_TTL)
+_meta_flight = SingleFlight()
+_token_flight = SingleFlight()
+
+def _daily_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=DAILY_POOL_SIZE, pool_maxsize=DAILY_POOL_SIZE, max_retries=DAILY_RETRIES)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
 
 def _daily_request(path, method="GET", body=None):
-    url = f"https://api.daily.co/v1{path}"
+    url = f"{DAILY_API_URL}{path}"
     headers = {
         "Authorization": f"Bearer {DAILY_API_KEY}",
         "Content-Type": "application/json",
     }
-    resp = requests.request(method, url, headers=headers, json=body)
+    resp = _daily_session().request(method, url, headers=headers, json=body, timeout=DAILY_TIMEOUT)
     if resp.status_code >= 300:
         current_app.logger.error("Daily API error %s: %s", resp.status_code, resp.text)
         raise Exception(f"Daily API error {resp.status_code}")
     return resp.json()
 
-def create_breakroom(owner_sub: str) -> dict:
+def create_breakroom(owner_sub: str, owner_name: str = "", name: str = "", description: str = "") -> dict:
     now = int(time.time())
     exp = now + ROOM_TTL_SECONDS
     ttl = exp + 300
@@ -39,29 +73,44 @@ def create_breakroom(owner_sub: str) -> dict:
         created_at=now,
         expires_at=exp,
         url=f"https://{DAILY_SUBDOMAIN}.daily.co/{daily_room_name}" if DAILY_SUBDOMAIN else daily_room.get("url"),
-        ttl=ttl
+        ttl=ttl,
+        owner_sub=owner_sub,
+        owner_name=owner_name,
+        name=name,
+        description=description
     )
 
     repo.put_breakroom(br)
     repo.put_participant(room_id, owner_sub, "owner", now)
 
-    return {"roomId": br.room_id, "url": br.url, "expiresAt": br.expires_at}
+    return _room_view(br.to_item())
+
+def _get_meta(room_id: str) -> dict | None:
+    '''Room meta through the short-lived cache; concurrent misses share one read.'''
+    meta = _meta_cache.get(room_id)
+    if meta is None:
+        meta = _meta_flight.do(room_id, lambda: repo.get_breakroom_meta(room_id))
+        if meta:
+            _meta_cache.set(room_id, meta)
+    return meta
 
 def issue_token(room_id: str, user_sub: str, username: str) -> tuple[dict | None, str | None]:
-    meta = repo.get_breakroom_meta(room_id)
+    meta = _get_meta(room_id)
     if not meta:
         return None, "room_not_found"
-    if meta.get("status") != "active":
+    if meta.get("status") != "active" or int(meta.get("exp", 0)) <= int(time.time()):
+        # Expired rooms may not be swept yet
         return None, "room_not_active"
 
     is_owner = (meta.get("owner_sub") == user_sub)
-    token = _daily_request("/meeting-tokens", "POST", {
+    # Repeated taps on "join" by the same user share one token request
+    token = _token_flight.do((room_id, user_sub, username), lambda: _daily_request("/meeting-tokens", "POST", {
         "properties": {
             "room_name": meta["daily_room_name"],
             "is_owner": is_owner,
             "user_name": username
         }
-    })
+    }))
 
     repo.put_participant(room_id, user_sub, "owner" if is_owner else "member", int(time.time()))
 
@@ -81,14 +130,46 @@ def end_breakroom(room_id: str, requester_sub: str, requester_groups: list[str])
 
     _daily_request(f"/rooms/{meta['daily_room_name']}", "DELETE")
     repo.update_breakroom_status(room_id, "ended")
+    _meta_cache.delete(room_id)
     return None
 
 def get_breakroom(room_id: str) -> dict | None:
-    meta = repo.get_breakroom_meta(room_id)
+    meta = _get_meta(room_id)
     if not meta:
         return None
+    return _room_view(meta)
+
+def list_breakrooms(owner_sub: str | None = None, limit: int = 20, last_key: str | None = None) -> dict[str, object]:
+    '''
+    One page of active rooms (soonest to expire first), or of the rooms of
+    owner_sub (newest first). last_key is the endCursor of the previous page.
+    '''
+    limit = max(1, min(limit, MAX_LIST_LIMIT))
+    scope = f"breakrooms:{owner_sub or 'active'}"
+    try:
+        start = cursor.decode(last_key, scope) if last_key else None
+    except InvalidCursor:
+        return {"error": "invalid_cursor"}
+    if owner_sub:
+        res = repo.list_breakrooms_by_owner(owner_sub, limit, start) # type: ignore
+    else:
+        res = repo.list_active_breakrooms(limit, start) # type: ignore
+    rooms = [_room_view(meta) for meta in res.get("Items", [])]
+    lek = res.get("LastEvaluatedKey")
     return {
-        "roomId": room_id,
+        "items": rooms,
+        "pageInfo": {
+            "hasNextPage": lek is not None,
+            "endCursor": cursor.encode(lek, scope) if lek else None
+        }
+    }
+
+def _room_view(meta: dict) -> dict:
+    return {
+        "roomId": meta["PK"].replace("BRK#", ""),
+        "name": meta.get("name", ""),
+        "description": meta.get("description", ""),
+        "url": meta.get("url"),
         "status": meta.get("status"),
         "ownerSub": meta.get("owner_sub"),
         "ownerName": meta.get("owner_name"),
@@ -96,16 +177,44 @@ def get_breakroom(room_id: str) -> dict | None:
         "expiresAt": meta.get("exp"),
     }
 
-def list_breakrooms(owner_sub: str | None = None) -> list[dict]:
-    items = repo.list_breakrooms(owner_sub)
-    rooms = []
-    for meta in items:
-        rooms.append({
-            "roomId": meta["PK"].replace("BRK#", ""),
-            "status": meta.get("status"),
-            "ownerSub": meta.get("owner_sub"),
-            "ownerName": meta.get("owner_name"),
-            "createdAt": meta.get("created_at"),
-            "expiresAt": meta.get("exp"),
-        })
-    return rooms
+# ---- Expiry sweeper ----
+def sweep_expired(now: int | None = None) -> dict[str, int]:
+    '''
+    End every room past its expiry and delete its participant rows, a page
+    of SWEEP_BATCH_SIZE rooms at a time. Rooms are found through the
+    breakrooms_active index, so only expired rooms are read. The sweep pages
+    through one query: the index is eventually consistent, so starting over
+    could return rooms this sweep just ended.
+    '''
+    now = now or int(time.time())
+    ended = participants = 0
+    last_key = None
+    while True:
+        res = repo.list_expired_breakrooms(now, SWEEP_BATCH_SIZE, last_key)
+        room_ids = [r["PK"].replace("BRK#", "") for r in res.get("Items", [])]
+        if room_ids:
+            ended += len(repo.end_breakrooms(room_ids))
+            participants += repo.delete_participants(room_ids)
+            for room_id in room_ids:
+                _meta_cache.delete(room_id)
+        last_key = res.get("LastEvaluatedKey")
+        if not last_key:
+            return {"ended": ended, "participants": participants}
+
+_sweeper: threading.Thread | None = None
+_sweeper_lock = threading.Lock()
+
+def start_sweeper(interval: float) -> None:
+    '''Run sweep_expired every interval seconds in a daemon thread (once per process).'''
+    global _sweeper
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep_expired()
+            except Exception as e:
+                print(f"[WARN] Breakroom sweep failed: {e}")
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=run, name="breakroom-sweeper", daemon=True)
+            _sweeper.start()
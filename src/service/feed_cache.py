@@ -0,0 +1,223 @@
+# src/service/feed_cache.py
+import os
+import threading
+import time
+from typing import Callable
+from ..cache import TTLCache, DynamoCacheBackend
+
+"""
+Cache of the first page of GET /questions for every sort and direction.
+
+One entry holds the first FEED_CACHE_DEPTH items of a feed, so any limit
+up to that depth is served by slicing it; the cursor of a sliced page is
+the index key of its last item. Writes patch the entries in place where
+the new order is known and drop them otherwise:
+
+    create_question   every feed gets the question where it sorts in
+    delete_question   the question is removed from every feed
+    (un)like_question likes are patched in every feed and "popular" feeds
+                      re-sorted; a popular entry is dropped only when the
+                      question moves out across its last item
+    create/delete_reply answers are patched in every feed
+
+A question outside a popular window whose like moves it to the window's
+edge is not pulled in (its like count is not known here); it shows up
+when the entry expires.
+
+With the shared backend every worker sees the patches; a patch is a
+read-modify-write, so concurrent writers can lose one, which FEED_CACHE_TTL
+bounds.
+"""
+
+FEED_CACHE_TTL = float(os.environ.get("FEED_CACHE_TTL", "30"))
+FEED_CACHE_DEPTH = int(os.environ.get("FEED_CACHE_DEPTH", "50"))
+FEED_CACHE_BACKEND = os.environ.get("FEED_CACHE_BACKEND", "")  # "" (in-process) | "dynamodb"
+
+SORTS = ["new", "popular"]
+DIRECTIONS = [False, True]
+
+# Attributes the popular/new indexes return for a question
+_PROJECTED = ["PK", "SK", "gsi", "title", "author", "tags", "date", "likes", "answers"]
+
+def projected(item: dict) -> dict:
+    return {k: item[k] for k in _PROJECTED if k in item}
+
+def _index_key(item: dict, sort: str) -> dict:
+    key = {"PK": item["PK"], "SK": item["SK"], "gsi": item["gsi"]}
+    key["likes" if sort == "popular" else "date"] = item["likes" if sort == "popular" else "date"]
+    return key
+
+class FeedCache:
+    def __init__(self, backend, depth: int = FEED_CACHE_DEPTH, ttl: float = FEED_CACHE_TTL) -> None:
+        self.backend = backend
+        self.depth = depth
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.invalidations = 0
+        self.max_age = 0.0
+        self._age_total = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(sort: str, direction: bool) -> str:
+        return f"{sort}:{'asc' if direction else 'desc'}"
+
+    # ---- Reads ----
+    def page(self, sort: str, direction: bool, limit: int, load: Callable[[int], dict]) -> dict | None:
+        '''
+        First page of a feed as {"Items", "LastEvaluatedKey"}, or None if the
+        limit is beyond what the cache holds. load(n) queries the first n items.
+        '''
+        if limit < 1:
+            raise ValueError(f"limit must be positive, got {limit}")
+        if limit > self.depth:
+            return None
+        key = self._key(sort, direction)
+        entry = self.backend.get(key)
+        if entry:
+            age = time.time() - float(entry["at"])
+            with self._lock:
+                self.hits += 1
+                self._age_total += age
+                self.max_age = max(self.max_age, age)
+        else:
+            res = load(self.depth)
+            entry = {
+                "items": res.get("Items", []),
+                "complete": res.get("LastEvaluatedKey") is None,
+                "at": int(time.time())
+            }
+            self.backend.set(key, entry, self.ttl)
+            with self._lock:
+                self.misses += 1
+
+        items = [dict(i) for i in entry["items"][:limit]]
+        more = len(entry["items"]) > limit or not entry["complete"]
+        if more and len(items) < limit:
+            # Deletes shrank the entry below the requested page
+            return None
+        return {
+            "Items": items,
+            "LastEvaluatedKey": _index_key(items[-1], sort) if more and items else None
+        }
+
+    # ---- Writes ----
+    def on_create(self, item: dict) -> None:
+        item = projected(item)
+        for direction in DIRECTIONS:
+            def add(entry: dict, direction=direction) -> dict:
+                # A copy per entry: entries are patched in place, one shared
+                # dict would be bumped once per entry on every like or reply
+                if not direction:
+                    entry["items"].insert(0, dict(item))
+                    if len(entry["items"]) > self.depth:
+                        entry["items"].pop()
+                        entry["complete"] = False
+                elif entry["complete"]:
+                    entry["items"].append(dict(item))
+                return entry
+            self._patch("new", direction, add)
+
+            def rank(entry: dict, direction=direction) -> dict:
+                # Ties keep their order, a new question goes after its equals
+                likes = int(item.get("likes", 0))
+                items = entry["items"]
+                pos = len(items)
+                for n, i in enumerate(items):
+                    if (int(i.get("likes", 0)) > likes) if direction else (int(i.get("likes", 0)) < likes):
+                        pos = n
+                        break
+                if pos == len(items) and not entry["complete"]:
+                    return entry    # beyond the window
+                items.insert(pos, dict(item))
+                if len(items) > self.depth:
+                    items.pop()
+                    entry["complete"] = False
+                return entry
+            self._patch("popular", direction, rank)
+
+    def on_delete(self, qid: str) -> None:
+        pk = f"QUESTION#{qid}"
+        def remove(entry: dict) -> dict:
+            entry["items"] = [i for i in entry["items"] if i["PK"] != pk]
+            return entry
+        for sort in SORTS:
+            for direction in DIRECTIONS:
+                self._patch(sort, direction, remove)
+
+    def on_like(self, qid: str, delta: int) -> None:
+        pk = f"QUESTION#{qid}"
+        def bump(entry: dict) -> dict:
+            for i in entry["items"]:
+                if i["PK"] == pk:
+                    i["likes"] = int(i.get("likes", 0)) + delta
+            return entry
+        for direction in DIRECTIONS:
+            self._patch("new", direction, bump)
+
+            def resort(entry: dict, direction=direction) -> dict | None:
+                bump(entry)
+                items = entry["items"]
+                items.sort(key=lambda i: int(i.get("likes", 0)), reverse=not direction)
+                # Moving away from the top of the window (fewer likes in a
+                # descending feed) past its last item, it may belong after
+                # questions the window does not hold
+                outward = delta > 0 if direction else delta < 0
+                if outward and not entry["complete"] and items and items[-1]["PK"] == pk:
+                    return None
+                return entry
+            self._patch("popular", direction, resort)
+
+    def on_reply(self, qid: str, delta: int) -> None:
+        pk = f"QUESTION#{qid}"
+        def bump(entry: dict) -> dict:
+            for i in entry["items"]:
+                if i["PK"] == pk:
+                    i["answers"] = int(i.get("answers", 0)) + delta
+            return entry
+        for sort in SORTS:
+            for direction in DIRECTIONS:
+                self._patch(sort, direction, bump)
+
+    def invalidate(self, sort: str | None = None) -> None:
+        for s in ([sort] if sort else SORTS):
+            for direction in DIRECTIONS:
+                self.backend.delete(self._key(s, direction))
+        with self._lock:
+            self.invalidations += 1
+
+    def _patch(self, sort: str, direction: bool, fn: Callable[[dict], dict | None]) -> None:
+        '''Apply fn to the entry of a feed; an entry fn returns None for is dropped.'''
+        key = self._key(sort, direction)
+        entry = self.backend.get(key)
+        if not entry:
+            return
+        age = time.time() - float(entry["at"])
+        patched = fn(entry)
+        if patched is None:
+            self.backend.delete(key)
+            with self._lock:
+                self.invalidations += 1
+            return
+        self.backend.set(key, patched, max(self.ttl - age, 0))
+        with self._lock:
+            self.patches += 1
+
+    def stats(self) -> dict[str, object]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / total if total else 0.0,
+            "patches": self.patches,
+            "invalidations": self.invalidations,
+            "avgAgeServed": self._age_total / self.hits if self.hits else 0.0,
+            "maxAgeServed": self.max_age
+        }
+
+
+feed = FeedCache(
+    backend=DynamoCacheBackend("FEED") if FEED_CACHE_BACKEND == "dynamodb" else TTLCache(maxsize=len(SORTS) * len(DIRECTIONS), ttl=FEED_CACHE_TTL)
+)
@@ -2,16 +2,19 @@
 import uuid
 from flask import g
 from datetime import datetime, timezone
-from ..db import ensure_table, table
+from ..db import table
+from .. import cursor
+from ..cursor import InvalidCursor
 from ..repo import question_repo as QuestionRepo
 from ..repo import reply_repo as ReplyRepo
+from ..repo import tag_repo as TagRepo
+from . import name_service
+from .feed_cache import feed
 from ..models.question import QuestionCreate, Question
 from ..models.reply import ReplyCreate, Reply
 from ..models.forum import to_save
 
 class ForumService:
-    def __init__(self) -> None:
-        ensure_table()
     def create_question(self, payload: QuestionCreate) -> dict[str, object]:
         name = _extract_name()
 
@@ -28,18 +31,58 @@ class ForumService:
             reply_count=0
         )
         QuestionRepo.create(q)
+        feed.on_create(q.to_item())
         return q.model_dump()
 
-    def get_question(self, qid: str, content: str) -> dict[str, object] | None:
+    def get_question(self, qid: str, content: str, flags: bool = False) -> dict[str, object] | None:
         if content == "question":
             q = QuestionRepo.get_question(qid)
-            return None if q is None else q.model_dump()
+            if q is None:
+                return None
+            doc = q.model_dump()
+            if flags:
+                _embed_flags([doc])
+            return doc
         elif content == "all":
             forum = QuestionRepo.get_forum(qid, all=False)
+            if flags and forum:
+                _embed_flags([forum["Question"]] if "Question" in forum else [], forum["Replies"])
             return forum
         else:
             return {"error": "invalid_query_parameter"}
 
+    def get_thread(self, qid: str, parent: str | None, limit: int, children: int, last_key: str | None, flags: bool = False) -> dict[str, object] | None:
+        '''
+        A window of the reply tree: replies to parent (top-level replies when
+        parent is None) with their first `children` replies nested.
+        The first top-level page also carries the question.
+        '''
+        limit = max(1, min(limit, 50))
+        children = max(0, min(children, 20))
+        scope = f"thread:{qid}:{parent or ''}"
+        try:
+            start = _decode_cursor(last_key, scope)
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        first_page = parent is None and start is None
+        if parent:
+            if ReplyRepo.get_reply(qid, parent) is None:
+                return None
+        elif first_page:
+            question = QuestionRepo.get_question_item(qid)
+            if question is None:
+                return None
+        res = QuestionRepo.get_thread_window(qid, parent or qid, start, limit, children) # type: ignore
+        nodes: list[dict] = res["Items"] # type: ignore
+        if flags:
+            _embed_flags([], nodes + [c for n in nodes for c in n["children"]])
+        page = _page(nodes, res["LastEvaluatedKey"], scope)
+        if first_page:
+            if flags:
+                _embed_flags([question])
+            page["question"] = question
+        return page
+
     def edit_question(self, qid: str, title: str = "", body: str = "") -> dict[str, object] | None:
         authorship = _authorized(qid)
         if authorship == -1:
@@ -47,6 +90,8 @@ class ForumService:
         elif authorship == 0:
             return {"error": "not_authorized"}
         q = QuestionRepo.edit(qid=qid, title=title, body=body)
+        if q is not None and title:
+            feed.invalidate()
         return None if q is None else q.model_dump()
     
     def delete_question(self, qid: str) -> tuple[dict[str, str] | str, int]:
@@ -54,12 +99,19 @@ class ForumService:
         if authorship == 0:
             return {"error": "not_authorized"}, 403
         QuestionRepo.delete(qid)
+        feed.on_delete(qid)
         return "", 204
 
     def like_question(self, qid: str) -> bool:
-        return QuestionRepo.like(qid)
+        res = QuestionRepo.like(qid)
+        if res:
+            feed.on_like(qid, 1)
+        return res is not False     # liking twice is not an error
     def unlike_question(self, qid: str) -> bool:
-        return QuestionRepo.unlike(qid)
+        res = QuestionRepo.unlike(qid)
+        if res:
+            feed.on_like(qid, -1)
+        return res is not False
     def get_like_question(self, qid: str) -> bool:
         return QuestionRepo.get_like(qid)
     
@@ -68,44 +120,51 @@ class ForumService:
     def unsave_question(self, qid: str) -> bool:
         return QuestionRepo.unsave_question(qid=qid)
 
-    def list_questions(self, direction: str, limit: int, sort: str, last_key: dict[str, str] | None) -> dict[str, object]:
-        if sort in ['popular', 'new']:
-            match direction:
-                case 'descending' | 'desc':
-                    dir = False
-                case 'ascending' | 'asc':
-                    dir = True
-                case _:
-                    return {"error": "invalid_direction_parameter"}
-            res = QuestionRepo.list_questions(direction=dir, limit=limit, sort=sort, last_key=last_key)
-        else:
+    def list_questions(self, direction: str, limit: int, sort: str, last_key: str | None, flags: bool = False) -> dict[str, object]:
+        if sort not in ['popular', 'new']:
             return {"error": "invalid_sort_parameter"}
-        cursor = res.get("LastEvaluatedKey")
-        return {
-            "items": res["Items"],
-            "pageInfo": {
-                "hasNextPage": False if cursor == None else True,
-                "endCursor": cursor
-            }
-        }
-    def list_questions_by_user(self, direction: str, limit: int, last_key: dict[str, str] | None) -> dict[str, object]:
+        if limit < 1:
+            return {"error": "invalid_limit_parameter"}
         dir = _resolve_direction(direction)
         if dir is None:
             return {"error": "invalid_direction_parameter"}
-        res = QuestionRepo.list_questions_by_user(direction=dir, limit=limit, last_key=last_key)
-        cursor = res.get("LastEvaluatedKey")
-        return {
-            "items": res["Items"],
-            "pageInfo": {
-                "hasNextPage": False if cursor == None else True,
-                "endCursor": cursor
-            }
-        }
+        scope = f"questions:{sort}:{dir}"
+        try:
+            start = _decode_cursor(last_key, scope)
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        res = None
+        if start is None:
+            # First pages come from the feed cache, see feed_cache.py
+            res = feed.page(sort, dir, limit, lambda n: QuestionRepo.list_questions(direction=dir, limit=n, sort=sort, last_key=None))
+        if res is None:
+            res = QuestionRepo.list_questions(direction=dir, limit=limit, sort=sort, last_key=start)
+        if flags:
+            _embed_flags(res["Items"])
+        return _page(res["Items"], res.get("LastEvaluatedKey"), scope)
 
-    def list_saved_questions(self, limit: int, last_key: dict[str, str] | None) -> dict[str, object]:
+    def list_questions_by_user(self, direction: str, limit: int, last_key: str | None, flags: bool = False) -> dict[str, object]:
+        dir = _resolve_direction(direction)
+        if dir is None:
+            return {"error": "invalid_direction_parameter"}
+        scope = f"questions:author:{g.user_sub}:{dir}"
+        try:
+            start = _decode_cursor(last_key, scope)
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        res = QuestionRepo.list_questions_by_user(direction=dir, limit=limit, last_key=start)
+        if flags:
+            _embed_flags(res["Items"])
+        return _page(res["Items"], res.get("LastEvaluatedKey"), scope)
+
+    def list_saved_questions(self, limit: int, last_key: str | None, flags: bool = False) -> dict[str, object]:
         limit = max(1, min(limit, 20))  # enforce 1 <= limit <= 20
-        saves_res = QuestionRepo.get_saves(limit=limit, last_key=last_key)
-        cursor = saves_res.get("LastEvaluatedKey")
+        scope = f"saved:{g.user_sub}"
+        try:
+            start = _decode_cursor(last_key, scope)
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        saves_res = QuestionRepo.get_saves(limit=limit, last_key=start)
         saves = saves_res.get("Items", [])
         save_objs = [to_save(s) for s in saves]
         qids = [s.qid for s in save_objs]
@@ -114,31 +173,49 @@ class ForumService:
             for i, qid in enumerate(qids):
                 if not any(q["qid"] == qid for q in questions):
                     table.delete_item(Key=save_objs[i].key())
-        return {
-            "items": questions,
-            "pageInfo": {
-                "hasNextPage": False if cursor == None else True,
-                "endCursor": cursor
-            }
-        }
+        if flags:
+            _embed_flags(questions)
+        return _page(questions, saves_res.get("LastEvaluatedKey"), scope)
     
     # Search questions by the content of their titles and bodies
-    def search_questions(self, query: str, direction: str, limit: int, last_key: dict[str, str]) -> dict[str, object]:
+    def search_questions(self, query: str, direction: str, limit: int, last_key: str | None, flags: bool = False) -> dict[str, object]:
         dir = _resolve_direction(direction)
         if dir is None:
             return {"error": "invalid_direction_parameter"}
-        return QuestionRepo.search_questions(query=query, direction=dir, limit=limit, last_key=last_key)
-
-    def list_questions_with_tag(self, tag: str, direction: bool, limit: int, last_key: dict[str, str] | None) -> dict[str, object]:
-        res = QuestionRepo.list_questions_with_tag(tag=tag, direction=direction, limit=limit, last_key=last_key)
-        cursor = res.get("LastEvaluatedKey")
-        return {
-            "items": res["Items"],
-            "pageInfo": {
-                "hasNextPage": False if cursor == None else True,
-                "endCursor": cursor
-            }
-        }
+        scope = f"search:{query}:{dir}"
+        try:
+            start = _decode_cursor(last_key, scope)
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        res = QuestionRepo.search_questions(query=query, direction=dir, limit=limit, last_key=start)
+        if flags:
+            _embed_flags(res["Items"]) # type: ignore
+        return _page(res["Items"], res.get("LastEvaluatedKey"), scope) # type: ignore
+
+    def list_questions_with_tag(self, tags: list[str], match: str, sort: str, direction: str, limit: int, last_key: str | None, flags: bool = False) -> dict[str, object]:
+        dir = _resolve_direction(direction)
+        if dir is None:
+            return {"error": "invalid_direction_parameter"}
+        if sort not in ['popular', 'new']:
+            return {"error": "invalid_sort_parameter"}
+        if match not in ['all', 'any']:
+            return {"error": "invalid_match_parameter"}
+        if not tags:
+            return {"error": "missing_tag"}
+        scope = f"tag:{','.join(tags)}:{match}:{sort}:{dir}"
+        try:
+            start = _decode_cursor(last_key, scope)
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        res = QuestionRepo.list_questions_with_tag(tags=tags, match=match, sort=sort, direction=dir, limit=limit, last_key=start)
+        if flags:
+            _embed_flags(res["Items"]) # type: ignore
+        return _page(res["Items"], res.get("LastEvaluatedKey"), scope) # type: ignore
+
+    def list_popular_tags(self, limit: int) -> dict[str, object]:
+        limit = max(1, min(limit, 50))
+        tags = TagRepo.list_popular_tags(limit)
+        return {"items": [t.model_dump() for t in tags]}
 
     # ---- Replies ----
     def create_reply(self, qid: str, payload: dict) -> dict[str, object] | tuple[dict[str, object], int]:
@@ -161,7 +238,9 @@ class ForumService:
             likes=0,
             reply_count=0
         )
-        ReplyRepo.create(reply)
+        if not ReplyRepo.create(reply):
+            return {"error": "not_found"}, 404
+        feed.on_reply(qid, 1)
         return {"rid": rid}
 
     def get_reply(self, qid: str, rid: str) -> dict[str, object] | None:
@@ -187,16 +266,17 @@ class ForumService:
             return {"error": "not_found"}, 404
         if reply.user_id != g.user_sub:
             return {"error": "not_authorized"}, 403
-        ok = ReplyRepo.delete(qid, rid)
+        ok = ReplyRepo.delete(reply)
         if ok:
+            feed.on_reply(qid, -1)
             return 204
         else:
             return {"error": "delete_failed"}, 500
     
     def like_reply(self, qid: str, rid: str) -> bool:
-        return ReplyRepo.like(qid, rid)
+        return ReplyRepo.like(qid, rid) is not False
     def unlike_reply(self, qid: str, rid: str) -> bool:
-        return ReplyRepo.unlike(qid, rid)
+        return ReplyRepo.unlike(qid, rid) is not False
     def get_like_reply(self, qid: str, rid: str) -> bool:
         return ReplyRepo.get_like(qid, rid)
 
@@ -216,36 +296,41 @@ def _resolve_direction(direction: str) -> bool | None:
         case _:
             return None
 
-def _extract_name() -> str:
-    """
-    Safely extract the user's name from Cognito.
-    Always returns a non-empty string.
-    """
-    import boto3
-    from flask import g
-
-    cl = boto3.client("cognito-idp", region_name="eu-north-1")
+def _decode_cursor(last_key: str | None, scope: str) -> dict | None:
+    return cursor.decode(last_key, scope) if last_key else None # type: ignore
 
-    try:
-        resp = cl.admin_get_user(
-            UserPoolId="eu-north-1_LRB1Cr2sA",
-            Username=g.user_sub
-        )
-
-        # Find a 'name' attribute if available
-        for attr in resp.get("UserAttributes", []):
-            if attr["Name"] == "name" and attr.get("Value"):
-                return str(attr["Value"])
+def _page(items: list, last_evaluated_key: object, scope: str) -> dict[str, object]:
+    return {
+        "items": items,
+        "pageInfo": {
+            "hasNextPage": last_evaluated_key is not None,
+            "endCursor": cursor.encode(last_evaluated_key, scope) if last_evaluated_key else None
+        }
+    }
 
-        # fallback to username/email if no 'name' exists
-        for alt in ["preferred_username", "username", "email"]:
-            for attr in resp.get("UserAttributes", []):
-                if attr["Name"] == alt and attr.get("Value"):
-                    return str(attr["Value"])
+def _qid_of(item: dict) -> str:
+    # GSI projections carry the key attributes but not "qid"
+    return item.get("qid") or item["PK"].split("#", 1)[1]
 
-        # Final fallback
-        return "Anonymous"
+def _embed_flags(questions: list[dict], replies: list[dict] = []) -> None:
+    """
+    Add the current user's "liked"/"saved" state to questions and replies
+    in place, resolved with one batch read. Anonymous requests are left as is.
+    """
+    if not g.get("user_sub") or not (questions or replies):
+        return
+    qids = [_qid_of(q) for q in questions]
+    rids = [r["SK"].split("#", 1)[1] for r in replies]
+    liked, saved = QuestionRepo.get_viewer_flags(qids + rids, qids)
+    for q, qid in zip(questions, qids):
+        q["liked"] = qid in liked
+        q["saved"] = qid in saved
+    for r, rid in zip(replies, rids):
+        r["liked"] = rid in liked
 
-    except Exception as e:
-        print(f"[WARN] Could not fetch Cognito name: {e}")
-        return "Anonymous"
+def _extract_name() -> str:
+    """
+    The current user's display name, served from the name cache.
+    Always returns a non-empty string.
+    """
+    return name_service.resolver.resolve(g.user_sub)
@@ -0,0 +1,64 @@
+# src/service/growth_series.py
+import datetime
+import math
+from decimal import Decimal
+
+"""
+Downsampling of a child's growth records for charts.
+
+Records are grouped by week (starting Monday) or by month in one pass; each
+bucket holds the sorted height and weight columns, from which the mean, the
+min/max and any requested percentiles are read without further sorting.
+The percentiles describe the child's own readings in a bucket; they are not
+points on reference growth curves (e.g. WHO) and must not be shown as such.
+"""
+
+INTERVALS = ("week", "month")
+MEASURES = ("height", "weight")
+
+def bucket_start(day: datetime.date, interval: str) -> datetime.date:
+    if interval == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def percentile(ordered: list[float], p: float) -> float:
+    '''p-th percentile (0-100) of a sorted column, interpolated linearly.'''
+    pos = (len(ordered) - 1) * p / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def summarize(values: list[float], percentiles: tuple[float, ...]) -> dict[str, float]:
+    ordered = sorted(values)
+    out = {
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "min": ordered[0],
+        "max": ordered[-1]
+    }
+    for p in percentiles:
+        out[f"p{p:g}"] = round(percentile(ordered, p), 3)
+    return out
+
+def downsample(records: list[dict], interval: str, percentiles: tuple[float, ...] = ()) -> list[dict[str, object]]:
+    '''
+    One point per bucket holding records, oldest first:
+        {start: "YYYY-MM-DD", count: Number, height: {...}, weight: {...}}
+    '''
+    columns: dict[datetime.date, dict[str, list[float]]] = {}
+    counts: dict[datetime.date, int] = {}
+    for r in records:
+        start = bucket_start(datetime.date.fromisoformat(str(r["date"])[:10]), interval)
+        bucket = columns.setdefault(start, {m: [] for m in MEASURES})
+        counts[start] = counts.get(start, 0) + 1
+        for m in MEASURES:
+            if r.get(m) is not None:
+                bucket[m].append(float(r[m]) if isinstance(r[m], Decimal) else r[m])
+
+    points = []
+    for start in sorted(columns):
+        bucket = columns[start]
+        point: dict[str, object] = {"start": start.isoformat(), "count": counts[start]}
+        for m in MEASURES:
+            if bucket[m]:
+                point[m] = summarize(bucket[m], percentiles)
+        points.append(point)
+    return points
@@ -0,0 +1,110 @@
+# src/service/name_service.py
+import os
+import threading
+from .. import db
+from ..cache import TTLCache, DynamoCacheBackend
+
+"""Display names of Cognito users, cached so posting does not wait on Cognito."""
+
+COGNITO_REGION = "eu-north-1"
+COGNITO_USER_POOL_ID = "eu-north-1_LRB1Cr2sA"
+NAME_CACHE_TTL = int(os.environ.get("NAME_CACHE_TTL", "3600"))
+NAME_CACHE_SIZE = int(os.environ.get("NAME_CACHE_SIZE", "4096"))
+NAME_CACHE_BACKEND = os.environ.get("NAME_CACHE_BACKEND", "")  # "" (in-process only) | "dynamodb"
+
+class NameResolver:
+    '''
+    Read-through cache in front of Cognito's admin_get_user.
+    Lookups go to the in-process cache first, then to the optional shared
+    backend, and only then to Cognito through a single reused client.
+    '''
+    def __init__(self, cache: TTLCache, backend: DynamoCacheBackend | None = None) -> None:
+        self.cache = cache
+        self.backend = backend
+        self.shared_hits = 0
+        self.cognito_calls = 0
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = db.client("cognito-idp", region_name=COGNITO_REGION)
+        return self._client
+
+    def resolve(self, user_sub: str) -> str:
+        name = self.cache.get(user_sub)
+        if name:
+            return name
+
+        if self.backend:
+            try:
+                name = self.backend.get(user_sub)
+            except Exception as e:
+                print(f"[WARN] Name cache backend unavailable: {e}")
+            if name:
+                self.shared_hits += 1
+                self.cache.set(user_sub, name)
+                return name
+
+        name = self._fetch(user_sub)
+        if name is None:
+            # Do not cache failures, the next post tries Cognito again
+            return "Anonymous"
+        self.cache.set(user_sub, name)
+        if self.backend:
+            try:
+                self.backend.set(user_sub, name, self.cache.ttl)
+            except Exception as e:
+                print(f"[WARN] Name cache backend unavailable: {e}")
+        return name
+
+    def update(self, user_sub: str, name: str) -> None:
+        '''Cache a name the user just changed, before Cognito knows it.'''
+        self.cache.set(user_sub, name)
+        if self.backend:
+            try:
+                self.backend.set(user_sub, name, self.cache.ttl)
+            except Exception as e:
+                print(f"[WARN] Name cache backend unavailable: {e}")
+
+    def invalidate(self, user_sub: str) -> None:
+        self.cache.delete(user_sub)
+        if self.backend:
+            try:
+                self.backend.delete(user_sub)
+            except Exception as e:
+                print(f"[WARN] Name cache backend unavailable: {e}")
+
+    def stats(self) -> dict[str, object]:
+        return {
+            **self.cache.stats(),
+            "sharedHits": self.shared_hits,
+            "cognitoCalls": self.cognito_calls
+        }
+
+    def _fetch(self, user_sub: str) -> str | None:
+        '''Name of the user from Cognito, "Anonymous" if it has none, None on error.'''
+        self.cognito_calls += 1
+        try:
+            resp = self.client().admin_get_user(
+                UserPoolId=COGNITO_USER_POOL_ID,
+                Username=user_sub
+            )
+        except Exception as e:
+            print(f"[WARN] Could not fetch Cognito name: {e}")
+            return None
+
+        attrs = {attr["Name"]: attr.get("Value") for attr in resp.get("UserAttributes", [])}
+        # Prefer 'name', then fall back to username/email
+        for field in ["name", "preferred_username", "username", "email"]:
+            if attrs.get(field):
+                return str(attrs[field])
+        return "Anonymous"
+
+
+resolver = NameResolver(
+    cache=TTLCache(maxsize=NAME_CACHE_SIZE, ttl=NAME_CACHE_TTL),
+    backend=DynamoCacheBackend("NAME") if NAME_CACHE_BACKEND == "dynamodb" else None
+)
@@ -14,10 +14,16 @@ from ..models.profile import (
     milestones_list,
 )
 from ..repo import profile_repo as repo
+from . import name_service, growth_series
+from .. import cursor
+from ..cursor import InvalidCursor
 from ..db import table
 from typing import Any
 from flask import g, current_app
 
+# What the app's home screen shows, loaded by GET /profile/me
+HOME_SECTIONS = ("profile", "children", "growth", "vaccines", "friendRequests")
+
 class ProfileService:
     def __init__(self):
         pass
@@ -40,20 +46,86 @@ class ProfileService:
         table.put_item(Item=profile.to_item())
         return profile.model_dump()
 
-    def get_my_profile(self) -> dict[str, Any]:
-        print("DEBUG /profile/me user_sub:", g.user_sub)
-        profile = repo.get_profile(g.user_sub)
-        print("DEBUG retrieved:", profile)
-        return profile
+    def get_my_profile(self, sections: list[str] | None = None) -> dict[str, Any]:
+        """Own profile with its children, their records and pending friend requests."""
+        sections = sections or list(HOME_SECTIONS)
+        if not set(sections) <= set(repo.SECTIONS):
+            return {"error": "invalid_sections"}
+        return self.load_profile(g.user_sub, sections)
 
     def update_profile(self, payload: dict):
         """Update current user's profile fields like name, bio, or privacy."""
-        return repo.update_profile(g.user_sub, payload)
+        updated = repo.update_profile(g.user_sub, payload)
+        if payload.get("name"):
+            # The new name is only in our table, re-fetching from Cognito would bring back the old one
+            name_service.resolver.update(g.user_sub, payload["name"])
+        return updated
 
     def get_user_profile(self, viewer_id: str, user_id: str) -> dict[str, Any]:
-        profile = repo.get_profile(user_id)
+        profile = self.load_profile(user_id, ["profile", "children"])
+        if "user_id" not in profile:
+            return {"error": "profile_not_found"}
+        # Growth and vaccine rows are only read where the viewer may see them
+        is_owner, is_friend = self._relation(profile, viewer_id)
+        wanted: dict[str, set[str]] = {}
+        for child in profile["children"]:
+            visible = {s for s in ("growth", "vaccines") if _can_see(child["privacy"].get(s, "public"), is_owner, is_friend)}
+            for s in visible:
+                child[s] = []
+            if visible:
+                wanted[child["child_id"]] = visible
+        if wanted:
+            children = {c["child_id"]: c for c in profile["children"]}
+            for item in repo.get_child_records(user_id, wanted):
+                children[item["SK"].split("#")[1]][repo.section_of(item["SK"])].append(item)
         return self._apply_privacy(profile, viewer_id)
 
+    # ---- Aggregate ----
+    def load_profile(self, user_id: str, sections: list[str]) -> dict[str, Any]:
+        """
+        Nested profile built from one concurrent partition read: the PROFILE item's
+        fields, plus a list per requested section. Growth and vaccine records
+        are nested under their child; records of children without a CHILD#
+        row (e.g. left over from a deleted child) are skipped.
+        """
+        wanted = set(sections)
+        fetched = wanted | {"children"} if wanted & {"growth", "vaccines"} else wanted
+        profile: dict[str, Any] = {}
+        children: dict[str, dict[str, Any]] = {}
+        existing: set[str] = set()
+        lists: dict[str, list] = {s: [] for s in ("friendRequests", "likes", "saves") if s in wanted}
+
+        def child(child_id: str) -> dict[str, Any]:
+            if child_id not in children:
+                children[child_id] = {"child_id": child_id}
+                for s in ("growth", "vaccines"):
+                    if s in wanted:
+                        children[child_id][s] = []
+            return children[child_id]
+
+        for item in repo.get_profile_items(user_id, fetched):
+            section = repo.section_of(item["SK"])
+            if section not in fetched:
+                continue
+            if section == "profile":
+                profile.update(item)
+            elif section == "children":
+                child_id = item["SK"].split("#")[1]
+                existing.add(child_id)
+                if "children" in wanted:
+                    child(child_id).update(item)
+                else:
+                    child(child_id)
+            elif section in ("growth", "vaccines"):
+                child(item["SK"].split("#")[1])[section].append(item)
+            else:
+                lists[section].append(item) # type: ignore
+
+        if wanted & {"children", "growth", "vaccines"}:
+            profile["children"] = [c for cid, c in children.items() if cid in existing]
+        profile.update(lists)
+        return profile
+
     # ---- Children ----
     def add_child(self, payload: ChildCreate) -> dict[str, Any]:
         child = Child(
@@ -113,15 +185,46 @@ class ProfileService:
         table.put_item(Item=growth.to_item())
         return growth.model_dump()
 
-    def list_growth(self, child_id: str) -> list[dict]:
-        """Return all growth records for the child."""
-        from boto3.dynamodb.conditions import Key
-
-        res = table.query(
-            KeyConditionExpression=Key("PK").eq(f"USER#{g.user_sub}")
-            & Key("SK").begins_with(f"CHILD#{child_id}#GROWTH#")
-        )
-        return res.get("Items", [])
+    def list_growth(self, child_id: str, date_from: str | None = None, date_to: str | None = None) -> list[dict]:
+        """Return the child's growth records, optionally between two dates (inclusive)."""
+        return repo.list_growth(g.user_sub, child_id, date_from, date_to)
+
+    def growth_series(self, child_id: str, date_from: str | None = None, date_to: str | None = None,
+                      interval: str = "raw", percentiles: tuple[float, ...] = (),
+                      limit: int = 100, last_key: str | None = None) -> dict[str, Any]:
+        """
+        Growth chart data between two dates. interval "raw" pages through the
+        records; "week" and "month" return one aggregate point per period
+        (mean, min, max and the requested percentiles of the period's height
+        and weight readings; these are not reference growth curves).
+        """
+        if interval in growth_series.INTERVALS:
+            records = repo.read_growth(g.user_sub, child_id, date_from, date_to)
+            try:
+                points = growth_series.downsample(records, interval, percentiles)
+            except ValueError:
+                return {"error": "invalid_date"}
+            return {"items": points, "pageInfo": {"hasNextPage": False, "endCursor": None}}
+        if interval != "raw":
+            return {"error": "invalid_interval"}
+
+        scope = f"growth:{g.user_sub}:{child_id}:{date_from}:{date_to}"
+        try:
+            start = cursor.decode(last_key, scope) if last_key else None
+        except InvalidCursor:
+            return {"error": "invalid_cursor"}
+        res = repo.query_growth(g.user_sub, child_id, date_from, date_to, limit, start) # type: ignore
+        lek = res["LastEvaluatedKey"]
+        return {
+            "items": [
+                {"date": i["date"], "height": i.get("height"), "weight": i.get("weight")}
+                for i in res["Items"] # type: ignore
+            ],
+            "pageInfo": {
+                "hasNextPage": lek is not None,
+                "endCursor": cursor.encode(lek, scope) if lek else None
+            }
+        }
 
     # ---- Vaccines ----
     def add_vaccine(self, child_id: str, payload: VaccineCreate) -> dict[str, Any]:
@@ -234,18 +337,16 @@ class ProfileService:
         repo.remove_friend(friend_id, g.user_sub)
 
     # ---- Privacy ----
+    def _relation(self, profile: dict[str, Any], viewer_id: str) -> tuple[bool, bool]:
+        '''(is_owner, is_friend) of the viewer of a profile.'''
+        return viewer_id == profile["user_id"], viewer_id in profile.get("friends", [])
+
     def _apply_privacy(self, profile: dict[str, Any], viewer_id: str) -> dict[str, Any]:
-        is_owner = viewer_id == profile["user_id"]
-        is_friend = viewer_id in profile.get("friends", [])
+        is_owner, is_friend = self._relation(profile, viewer_id)
         filtered: dict[str, Any] = {}
 
         for field in ["name", "dob", "friends"]:
-            privacy = profile["privacy"].get(field, "public")
-            if privacy == "public":
-                filtered[field] = profile[field]
-            elif privacy == "friends" and is_friend:
-                filtered[field] = profile[field]
-            elif privacy == "private" and is_owner:
+            if _can_see(profile["privacy"].get(field, "public"), is_owner, is_friend):
                 filtered[field] = profile[field]
 
         if "children" in profile:
@@ -253,14 +354,12 @@ class ProfileService:
             for child in profile["children"]:
                 child_copy: dict[str, Any] = {"id": child["child_id"], "name": child["name"]}
                 for subfield in ["milestones", "growth", "vaccines"]:
-                    privacy = child["privacy"].get(subfield, "public")
-                    if privacy == "public":
-                        child_copy[subfield] = child.get(subfield)
-                    elif privacy == "friends" and is_friend:
-                        child_copy[subfield] = child.get(subfield)
-                    elif privacy == "private" and is_owner:
+                    if _can_see(child["privacy"].get(subfield, "public"), is_owner, is_friend):
                         child_copy[subfield] = child.get(subfield)
                 filtered_children.append(child_copy)
             filtered["children"] = filtered_children
 
         return filtered
+
+def _can_see(privacy: str, is_owner: bool, is_friend: bool) -> bool:
+    return privacy == "public" or (privacy == "friends" and is_friend) or (privacy == "private" and is_owner)
@@ -0,0 +1,60 @@
+# src/service/tip_service.py
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+"""
+Bibi's tip of the day.
+
+The catalogue is read once from a JSON file (BIBI_TIPS_FILE, default
+src/data/tips.json) of tips like
+    {"id": "steady-routines", "text": "...", "ages": "all" | ["baby", "toddler", ...]}
+and grouped by age bucket. The tip of a day is a hash of the date and the
+bucket (and the user, if any) into the bucket's tips, so every worker
+picks the same one without storing anything.
+"""
+
+BIBI_TIPS_FILE = os.environ.get("BIBI_TIPS_FILE", os.path.join(os.path.dirname(__file__), "..", "data", "tips.json"))
+
+# Child age in years (as on questions) -> bucket
+AGE_BUCKETS = [(1, "baby"), (3, "toddler"), (6, "preschool"), (None, "school")]
+ALL = "all"
+
+def bucket_of(age: int | None) -> str:
+    if age is None:
+        return ALL
+    for upper, bucket in AGE_BUCKETS:
+        if upper is None or age < upper:
+            return bucket
+    return ALL
+
+class TipService:
+    def __init__(self, path: str = BIBI_TIPS_FILE) -> None:
+        with open(path, encoding="utf-8") as f:
+            tips = json.load(f)["tips"]
+        buckets = [b for _, b in AGE_BUCKETS]
+        self.by_bucket: dict[str, list[dict]] = {b: [] for b in buckets + [ALL]}
+        for tip in tips:
+            ages = buckets if tip.get("ages", ALL) == ALL else tip["ages"]
+            for b in ages:
+                self.by_bucket[b].append(tip)
+            self.by_bucket[ALL].append(tip)
+
+    def tip_of_the_day(self, age: int | None = None, user_sub: str | None = None, day: date | None = None) -> dict[str, object]:
+        '''
+        Deterministic tip for the day, the child's age bucket and the user.
+        Falls back to the whole catalogue if the bucket has no tips.
+        '''
+        day = day or datetime.now(timezone.utc).date()
+        bucket = bucket_of(age)
+        pool = self.by_bucket.get(bucket) or self.by_bucket[ALL]
+        seed = hashlib.sha256(f"{day.isoformat()}:{bucket}:{user_sub or ''}".encode()).digest()
+        tip = pool[int.from_bytes(seed[:8], "big") % len(pool)]
+        return {"id": tip["id"], "text": tip["text"], "bucket": bucket, "date": day.isoformat()}
+
+def seconds_until_tomorrow() -> int:
+    '''Seconds until the tip changes (midnight UTC).'''
+    now = datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return max(int((tomorrow - now).total_seconds()), 1)
@@ -1,6 +1,35 @@
+import json
+import os
+import tempfile
+import threading
+import jwt
 import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+os.environ.setdefault("CURSOR_SECRET", "test-cursor-secret")
+
+# Signing key of the test tokens. Its key set is read from a local file,
+# so creating the app never fetches the Cognito JWKS.
+TEST_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+TEST_KID = "test-key"
+
+def _write_test_jwks() -> str:
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(TEST_KEY.public_key()))
+    fd, path = tempfile.mkstemp(prefix="jwks-", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"keys": [{**jwk, "kid": TEST_KID, "alg": "RS256", "use": "sig"}]}, f)
+    return path
+
+os.environ.setdefault("COGNITO_JWKS", _write_test_jwks())
+
+from src import db
 from src.app import create_app
 
+@pytest.fixture(scope="session", autouse=True)
+def provisioned_table():
+    # The app no longer creates the table, provision it once per run
+    db.ensure_table()
+
 @pytest.fixture
 def client():
     app = create_app()
@@ -8,3 +37,98 @@ def client():
     # here, FORUM_SERVICE should be the real one (your create_app should set it up)
     with app.test_client() as client:
         yield client
+
+class FakeAgentStream:
+    '''Local stand-in for a Bedrock agent completion stream.'''
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+        self.pulled = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.pulled += 1
+            yield {"chunk": {"bytes": chunk.encode("utf-8")}}
+
+    def close(self) -> None:
+        self.closed = True
+
+class FakeAgentClient:
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+        self.calls: list[dict] = []
+        self.streams: list[FakeAgentStream] = []
+
+    def invoke_agent(self, **kwargs) -> dict:
+        self.calls.append(kwargs)
+        self.streams.append(FakeAgentStream(self.chunks))
+        return {"completion": self.streams[-1]}
+
+@pytest.fixture
+def fake_agent(client):
+    agent = FakeAgentClient(["Hello ", "from ", "Bibi"])
+    client.application.config["BIBI_SERVICE"]._agent = agent
+    return agent
+
+class FakeDaily:
+    '''Local stand-in for the Daily REST API, served on a free port.'''
+    def __init__(self) -> None:
+        from flask import Flask, request
+        from werkzeug.serving import make_server
+        self.calls: list[tuple[str, str]] = []
+        app = Flask("fake_daily")
+
+        @app.post("/rooms")
+        def create_room():
+            self.calls.append(("POST", "/rooms"))
+            name = request.get_json()["name"]
+            return {"name": name, "url": f"https://fake.daily.co/{name}"}
+
+        @app.delete("/rooms/<name>")
+        def delete_room(name):
+            self.calls.append(("DELETE", f"/rooms/{name}"))
+            return {"deleted": True, "name": name}
+
+        @app.post("/meeting-tokens")
+        def meeting_token():
+            self.calls.append(("POST", "/meeting-tokens"))
+            return {"token": f"token-{len(self.calls)}"}
+
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+@pytest.fixture(scope="session")
+def fake_daily_server():
+    daily = FakeDaily()
+    yield daily
+    daily.server.shutdown()
+
+@pytest.fixture
+def fake_daily(fake_daily_server, monkeypatch):
+    from src.service import breakroom_service
+    monkeypatch.setattr(breakroom_service, "DAILY_API_URL", fake_daily_server.url)
+    fake_daily_server.calls.clear()
+    return fake_daily_server
+
+@pytest.fixture
+def user_sub():
+    '''Sub of the signed-in user of a test, fresh for every test.'''
+    import uuid
+    return f"test-{uuid.uuid4().hex}"
+
+@pytest.fixture
+def auth_headers(client, user_sub):
+    '''Bearer header of user_sub, signed with the key of the local key set.'''
+    import time
+    from src.service import name_service
+
+    app = client.application
+    now = int(time.time())
+    token = jwt.encode({
+        "sub": user_sub, "username": user_sub, "iss": app.config["COGNITO_ISSUER"],
+        "iat": now, "exp": now + 3600, "token_use": "access",
+        "client_id": app.config["COGNITO_APP_CLIENT_ID"]
+    }, TEST_KEY, algorithm="RS256", headers={"kid": TEST_KID})
+    name_service.resolver.cache.set(user_sub, "Tester")
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,109 @@
+import json
+import time
+import jwt
+import pytest
+from flask import Flask
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src import auth
+from src.jwks import KeyStore
+
+ISSUER = "https://cognito-idp.test.amazonaws.com/pool"
+
+class FakeJWKClient:
+    def __init__(self, key) -> None:
+        self.key = key
+        self.calls = 0
+
+    def get_signing_key_from_jwt(self, token: str):
+        self.calls += 1
+        return self
+
+def _app_and_token(sub: str = "user-1", iat: int | None = None) -> tuple[Flask, str]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    app = Flask(__name__)
+    app.config.update(
+        COGNITO_ISSUER=ISSUER,
+        COGNITO_APP_CLIENT_ID="client",
+        _COGNITO_JWK_CLIENT=FakeJWKClient(key.public_key())
+    )
+    now = int(time.time())
+    token = jwt.encode({
+        "sub": sub, "iss": ISSUER, "iat": now if iat is None else iat, "exp": now + 3600,
+        "token_use": "access", "client_id": "client"
+    }, key, algorithm="RS256")
+    return app, token
+
+def test_verified_claims_are_cached_until_revoked():
+    app, token = _app_and_token()
+    jwk = app.config["_COGNITO_JWK_CLIENT"]
+
+    assert auth._verified_claims(token, app)["sub"] == "user-1"
+    assert auth._verified_claims(token, app)["sub"] == "user-1"
+    assert jwk.calls == 1
+
+    auth.revoke_token(token)
+    with pytest.raises(jwt.InvalidTokenError):
+        auth._verified_claims(token, app)
+
+def test_revoked_user_tokens_are_rejected():
+    # Issued before the second of the revocation
+    app, token = _app_and_token("user-2", iat=int(time.time()) - 1)
+    auth._verified_claims(token, app)
+    auth.revoke_user("user-2")
+    with pytest.raises(jwt.InvalidTokenError):
+        auth._verified_claims(token, app)
+
+def test_tokens_issued_in_the_revocation_second_are_accepted(monkeypatch):
+    second = int(time.time()) - 5
+    with monkeypatch.context() as m:
+        m.setattr(auth.time, "time", lambda: second + 0.9)
+        auth.revoke_user("user-5")
+    app, fresh = _app_and_token("user-5", iat=second)
+    assert auth._verified_claims(fresh, app)["sub"] == "user-5"
+    app, old = _app_and_token("user-5", iat=second - 1)
+    with pytest.raises(jwt.InvalidTokenError):
+        auth._verified_claims(old, app)
+
+def test_revocations_are_not_evicted_before_expiry(monkeypatch):
+    app, token = _app_and_token("user-3")
+    auth.revoke_token(token)
+    auth.revoke_user("user-3")
+    for i in range(auth.TOKEN_CACHE_SIZE + 10):
+        auth._revoked_tokens.set(f"other-{i}", True)
+        auth._revoked_users.set(f"other-{i}", 0)
+    with pytest.raises(jwt.InvalidTokenError):
+        auth._verified_claims(token, app)
+    assert auth._revoked_tokens.get(auth._digest(token)) is True
+
+def test_key_store_serves_local_keys_and_limits_refetches(tmp_path):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [{**jwk, "kid": "k1", "alg": "RS256", "use": "sig"}]}))
+
+    store = KeyStore(str(path), min_refetch=60)
+    token = jwt.encode({"sub": "x"}, key, algorithm="RS256", headers={"kid": "k1"})
+    assert jwt.decode(token, store.get_signing_key_from_jwt(token).key, algorithms=["RS256"])["sub"] == "x"
+
+    bad = jwt.encode({"sub": "x"}, key, algorithm="RS256", headers={"kid": "nope"})
+    for _ in range(5):
+        with pytest.raises(jwt.InvalidTokenError):
+            store.get_signing_key_from_jwt(bad)
+        store.refresh()
+    assert store.stats()["fetches"] == 1
+
+def test_create_app_loads_keys_offline(monkeypatch):
+    import os
+    import urllib.request
+    from src import jwks
+    from src.app import create_app
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("create_app fetched over the network")
+    monkeypatch.setattr(urllib.request, "urlopen", no_network)
+    monkeypatch.setattr(jwks, "_stores", {})
+
+    store = create_app().config["_COGNITO_JWK_CLIENT"]
+    assert store.source == os.environ["COGNITO_JWKS"]
+    assert store.stats()["fetches"] == 1
+    assert store.stats()["failures"] == 0
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+import time
+from src.routes.bibi_routes import _sse
+from src.service.bibi_service import BibiService, normalize
+
+def test_bibi_streams_chunks_as_events(client, fake_agent):
+    res = client.post("/bibi", json={"message": "hi", "sessionId": "s1", "stream": True})
+    assert res.mimetype == "text/event-stream"
+    events = [e for e in res.get_data(as_text=True).split("\n\n") if e]
+    assert [json.loads(e[len("data: "):])["text"] for e in events[:-1]] == ["Hello ", "from ", "Bibi"]
+    assert events[-1].startswith("event: done")
+
+    res = client.post("/bibi", json={"message": "hi", "sessionId": "s1"})
+    assert res.get_json() == {"reply": "Hello from Bibi"}
+    assert fake_agent.calls[0]["sessionId"] == fake_agent.calls[1]["sessionId"] != "s1"
+
+def test_bibi_stream_stops_reading_when_client_disconnects(client, fake_agent):
+    svc = client.application.config["BIBI_SERVICE"]
+    events = _sse(svc.stream("hi", "s1", stateless=False))
+    next(events)
+    events.close()
+    assert fake_agent.streams[0].pulled == 1
+    assert fake_agent.streams[0].closed
+
+def _gated(svc, fake_agent, waiting):
+    '''Blocks the fake agent until `waiting` callers joined the call in flight.'''
+    invoke = fake_agent.invoke_agent
+    def slow_invoke(**kwargs):
+        deadline = time.monotonic() + 5
+        while svc.flight.coalesced < waiting and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return invoke(**kwargs)
+    fake_agent.invoke_agent = slow_invoke
+
+def test_stateless_questions_are_cached_and_coalesced(fake_agent):
+    svc = BibiService()
+    svc._agent = fake_agent
+    _gated(svc, fake_agent, waiting=3)
+
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append(svc.ask("How do I help my baby sleep?", None, True))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert svc.flight.coalesced == 3
+    assert replies == ["Hello from Bibi"] * 4
+    assert len(fake_agent.calls) == 1
+    assert svc.ask("how do i help my baby   sleep", None, True) == "Hello from Bibi"
+    assert len(fake_agent.calls) == 1
+    assert normalize("Sleep?") == normalize(" sleep ")
+
+def test_streamed_stateless_questions_are_coalesced(fake_agent):
+    svc = BibiService()
+    svc._agent = fake_agent
+    _gated(svc, fake_agent, waiting=2)
+
+    replies = []
+    threads = [threading.Thread(target=lambda: replies.append("".join(svc.stream("Teething?", None, True)))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert svc.flight.coalesced == 2
+    assert sorted(replies) == ["Hello from Bibi", "Hello from Bibi", "Hello from Bibi"]
+    assert len(fake_agent.calls) == 1
+
+def test_questions_without_session_are_not_shared(client, fake_agent, auth_headers):
+    for _ in range(2):
+        res = client.post("/bibi", json={"message": "hi"}, headers=auth_headers)
+        assert res.get_json() == {"reply": "Hello from Bibi"}
+    client.post("/bibi", json={"message": "hi"})
+    assert len(fake_agent.calls) == 3
+    assert fake_agent.calls[0]["sessionId"] == fake_agent.calls[1]["sessionId"] != fake_agent.calls[2]["sessionId"]
+    assert client.application.config["BIBI_SERVICE"].cache.get("hi") is None
+
+def test_daily_tip_is_stable_and_revalidates(client):
+    res = client.get("/bibi/daily-tip?age=2")
+    assert res.status_code == 200
+    assert res.headers["Cache-Control"].startswith("public, max-age=")
+    assert client.get("/bibi/daily-tip?age=2").get_json() == res.get_json()
+
+    again = client.get("/bibi/daily-tip?age=2", headers={"If-None-Match": res.headers["ETag"]})
+    assert again.status_code == 304
+
+def test_anonymous_callers_cannot_reach_user_sessions(client, fake_agent, auth_headers, user_sub):
+    client.post("/bibi", json={"message": "hi"}, headers=auth_headers)
+    own = fake_agent.calls[0]["sessionId"]
+    assert own != hashlib.sha256(f"{user_sub}:".encode()).hexdigest()[:32]
+
+    for guess in (own, user_sub, f"{user_sub}:"):
+        client.post("/bibi", json={"message": "hi", "sessionId": guess})
+    assert own not in [c["sessionId"] for c in fake_agent.calls[1:]]
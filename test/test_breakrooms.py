@@ -0,0 +1,103 @@
+import time
+import uuid
+from src.models.breakrooms import Breakroom
+from src.repo import breakrooms_repo as repo
+from src.service import breakroom_service
+
+def _room(owner: str, expires_in: int) -> Breakroom:
+    now = int(time.time())
+    room_id = uuid.uuid4().hex[:12]
+    return Breakroom(
+        room_id=room_id, status="active", daily_room_name=f"pairent-{room_id}", created_at=now,
+        expires_at=now + expires_in, url="", ttl=now + expires_in + 300, owner_sub=owner
+    )
+
+def test_active_rooms_are_listed_soonest_to_expire_first():
+    owner = uuid.uuid4().hex
+    rooms = [_room(owner, 100000 + i) for i in (30, 10, 20)]
+    for r in rooms:
+        repo.put_breakroom(r)
+    repo.update_breakroom_status(rooms[2].room_id, "ended")
+
+    mine = breakroom_service.list_breakrooms(owner_sub=owner, limit=10)
+    assert len(mine["items"]) == 3
+
+    seen, after = [], None
+    while True:
+        page = breakroom_service.list_breakrooms(limit=1, last_key=after)
+        seen += [r["roomId"] for r in page["items"]]
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
+    ours = [rid for rid in seen if rid in {r.room_id for r in rooms}]
+    assert ours == [rooms[1].room_id, rooms[0].room_id]
+
+def test_sweeper_ends_expired_rooms_and_drops_participants():
+    owner = uuid.uuid4().hex
+    expired, live = _room(owner, -10), _room(owner, 3600)
+    for r in (expired, live):
+        repo.put_breakroom(r)
+        repo.put_participant(r.room_id, owner, "owner", int(time.time()))
+
+    res = breakroom_service.sweep_expired()
+    assert res["ended"] >= 1
+    assert repo.get_breakroom_meta(expired.room_id)["status"] == "ended"
+    assert repo.get_breakroom_meta(live.room_id)["status"] == "active"
+    assert repo.delete_participants([expired.room_id]) == 0
+    assert repo.delete_participants([live.room_id]) == 1
+
+def test_sweeper_pages_once_and_skips_deleted_rooms(monkeypatch):
+    owner = uuid.uuid4().hex
+    rooms = [_room(owner, -10 - i) for i in range(3)]
+    for r in rooms:
+        repo.put_breakroom(r)
+    gone = _room(owner, -5)
+    repo.put_breakroom(gone)
+
+    seen = []
+    list_expired = repo.list_expired_breakrooms
+    def listing(now, limit, last_key=None):
+        res = list_expired(now, limit, last_key)
+        seen.extend(item["PK"] for item in res.get("Items", []))
+        # Deleted by TTL after it was read from the index
+        if any(item["PK"] == f"BRK#{gone.room_id}" for item in res.get("Items", [])):
+            repo.table.delete_item(Key=Breakroom.key(gone.room_id))
+        return res
+    monkeypatch.setattr(repo, "list_expired_breakrooms", listing)
+    monkeypatch.setattr(breakroom_service, "SWEEP_BATCH_SIZE", 1)
+
+    res = breakroom_service.sweep_expired()
+    assert len(seen) == len(set(seen))
+    assert res["ended"] == len(seen) - 1
+    assert all(repo.get_breakroom_meta(r.room_id)["status"] == "ended" for r in rooms)
+    assert repo.get_breakroom_meta(gone.room_id) is None
+
+def test_joins_share_meta_reads_and_token_requests(client, fake_daily, monkeypatch):
+    with client.application.app_context():
+        room = breakroom_service.create_breakroom("owner-sub")
+        reads = []
+        get_meta = repo.get_breakroom_meta
+        monkeypatch.setattr(repo, "get_breakroom_meta", lambda rid: reads.append(rid) or get_meta(rid))
+
+        for user in ("a", "b", "c"):
+            token, err = breakroom_service.issue_token(room["roomId"], user, user)
+            assert err is None and token["token"].startswith("token-")
+        assert len(reads) == 1
+        assert fake_daily.calls.count(("POST", "/meeting-tokens")) == 3
+
+        assert breakroom_service.end_breakroom(room["roomId"], "owner-sub", []) is None
+        assert breakroom_service.issue_token(room["roomId"], "a", "a") == (None, "room_not_active")
+
+def test_breakroom_routes_only_call_daily_to_create_join_and_end(client, fake_daily, auth_headers):
+    room = client.post("/breakrooms", json={"name": "night feeds"}, headers=auth_headers).get_json()
+    assert room["name"] == "night-feeds" and room["ownerName"] == "Tester"
+
+    listed = client.get("/breakrooms?mine=true", headers=auth_headers).get_json()
+    assert room["roomId"] in [r["roomId"] for r in listed["items"]]
+    assert client.get("/breakrooms").status_code == 200
+    for bad in ("x", "0", "-1", "51", "100000"):
+        assert client.get(f"/breakrooms?limit={bad}").status_code == 400
+
+    assert client.post(f"/breakrooms/{room['roomId']}/token", headers=auth_headers).get_json()["isOwner"]
+    assert client.delete(f"/breakrooms/{room['roomId']}", headers=auth_headers).status_code == 204
+    assert [c[0] for c in fake_daily.calls] == ["POST", "POST", "DELETE"]
@@ -0,0 +1,57 @@
+import pytest
+import uuid
+from decimal import Decimal
+from src import cursor
+from src.cursor import InvalidCursor
+from src.models.question import Question
+from src.repo import question_repo as QuestionRepo
+
+def test_cursor_round_trip():
+    key = {"PK": "QUESTION#abc", "SK": "!", "gsi": "Y", "likes": Decimal(3)}
+    token = cursor.encode(key, "questions:popular:False")
+    assert cursor.decode(token, "questions:popular:False") == {**key, "likes": 3}
+
+def test_cursor_rejects_tampering_and_other_lists():
+    token = cursor.encode({"PK": "USER#a", "SK": "SAVE#q"}, "saved:a")
+    version, payload, signature = token.split(".")
+    forged = cursor.encode({"PK": "USER#b", "SK": "SAVE#q"}, "saved:a").split(".")[1]
+
+    with pytest.raises(InvalidCursor):
+        cursor.decode(f"{version}.{forged}.{signature}", "saved:a")
+    with pytest.raises(InvalidCursor):
+        cursor.decode(token, "saved:b")
+    with pytest.raises(InvalidCursor):
+        cursor.decode(f"2.{payload}.{signature}", "saved:a")
+    with pytest.raises(InvalidCursor):
+        cursor.decode("not-a-cursor", "saved:a")
+
+def test_list_endpoint_pages_with_cursor(client):
+    for i in range(2):
+        QuestionRepo.create(Question(
+            qid=uuid.uuid4().hex, title="Cursor paging", body="", author_id="cursor-test-user",
+            name="Tester", tags=[], age=1, created_at=f"2099010100000{i}", likes=0, reply_count=0
+        ))
+    first = client.get("/questions?limit=1").get_json()
+    assert first["pageInfo"]["hasNextPage"]
+    second = client.get(f"/questions?limit=1&after={first['pageInfo']['endCursor']}").get_json()
+    assert second["items"][0]["PK"] != first["items"][0]["PK"]
+
+    res = client.get("/questions?limit=1&after=1.e30.AAAA")
+    assert res.status_code == 400
+    assert res.get_json()["error"] == "invalid_cursor"
+
+def test_startup_requires_a_shared_cursor_secret(monkeypatch):
+    monkeypatch.setattr(cursor, "_SECRET", b"")
+    with pytest.raises(RuntimeError):
+        cursor.require_secret()
+    cursor.require_secret(allow_random=True)
+    assert cursor.decode(cursor.encode({"a": 1}, "s"), "s") == {"a": 1}
+
+def test_cli_commands_start_without_a_cursor_secret(monkeypatch):
+    from src.app import create_app
+    monkeypatch.setattr(cursor, "_SECRET", b"")
+    monkeypatch.delenv("FLASK_RUN_FROM_CLI", raising=False)
+    with pytest.raises(RuntimeError):
+        create_app(features=["forum"], lazy=True)
+    monkeypatch.setenv("FLASK_RUN_FROM_CLI", "true")
+    assert "provision" in create_app(features=["forum"], lazy=True).cli.commands
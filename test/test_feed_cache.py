@@ -0,0 +1,78 @@
+import pytest
+from src.cache import TTLCache
+from src.service.feed_cache import FeedCache
+
+def _item(n: int) -> dict:
+    return {"PK": f"QUESTION#q{n}", "SK": "!", "gsi": "Y", "title": f"t{n}", "date": f"2025{n:010d}", "likes": 0}
+
+def test_first_pages_are_sliced_and_patched():
+    loads = []
+    def load(n: int) -> dict:
+        loads.append(n)
+        items = [_item(i) for i in range(5, 0, -1)]
+        return {"Items": items[:n], "LastEvaluatedKey": None}
+
+    feed = FeedCache(TTLCache(maxsize=4, ttl=60), depth=3)
+    page = feed.page("new", False, 2, load)
+    assert [i["title"] for i in page["Items"]] == ["t5", "t4"]
+    assert page["LastEvaluatedKey"] == {"PK": "QUESTION#q4", "SK": "!", "gsi": "Y", "date": _item(4)["date"]}
+
+    feed.on_create(_item(6))
+    feed.on_like("q5", 1)
+    page = feed.page("new", False, 3, load)
+    assert [(i["title"], i["likes"]) for i in page["Items"]] == [("t6", 0), ("t5", 1), ("t4", 0)]
+    assert loads == [3]
+
+    feed.on_delete("q6")
+    feed.on_delete("q5")
+    # Only one cached item left for a page of two, so the cache steps aside
+    assert feed.page("new", False, 2, load) is None
+    assert feed.page("new", False, 10, load) is None
+    assert feed.stats()["hits"] == 2
+
+def test_created_questions_are_counted_once_in_every_order():
+    stored = [_item(2), _item(1)]
+    loads = []
+    def load(n: int) -> dict:
+        loads.append(n)
+        return {"Items": [dict(i) for i in stored][:n], "LastEvaluatedKey": None}
+
+    feed = FeedCache(TTLCache(maxsize=4, ttl=60), depth=5)
+    for sort in ("new", "popular"):
+        for direction in (False, True):
+            feed.page(sort, direction, 5, load)
+    created = {**_item(3), "answers": 0}
+    stored.insert(0, created)
+    feed.on_create(created)
+    created.update(likes=1, answers=1)
+    feed.on_like("q3", 1)
+    feed.on_reply("q3", 1)
+
+    for sort in ("new", "popular"):
+        for direction in (False, True):
+            [q3] = [i for i in feed.page(sort, direction, 5, load)["Items"] if i["PK"] == "QUESTION#q3"]
+            assert (q3["likes"], q3["answers"]) == (1, 1)
+    # Every entry, popular ones included, survived the create and the like
+    assert len(loads) == 4
+    assert feed.page("popular", False, 5, load)["Items"][0]["PK"] == "QUESTION#q3"
+    assert feed.page("popular", True, 5, load)["Items"][-1]["PK"] == "QUESTION#q3"
+    with pytest.raises(ValueError):
+        feed.page("new", False, -1, load)
+
+def test_popular_entries_drop_only_when_a_like_crosses_their_edge():
+    stored = [{**_item(n), "likes": n} for n in (5, 4, 3, 2, 1)]
+    def load(n: int) -> dict:
+        return {"Items": [dict(i) for i in stored][:n], "LastEvaluatedKey": {"x": 1} if n < len(stored) else None}
+
+    feed = FeedCache(TTLCache(maxsize=4, ttl=60), depth=3)
+    feed.page("popular", False, 3, load)
+    feed.on_like("q4", 2)      # moves up inside the window
+    page = feed.page("popular", False, 3, load)
+    assert [i["title"] for i in page["Items"]] == ["t4", "t5", "t3"]
+    assert feed.stats()["invalidations"] == 0
+
+    feed.on_like("q3", -1)     # the last item falls below questions outside the window
+    assert feed.stats()["invalidations"] == 1
+    assert feed.stats()["misses"] == 1
+    feed.page("popular", False, 3, load)
+    assert feed.stats()["misses"] == 2
@@ -0,0 +1,96 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import pytest
+from src.db import table
+from src.models.forum import Like
+from src.models.question import Question
+from src.repo import like_repo
+
+@pytest.fixture
+def serialized_transactions(monkeypatch):
+    '''
+    DynamoDB runs each TransactWriteItems in isolation, so a Like Put and its
+    attribute_not_exists check can not interleave with another transaction.
+    The local stand-in on 127.0.0.1:8000 (moto server) checks the conditions
+    of concurrent transactions before either writes, so racing likes of the
+    same user all pass. Tests about concurrent transactions go through this
+    fixture, which runs them one at a time as DynamoDB would.
+    '''
+    client = table.meta.client
+    real = client.transact_write_items
+    lock = threading.Lock()
+
+    def serialized(**kwargs):
+        with lock:
+            return real(**kwargs)
+
+    monkeypatch.setattr(client, "transact_write_items", serialized)
+
+def _create_question() -> str:
+    q = Question(
+        qid=uuid.uuid4().hex,
+        title="Concurrent likes",
+        body="",
+        author_id="like-test-user",
+        name="Tester",
+        tags=[],
+        age=1,
+        created_at=datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S"),
+        likes=0,
+        reply_count=0
+    )
+    table.put_item(Item=q.to_item())
+    return q.qid
+
+def _likes(qid: str) -> int:
+    return int(table.get_item(Key=Question.key(qid))["Item"]["likes"])
+
+def test_concurrent_likes_count_each_user_once(serialized_transactions):
+    qid = _create_question()
+    users = [f"user-{i}" for i in range(20)]
+    taps = users * 3    # every user taps like three times
+
+    def tap(user: str) -> bool:
+        return like_repo.like(Question.key(qid), Like(qid=qid, user_id=user, liked_id=qid))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(tap, taps))
+    assert results.count(True) == len(users)
+    assert results.count(None) == len(taps) - len(users)
+    assert _likes(qid) == len(users)
+
+    def untap(user: str) -> bool:
+        return like_repo.unlike(Question.key(qid), Like(qid=qid, user_id=user, liked_id=qid))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(untap, taps))
+    assert results.count(True) == len(users)
+    assert _likes(qid) == 0
+
+def test_like_missing_question_is_rejected():
+    qid = uuid.uuid4().hex
+    like = Like(qid=qid, user_id="user-x", liked_id=qid)
+    assert like_repo.like(Question.key(qid), like) is False
+    assert like_repo.get_like(like) is False
+
+def test_likes_retry_transaction_conflicts(monkeypatch):
+    from botocore.exceptions import ClientError
+    qid = _create_question()
+    client = table.meta.client
+    real = client.transact_write_items
+    conflicts = [2]
+
+    def conflicting(**kwargs):
+        if conflicts[0]:
+            conflicts[0] -= 1
+            raise ClientError({
+                "Error": {"Code": "TransactionCanceledException", "Message": "conflict"},
+                "CancellationReasons": [{"Code": "None"}, {"Code": "TransactionConflict"}]
+            }, "TransactWriteItems")
+        return real(**kwargs)
+
+    monkeypatch.setattr(client, "transact_write_items", conflicting)
+    assert like_repo.like(Question.key(qid), Like(qid=qid, user_id="u", liked_id=qid)) is True
+    assert conflicts == [0] and _likes(qid) == 1
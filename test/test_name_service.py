@@ -0,0 +1,37 @@
+import time
+from src.cache import TTLCache
+from src.service.name_service import NameResolver
+
+class FakeCognito:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+
+    def admin_get_user(self, UserPoolId: str, Username: str) -> dict:
+        self.calls += 1
+        return {"UserAttributes": [{"Name": "name", "Value": self.name}]}
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)           # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2
+
+def test_resolver_calls_cognito_once_until_invalidated():
+    resolver = NameResolver(cache=TTLCache(maxsize=10, ttl=60))
+    resolver._client = FakeCognito("Elif")
+
+    assert resolver.resolve("sub-1") == "Elif"
+    assert resolver.resolve("sub-1") == "Elif"
+    assert resolver._client.calls == 1
+
+    resolver._client.name = "Elif B."
+    resolver.invalidate("sub-1")
+    assert resolver.resolve("sub-1") == "Elif B."
+    assert resolver.stats()["cognitoCalls"] == 2
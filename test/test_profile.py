@@ -0,0 +1,139 @@
+from boto3.dynamodb.conditions import Key
+from src.db import table
+from src.models.profile import Profile, Child, Growth, Vaccine, FriendRequest
+from src.models.forum import Like
+from src.repo import profile_repo
+
+def _record_reads(monkeypatch) -> list[dict]:
+    '''Responses of the queries sent through the table's client.'''
+    client = table.meta.client
+    real = client.query
+    responses: list[dict] = []
+    def query(**kwargs):
+        res = real(**kwargs)
+        responses.append(res)
+        return res
+    monkeypatch.setattr(client, "query", query)
+    return responses
+
+def _family(user: str) -> None:
+    privacy = {"name": "public", "dob": "private", "friends": "friends"}
+    table.put_item(Item=Profile(user_id=user, name="Sam", dob="1990-01-01", friends=[], profile_privacy=privacy).to_item())
+    child_privacy = {"milestones": "public", "growth": "public", "vaccines": "private"}
+    table.put_item(Item=Child(user_id=user, child_id="c1", name="Kim", dob="2024-01-01", privacy=child_privacy, milestones=[]).to_item())
+    for date in ("2024-02-01", "2024-03-01"):
+        table.put_item(Item=Growth(user_id=user, child_id="c1", date=date, height=55.0, weight=4.5).to_item())
+    table.put_item(Item=Vaccine(user_id=user, child_id="c1", name="MMR", date="2025-01-01", status="done").to_item())
+    table.put_item(Item=FriendRequest(from_id="someone", to_id=user, status="pending").to_item())
+    table.put_item(Item=Like(qid="q1", liked_id="q1", user_id=user).to_item())
+
+def test_home_screen_profile_reads_no_like_rows(client, auth_headers, user_sub, monkeypatch):
+    _family(user_sub)
+    reads = _record_reads(monkeypatch)
+
+    me = client.get("/profile/me", headers=auth_headers).get_json()
+    # Profile, child, two growth, vaccine and friend request rows; not the LIKE# row
+    assert sum(r["ScannedCount"] for r in reads) == 6
+    assert me["name"] == "Sam" and "likes" not in me
+    assert [r["from"] for r in me["friendRequests"]] == ["someone"]
+    [kid] = me["children"]
+    assert kid["name"] == "Kim"
+    assert [g["date"] for g in kid["growth"]] == ["2024-02-01", "2024-03-01"]
+    assert [v["name"] for v in kid["vaccines"]] == ["MMR"]
+
+    only = client.get("/profile/me?sections=children,likes", headers=auth_headers).get_json()
+    assert set(only) == {"children", "likes"}
+    assert set(only["children"][0]) >= {"name", "dob"} and "growth" not in only["children"][0]
+    assert client.get("/profile/me?sections=bogus", headers=auth_headers).status_code == 400
+
+def test_other_profiles_are_privacy_filtered(client, auth_headers):
+    _family("other-user")
+    seen = client.get("/profile/other-user", headers=auth_headers).get_json()
+    assert seen == {"name": "Sam", "children": [{
+        "id": "c1", "name": "Kim", "milestones": [], "growth": seen["children"][0]["growth"]
+    }]}
+    assert len(seen["children"][0]["growth"]) == 2
+
+def test_hidden_child_records_are_not_read(client, auth_headers, monkeypatch):
+    _family("private-user")
+    reads = _record_reads(monkeypatch)
+    seen = client.get("/profile/private-user", headers=auth_headers).get_json()
+    assert "vaccines" not in seen["children"][0]
+    # Vaccines are private: profile, child and the two growth rows only
+    assert sum(r["ScannedCount"] for r in reads) == 4
+    assert client.get("/profile/nobody", headers=auth_headers).status_code == 404
+
+def test_records_of_deleted_children_are_not_shown(client, auth_headers, user_sub):
+    _family(user_sub)
+    _family("orphan-user")
+    # Rows of a child deleted before its records were deleted with it
+    for user in (user_sub, "orphan-user"):
+        table.put_item(Item=Growth(user_id=user, child_id="c9", date="2024-01-01", height=50.0, weight=3.5).to_item())
+        table.put_item(Item=Vaccine(user_id=user, child_id="c9", name="BCG", date="2024-01-01", status="done").to_item())
+
+    me = client.get("/profile/me", headers=auth_headers).get_json()
+    assert [c["child_id"] for c in me["children"]] == ["c1"]
+    growth = client.get("/profile/me?sections=growth", headers=auth_headers).get_json()
+    assert [c["child_id"] for c in growth["children"]] == ["c1"] and "name" not in growth["children"][0]
+    res = client.get("/profile/orphan-user", headers=auth_headers)
+    assert res.status_code == 200 and [c["id"] for c in res.get_json()["children"]] == ["c1"]
+
+    assert client.delete("/profile/me/children/c1", headers=auth_headers).status_code < 300
+    assert client.get("/profile/me", headers=auth_headers).get_json()["children"] == []
+    left = table.query(KeyConditionExpression=Key("PK").eq(f"USER#{user_sub}") & Key("SK").begins_with("CHILD#c1"))
+    assert left["Items"] == []
+
+def test_children_are_listed_from_the_index_and_old_rows_migrated(client, auth_headers, user_sub):
+    _family(user_sub)
+    legacy = Child(user_id=user_sub, child_id="c0", name="Lee", dob="2022-01-01", privacy={}, milestones=[]).to_item()
+    del legacy["child_owner"]
+    table.put_item(Item=legacy)
+    assert [c["child_id"] for c in profile_repo.get_children(user_sub)] == ["c1"]
+
+    assert profile_repo.migrate_children(dry_run=True)["migrated"] >= 1
+    profile_repo.migrate_children()
+    assert profile_repo.migrate_children(dry_run=True)["migrated"] == 0
+    listed = client.get("/profile/me/children", headers=auth_headers).get_json()
+    assert [c["child_id"] for c in listed] == ["c0", "c1"]
+
+def test_growth_series_ranges_pages_and_downsamples(client, auth_headers, user_sub):
+    for day, weight in (("2024-01-01", 4.0), ("2024-01-03", 4.2), ("2024-01-09", 4.5), ("2024-02-20", 5.5), ("2024-03-02", 6.0)):
+        table.put_item(Item=Growth(user_id=user_sub, child_id="g1", date=day, height=50.0, weight=weight).to_item())
+    url = "/profile/me/children/g1/growth"
+    first = client.get(url, headers=auth_headers).get_json()[0]
+    assert "gsi" not in first and {"user_id", "child_id", "height", "weight"} <= set(first)
+    assert [r["date"] for r in client.get(f"{url}?from=2024-01-03&to=2024-02-20", headers=auth_headers).get_json()] == [
+        "2024-01-03", "2024-01-09", "2024-02-20"]
+
+    dates, after = [], ""
+    while True:
+        page = client.get(f"{url}/series?to=2024-02-20&limit=2&after={after}", headers=auth_headers).get_json()
+        dates += [p["date"] for p in page["items"]]
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
+    assert dates == ["2024-01-01", "2024-01-03", "2024-01-09", "2024-02-20"]
+
+    weeks = client.get(f"{url}/series?interval=week&percentiles=50", headers=auth_headers).get_json()["items"]
+    assert [(w["start"], w["count"]) for w in weeks] == [("2024-01-01", 2), ("2024-01-08", 1), ("2024-02-19", 1), ("2024-02-26", 1)]
+    assert weeks[0]["weight"] == {"mean": 4.1, "min": 4.0, "max": 4.2, "p50": 4.1}
+    months = client.get(f"{url}/series?interval=month&from=2024-01-02", headers=auth_headers).get_json()["items"]
+    assert [(m["start"], m["count"]) for m in months] == [("2024-01-01", 2), ("2024-02-01", 1), ("2024-03-01", 1)]
+    assert client.get(f"{url}/series?interval=year", headers=auth_headers).status_code == 400
+    for bad in (url, f"{url}/series"):
+        assert client.get(f"{bad}?from=2024-03-01&to=2024-01-01", headers=auth_headers).status_code == 400
+
+def test_old_growth_rows_leave_the_new_index(user_sub):
+    old = Growth(user_id=user_sub, child_id="g2", date="2024-05-01", height=60.0, weight=6.5).to_item()
+    table.put_item(Item={**old, "gsi": "GROWTH"})
+
+    assert profile_repo.migrate_growth(dry_run=True)["migrated"] >= 1
+    profile_repo.migrate_growth()
+    assert "gsi" not in table.get_item(Key={"PK": old["PK"], "SK": old["SK"]})["Item"]
+    assert profile_repo.migrate_growth(dry_run=True)["migrated"] == 0
+
+def test_renamed_users_post_under_their_new_name(client, auth_headers, user_sub):
+    _family(user_sub)
+    assert client.put("/profile/me", json={"name": "Sam R."}, headers=auth_headers).status_code == 200
+    qid = client.post("/questions", json={"title": "Renamed", "body": "Still me", "tags": []}, headers=auth_headers).get_json()["qid"]
+    assert client.get(f"/questions/{qid}").get_json()["name"] == "Sam R."
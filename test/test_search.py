@@ -0,0 +1,78 @@
+import uuid
+from datetime import datetime, timezone
+from src.models.question import Question
+from src.repo import question_repo as QuestionRepo
+from src.repo import search_repo
+from src.db import table
+
+def _question(title: str, body: str) -> Question:
+    return Question(
+        qid=uuid.uuid4().hex,
+        title=title,
+        body=body,
+        author_id="search-test-user",
+        name="Tester",
+        tags=[],
+        age=1,
+        created_at=datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S"),
+        likes=0,
+        reply_count=0
+    )
+
+def test_tokenize_drops_stopwords_and_case():
+    assert search_repo.tokenize("How do I stop the Teething pain?") == ["do", "stop", "teething", "pain"]
+
+def test_title_terms_outrank_body_terms():
+    tfs, dl = search_repo.term_frequencies("sleep regression", "my baby wakes up")
+    assert tfs["sleep"] == search_repo.TITLE_WEIGHT
+    assert tfs["baby"] == 1
+    assert dl == 2 * search_repo.TITLE_WEIGHT + 3
+
+def test_search_ranks_and_paginates():
+    word = "zz" + uuid.uuid4().hex[:8]
+    strong = _question(f"{word} {word} at night", f"{word} again")
+    weak = _question("bedtime routine", f"we tried {word} once and nothing else worked for weeks")
+    other = _question(f"{word}ing toddlers", "prefix match only")
+    for q in (strong, weak, other):
+        QuestionRepo.create(q)
+
+    first = QuestionRepo.search_questions(query=word, direction=False, limit=2, last_key=None)
+    qids = [q["qid"] for q in first["Items"]] # type: ignore
+    assert qids[0] == strong.qid
+    assert first["LastEvaluatedKey"]
+
+    rest = QuestionRepo.search_questions(query=word, direction=False, limit=2, last_key=first["LastEvaluatedKey"]) # type: ignore
+    qids += [q["qid"] for q in rest["Items"]] # type: ignore
+    assert sorted(qids) == sorted([strong.qid, weak.qid, other.qid])
+    assert rest["LastEvaluatedKey"] is None
+
+    QuestionRepo.delete(strong.qid)
+    after_delete = QuestionRepo.search_questions(query=word, direction=False, limit=10, last_key=None)
+    assert strong.qid not in [q["qid"] for q in after_delete["Items"]] # type: ignore
+
+def test_prefix_expands_to_frequent_live_terms(monkeypatch):
+    stem = "yy" + uuid.uuid4().hex[:6]
+    common, rare, gone = f"{stem}common", f"{stem}rare", f"{stem}gone"
+    questions = [_question(common, "x"), _question(common, rare), _question(gone, "y")]
+    for q in questions:
+        QuestionRepo.create(q)
+    assert search_repo.expand_prefix(stem) == [common, gone, rare]
+
+    QuestionRepo.delete(questions[2].qid)
+    assert search_repo.expand_prefix(stem) == [common, rare]
+    assert not table.get_item(Key={"PK": f"TERMS#{stem[:2]}", "SK": gone}).get("Item")
+
+    monkeypatch.setattr(search_repo, "MAX_PREFIX_TERMS", 1)
+    assert search_repo.expand_prefix(stem) == [common]
+
+def test_unindex_recounts_entries_without_df():
+    word = "xx" + uuid.uuid4().hex[:8]
+    kept, removed = _question(word, "first"), _question(word, "second")
+    for q in (kept, removed):
+        QuestionRepo.create(q)
+    entry = {"PK": f"TERMS#{word[:2]}", "SK": word}
+    # Dictionary entries written before df was kept
+    table.update_item(Key=entry, UpdateExpression="REMOVE df")
+
+    QuestionRepo.delete(removed.qid)
+    assert table.get_item(Key=entry)["Item"]["df"] == 1
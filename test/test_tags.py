@@ -0,0 +1,138 @@
+import uuid
+import pytest
+from pydantic import ValidationError
+from src.db import table
+from src.models.forum import Like, Tag
+from src.models.question import Question, QuestionCreate, MAX_TAGS
+from src.models.reply import Reply
+from src.repo import question_repo as QuestionRepo
+from src.repo import like_repo, tag_repo
+from src.repo import reply_repo as ReplyRepo
+
+def _create(tags: list[str], date: str, likes: int = 0) -> Question:
+    q = Question(
+        qid=uuid.uuid4().hex,
+        title=f"tagged {date}",
+        body="",
+        author_id="tag-test-user",
+        name="Tester",
+        tags=tags,
+        age=1,
+        created_at=date,
+        likes=likes,
+        reply_count=0
+    )
+    QuestionRepo.create(q)
+    return q
+
+def _all_pages(tags: list[str], match: str, sort: str, limit: int) -> list[str]:
+    qids: list[str] = []
+    cursor = None
+    while True:
+        res = QuestionRepo.list_questions_with_tag(tags=tags, match=match, sort=sort, direction=False, limit=limit, last_key=cursor)
+        qids += [i["qid"] for i in res["Items"]] # type: ignore
+        cursor = res["LastEvaluatedKey"]
+        if not cursor:
+            return qids
+
+def test_tag_intersection_and_union_paginate():
+    a, b = "ta" + uuid.uuid4().hex[:6], "tb" + uuid.uuid4().hex[:6]
+    only_a = _create([a], "20250101000001")
+    both = _create([a, b], "20250101000002")
+    only_b = _create([b], "20250101000003")
+    both_again = _create([b, a], "20250101000004")
+
+    assert _all_pages([a, b], "all", "new", 1) == [both_again.qid, both.qid]
+    assert _all_pages([a, b], "any", "new", 2) == [both_again.qid, only_b.qid, both.qid, only_a.qid]
+    assert _all_pages([a], "all", "new", 10) == [both_again.qid, both.qid, only_a.qid]
+
+def test_union_returns_a_question_under_every_tag_once():
+    a, b, c = ("tu" + uuid.uuid4().hex[:6] for _ in range(3))
+    newest = _create([a], "20250101000005")
+    newer = _create([b], "20250101000004")
+    shared = _create([a, b, c], "20250101000003")
+    oldest = _create([c], "20250101000002")
+
+    # Pages of one: the rows of shared are read across several pages
+    assert _all_pages([a, b, c], "any", "new", 1) == [newest.qid, newer.qid, shared.qid, oldest.qid]
+
+def test_sparse_intersection_pages_stop_at_the_read_budget(monkeypatch):
+    a, b = "ts" + uuid.uuid4().hex[:6], "tt" + uuid.uuid4().hex[:6]
+    both = _create([a, b], "20250101000001")
+    for i in range(4):
+        _create([a], f"2025010100001{i}")
+    for i in range(6):
+        _create([b], f"2025010100002{i}")
+    monkeypatch.setattr(tag_repo, "INTERSECTION_FANOUT", 1)
+    monkeypatch.setattr(tag_repo, "INTERSECTION_MIN_PAGE", 1)
+    monkeypatch.setattr(tag_repo, "INTERSECTION_MAX_PAGES", 2)
+
+    first = QuestionRepo.list_questions_with_tag(tags=[a, b], match="all", sort="new", direction=False, limit=1, last_key=None)
+    assert first["Items"] == [] and first["LastEvaluatedKey"]
+    assert _all_pages([a, b], "all", "new", 1) == [both.qid]
+
+def test_tag_pages_sort_by_likes():
+    tag = "tp" + uuid.uuid4().hex[:6]
+    low = _create([tag], "20250101000001", likes=1)
+    high = _create([tag], "20250101000002", likes=5)
+    mid = _create([tag], "20250101000003", likes=3)
+
+    assert _all_pages([tag], "all", "popular", 2) == [high.qid, mid.qid, low.qid]
+
+def test_tag_counters_follow_create_edit_and_delete():
+    x, y, z = ("tc" + uuid.uuid4().hex[:6] + s for s in "xyz")
+    first = _create([x, y], "20250101000001")
+    second = _create([x], "20250101000002")
+    third = _create([x, y, z], "20250101000003")
+    assert tag_repo.get_counts([x, y, z]) == {x: 3, y: 2, z: 1}
+
+    QuestionRepo.edit(second.qid, tags=[y, z])
+    QuestionRepo.edit(first.qid, tags=[z])
+    assert tag_repo.get_counts([x, y, z]) == {x: 1, y: 2, z: 3}
+
+    QuestionRepo.delete(third.qid)
+    assert tag_repo.get_counts([x, y, z]) == {x: 0, y: 1, z: 2}
+    popular = [t.tag for t in tag_repo.list_popular_tags(limit=10000) if t.tag in (x, y, z)]
+    assert popular == [z, y]
+
+def test_questions_carry_a_bounded_number_of_tags():
+    with pytest.raises(ValidationError):
+        QuestionCreate(title="Too many tags", body="", tags=[f"t{i}" for i in range(MAX_TAGS + 1)], age=1)
+
+def _tag_row(tag: str, q: Question) -> dict:
+    return table.get_item(Key=Tag.from_question(q, tag).key(), ConsistentRead=True).get("Item", {})
+
+def test_tag_rows_count_likes_and_replies_with_the_question():
+    tag = "tl" + uuid.uuid4().hex[:6]
+    q = _create([tag], "20250101000001")
+    for user in ("u1", "u2", "u2"):
+        like_repo.like(Question.key(q.qid), Like(qid=q.qid, user_id=user, liked_id=q.qid), tag_repo.copy_keys(q.qid))
+    reply = Reply(qid=q.qid, rid="r1", parent_id=q.qid, user_id="u1", name="T", body="", created_at="1", likes=0, reply_count=0)
+    ReplyRepo.create(reply)
+    assert (_tag_row(tag, q)["likes"], _tag_row(tag, q)["answers"]) == (2, 1)
+
+    # Tags edited since the copies were read: the like still counts on the question
+    stale = tag_repo.copy_keys(q.qid)
+    QuestionRepo.edit(q.qid, title="retitled", tags=["tl" + uuid.uuid4().hex[:6]])
+    assert like_repo.like(Question.key(q.qid), Like(qid=q.qid, user_id="u3", liked_id=q.qid), stale) is True
+    assert not _tag_row(tag, q)
+
+    # ...and the copy under the new tag, which missed it, is fixed by reconcile
+    ReplyRepo.delete(reply)
+    moved = QuestionRepo.get_question(q.qid, consistent=True)
+    assert ReplyRepo.reconcile(q.qid) == 1
+    row = _tag_row(moved.tags[0], moved) # type: ignore
+    assert (row["title"], row["likes"], row["answers"]) == ("retitled", 3, 0)
+
+def test_date_keyed_tag_rows_are_migrated():
+    tag = "tm" + uuid.uuid4().hex[:6]
+    q = _create([tag], "20250101000001", likes=4)
+    table.delete_item(Key=Tag.from_question(q, tag).key())
+    table.put_item(Item={"PK": f"TAG#{tag}", "SK": q.created_at, "qid": q.qid})
+    table.put_item(Item={"PK": f"TAG#{tag}", "SK": "20240101000000", "qid": "gone"})
+
+    assert tag_repo.migrate_rows(dry_run=True)["migrated"] >= 1
+    tag_repo.migrate_rows()
+    assert _all_pages([tag], "all", "new", 10) == [q.qid]
+    assert _tag_row(tag, q)["title"] == q.title and _tag_row(tag, q)["likes"] == 4
+    assert tag_repo.get_counts([tag]) == {tag: 1}
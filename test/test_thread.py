@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+from src.db import table
+from src.models.question import Question
+from src.models.reply import Reply
+from src.repo import question_repo as QuestionRepo
+from src.repo import reply_repo as ReplyRepo
+from src.repo import thread_repo
+
+def _question(title: str) -> str:
+    qid = uuid.uuid4().hex
+    QuestionRepo.create(Question(
+        qid=qid, title=title, body="", author_id="thread-test-user",
+        name="Tester", tags=[], age=1, created_at="20250101000000", likes=0, reply_count=0
+    ))
+    return qid
+
+def _reply(qid: str, rid: str, parent: str, date: str) -> Reply:
+    reply = Reply(qid=qid, rid=rid, parent_id=parent, user_id="u", name="T", body="", created_at=date, likes=0, reply_count=0)
+    assert ReplyRepo.create(reply)
+    return reply
+
+class CountingQueries:
+    '''Wraps the table client's query, counting calls and how many run at once.'''
+    def __init__(self, monkeypatch, delay: float = 0.0):
+        client = table.meta.client
+        self.real = client.query
+        self.delay = delay
+        self.queries = self.running = self.most_running = 0
+        self.lock = threading.Lock()
+        monkeypatch.setattr(client, "query", self.query)
+
+    def query(self, **kwargs):
+        with self.lock:
+            self.queries += 1
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            time.sleep(self.delay)
+            return self.real(**kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+def test_thread_windows_read_only_their_replies(monkeypatch):
+    qid = _question("Windows")
+    for i in range(30):
+        _reply(qid, f"r{i:02}", qid, f"2025010100{i:04}")
+    _reply(qid, "r00-a", "r00", "20250102000001")
+    _reply(qid, "r00-b", "r00", "20250102000002")
+    gone = _reply(qid, "r01-a", "r01", "20250102000003")
+    _reply(qid, "r01-a-x", "r01-a", "20250102000004")
+    ReplyRepo.delete(gone)     # its reply moves to the top level
+
+    counting = CountingQueries(monkeypatch)
+    first = thread_repo.window(qid, qid, None, 2, 1)
+    assert [n["SK"] for n in first["Items"]] == ["REPLY#r00", "REPLY#r01"]
+    assert [c["SK"] for c in first["Items"][0]["children"]] == ["REPLY#r00-a"]
+    assert first["Items"][0]["childCount"] == 2
+    assert counting.queries == 2   # the page and the children of r00, r01 has none left
+
+    after, seen = first["LastEvaluatedKey"], []
+    while after:
+        page = thread_repo.window(qid, qid, after, 10, 0)
+        seen += [n["SK"] for n in page["Items"]]
+        after = page["LastEvaluatedKey"]
+    assert seen == [f"REPLY#r{i:02}" for i in range(2, 30)] + ["REPLY#r01-a-x"]
+
+def test_window_children_are_queried_in_parallel_and_bounded(monkeypatch):
+    qid = _question("Busy thread")
+    parents = thread_repo.THREAD_CHILD_WORKERS + 4
+    for i in range(parents):
+        _reply(qid, f"p{i:02}", qid, f"2025010100{i:04}")
+        _reply(qid, f"p{i:02}-a", f"p{i:02}", f"2025010200{i:04}")
+
+    counting = CountingQueries(monkeypatch, delay=0.05)
+    page = thread_repo.window(qid, qid, None, parents, 1)
+    assert all(len(n["children"]) == 1 for n in page["Items"])
+    assert counting.queries == 1 + parents
+    assert 1 < counting.most_running <= thread_repo.THREAD_CHILD_WORKERS
+
+def test_replies_written_before_the_thread_index_are_migrated():
+    qid = _question("Old replies")
+    old = Reply(qid=qid, rid="old", parent_id="missing", user_id="u", name="T", body="", created_at="1", likes=0, reply_count=0).to_item()
+    del old["thread_parent"], old["thread_pos"]
+    QuestionRepo.table.put_item(Item=old)
+    assert thread_repo.window(qid, qid, None, 10, 0)["Items"] == []
+
+    thread_repo.migrate_replies()
+    assert [n["SK"] for n in thread_repo.window(qid, qid, None, 10, 0)["Items"]] == ["REPLY#old"]
+
+def test_thread_route_pages_replies(client):
+    qid = uuid.uuid4().hex
+    QuestionRepo.create(Question(
+        qid=qid, title="Thread paging", body="", author_id="thread-test-user",
+        name="Tester", tags=[], age=1, created_at="20250101000000", likes=0, reply_count=0
+    ))
+    for i in range(3):
+        ReplyRepo.create(Reply(
+            qid=qid, rid=f"r{i}", parent_id=qid, user_id="thread-test-user", name="Tester",
+            body="", created_at=f"2025010100000{i}", likes=0, reply_count=0
+        ))
+    ReplyRepo.create(Reply(
+        qid=qid, rid="r0-child", parent_id="r0", user_id="thread-test-user", name="Tester",
+        body="", created_at="20250101000009", likes=0, reply_count=0
+    ))
+
+    first = client.get(f"/questions/{qid}?content=thread&limit=2").get_json()
+    assert first["question"]["qid"] == qid
+    assert [n["SK"] for n in first["items"]] == ["REPLY#r0", "REPLY#r1"]
+    assert first["items"][0]["children"][0]["SK"] == "REPLY#r0-child"
+
+    second = client.get(f"/questions/{qid}?content=thread&limit=2&after={first['pageInfo']['endCursor']}").get_json()
+    assert [n["SK"] for n in second["items"]] == ["REPLY#r2"]
+    assert "question" not in second
+
+    nested = client.get(f"/questions/{qid}/reply/r0/replies").get_json()
+    assert [n["SK"] for n in nested["items"]] == ["REPLY#r0-child"]
+    assert client.get(f"/questions/{qid}/reply/missing/replies").status_code == 404
+
+def test_reply_counters_are_maintained_and_reconciled():
+    qid = uuid.uuid4().hex
+    q = Question(
+        qid=qid, title="Counting replies", body="", author_id="thread-test-user",
+        name="Tester", tags=[], age=1, created_at="20250101000000", likes=0, reply_count=0
+    )
+    QuestionRepo.create(q)
+    top = Reply(qid=qid, rid="top", parent_id=qid, user_id="u", name="T", body="", created_at="1", likes=0, reply_count=0)
+    child = Reply(qid=qid, rid="child", parent_id="top", user_id="u", name="T", body="", created_at="2", likes=0, reply_count=0)
+    assert ReplyRepo.create(top) and ReplyRepo.create(child)
+    assert not ReplyRepo.create(Reply(**{**child.model_dump(), "rid": "lost", "parent_id": "missing"}))
+
+    assert QuestionRepo.get_question(qid).reply_count == 2
+    assert ReplyRepo.get_reply(qid, "top").reply_count == 1
+
+    ReplyRepo.delete(top)
+    assert QuestionRepo.get_question(qid).reply_count == 1
+
+    # Drift the counter by hand, the reconciliation puts it back
+    QuestionRepo.table.update_item(Key=Question.key(qid), UpdateExpression="SET replies = :n", ExpressionAttributeValues={":n": 7})
+    assert ReplyRepo.reconcile(qid) == 1
+    assert QuestionRepo.get_question(qid).reply_count == 1